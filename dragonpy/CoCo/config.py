@@ -21,7 +21,7 @@ from dragonpy.CoCo.CoCo2b_rom import CoCo2b_Basic13_ROM, \
 from dragonpy.CoCo.mem_info import get_coco_meminfo
 from dragonpy.Dragon32.config import Dragon32Cfg
 from dragonpy.Dragon32.keyboard_map import get_coco_keymatrix_pia_result
-from dragonpy.core.configs import COCO2B
+from dragonpy.core.configs import COCO2B, DummyMemInfo
 
 
 log=logging.getLogger(__name__)
@@ -34,6 +34,15 @@ class CoCo2bCfg(Dragon32Cfg):
     # How does the keyboard polling routine starts with?
     PIA0B_KEYBOARD_START = 0xfe
 
+    IDLE_PCS = (
+        0xa1c1, # Scans keyboard, the CoCo pendant of the Dragon $bbe5
+    )
+
+    # The CoCo line input routine is not trapped,
+    # so pasted text is sent via the keyboard matrix:
+    LINE_INPUT_ADDR = None
+    INCH_ADDR = None
+
     RAM_START = 0x0000
 
     # 1KB RAM is not runnable and raise a error
@@ -84,6 +93,11 @@ class CoCo2bCfg(Dragon32Cfg):
             # (0x0112, 0x0113): (self.timer_value_read_word, self.timer_value_write_word),
         }
 
+    def get_mem_info(self):
+        if isinstance(self.mem_info, DummyMemInfo):
+            self.mem_info = get_coco_meminfo()
+        return self.mem_info
+
     def rnd_seed_read(self, cycles, last_op_address, address, byte):
         log.critical("%04x| read $%02x RND() seed from: $%04x", last_op_address, byte, address)
         return byte
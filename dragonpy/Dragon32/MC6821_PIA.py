@@ -50,6 +50,26 @@ class PIA_register(object):
         self.interrupt_received = 0x00
         self.irq = 0x00
 
+    def get_state(self):
+        return {
+            "value": self.value,
+            "pdr_selected": self._pdr_selected,
+            "control_register": self.control_register,
+            "direction_register": self.direction_register,
+            "output_register": self.output_register,
+            "interrupt_received": self.interrupt_received,
+            "irq": self.irq,
+        }
+
+    def set_state(self, state):
+        self.value = state["value"]
+        self._pdr_selected = state["pdr_selected"]
+        self.control_register = state["control_register"]
+        self.direction_register = state["direction_register"]
+        self.output_register = state["output_register"]
+        self.interrupt_received = state["interrupt_received"]
+        self.irq = state["irq"]
+
     def set(self, value):
         log.debug("\t set %s to $%02x %s", self.name, value, '{0:08b}'.format(value))
         self.value = value
@@ -149,6 +169,27 @@ class PIA(object):
         self.pia_1_A_register.reset()
         self.pia_1_B_register.reset()
 
+    def _get_registers(self):
+        return (
+            self.pia_0_A_register, self.pia_0_B_data, self.pia_0_B_control,
+            self.pia_1_A_register, self.pia_1_B_register,
+        )
+
+    def get_state(self):
+        return {
+            "registers": [register.get_state() for register in self._get_registers()],
+            "empty_key_toggle": self.empty_key_toggle,
+            "current_input_char": self.current_input_char,
+            "input_repead": self.input_repead,
+        }
+
+    def set_state(self, state):
+        for register, register_state in zip(self._get_registers(), state["registers"]):
+            register.set_state(register_state)
+        self.empty_key_toggle = state["empty_key_toggle"]
+        self.current_input_char = state["current_input_char"]
+        self.input_repead = state["input_repead"]
+
     def internal_reset(self):
         """
         internal state reset.
@@ -18,7 +18,7 @@ import logging
 
 from dragonpy.Dragon32 import dragon_charmap
 from dragonpy.Dragon32.dragon_charmap import get_charmap_dict
-from dragonpy.Dragon32.dragon_font import CHARS_DICT, TkImageFont
+from dragonpy.Dragon32.dragon_font import CHARS_DICT, TkImageFont, get_char_pixel_lines
 
 log = logging.getLogger(__name__)
 
@@ -40,16 +40,22 @@ class MC6847_TextModeCanvas(object):
     Here we only get the "write into Display RAM" information from the CPU-Thread
     from display_queue.
 
-    The Display Tkinter.Canvas() which will be filled with Tkinter.PhotoImage() instances.
-    Every displayed character is a Tkinter.PhotoImage()
+    The complete screen is one Tkinter.PhotoImage() framebuffer on the
+    Tkinter.Canvas(). A changed character line is drawn with one
+    PhotoImage.put() call from the pixel lines of the characters.
+
+    The writes are only collected and flushed at most once per frame.
+    So e.g. scrolling the screen (512 writes) needs only one update
+    and only the character lines that are really changed are drawn.
     """
+    FLUSH_INTERVAL = 20 # ms -> 50Hz
 
     def __init__(self, root):
         self.rows = 32
         self.columns = 16
 
-        scale_factor = 2  # scale the complete Display/Characters
-        self.tk_font = TkImageFont(CHARS_DICT, scale_factor)  # to generate PhotoImage()
+        self.scale_factor = 2  # scale the complete Display/Characters
+        self.tk_font = TkImageFont(CHARS_DICT, self.scale_factor)  # for the character size
 
         self.total_width = self.tk_font.width_scaled * self.rows
         self.total_height = self.tk_font.height_scaled * self.columns
@@ -67,45 +73,90 @@ class MC6847_TextModeCanvas(object):
         # Contains the map from Display RAM value to char/color:
         self.charmap = get_charmap_dict()
 
-        # Cache for the generated Tkinter.PhotoImage() in evry char/color combination:
-        self.image_cache = {}
-
-        # Tkinter.PhotoImage() IDs for image replace with canvas.itemconfigure():
-        self.images_map = {}
-
-        # Create all charachter images on the display and fill self.images_map:
-        self.init_img = self.tk_font.get_char(char="?", color=dragon_charmap.INVERTED)
-        for row in xrange(self.rows + 1):
-            for column in xrange(self.columns + 1):
-                x = self.tk_font.width_scaled * row
-                y = self.tk_font.height_scaled * column
-                image_id = self.canvas.create_image(x, y,
-                    image=self.init_img,
-                    state="normal",
-                    anchor=tkinter.NW  # NW == NorthWest
-                )
-                # log.critical("Image ID: %s at %i x %i", image_id, x, y)
-                self.images_map[(x, y)] = image_id
+        # Cache for the pixel lines (as PhotoImage.put() data) of every value:
+        self.pixel_lines_cache = {}
+
+        # The complete display:
+        self.framebuffer = tkinter.PhotoImage(
+            width=self.total_width,
+            height=self.total_height
+        )
+        self.canvas.create_image(0, 0,
+            image=self.framebuffer,
+            state="normal",
+            anchor=tkinter.NW  # NW == NorthWest
+        )
+
+        # Display RAM position -> value of the writes since the last flush():
+        self.dirty = {}
+        self._flush_after_id = None
+
+        # The values currently on the display, start with "?" on every position:
+        init_value = [
+            value for value, char_info in sorted(self.charmap.items())
+            if char_info == ("?", dragon_charmap.INVERTED)
+        ][0]
+        self.displayed = [init_value] * (self.rows * self.columns)
+        for line in xrange(self.columns):
+            self.draw_line(line)
 
     def write_byte(self, cpu_cycles, op_address, address, value):
         # log.critical(
         #             "%04x| *** Display write $%02x ***%s*** %s at $%04x",
         #             op_address, value, repr(char), color, address
         #         )
-
+        position = address - 0x400
+        if position >= self.rows * self.columns:
+            return # e.g.: $0600 is behind the text screen
+        self.dirty[position] = value
+        if self._flush_after_id is None:
+            self._flush_after_id = self.canvas.after(self.FLUSH_INTERVAL, self.flush)
+
+    def get_pixel_lines(self, value):
+        """
+        Returns the pixel lines of the char/color for the Display RAM value,
+        every line as a string of colors.
+        """
         try:
-            image = self.image_cache[value]
+            return self.pixel_lines_cache[value]
         except KeyError:
-            # Generate a Tkinter.PhotoImage() for the requested char/color
             char, color = self.charmap[value]
-            image = self.tk_font.get_char(char, color)
-            self.image_cache[value] = image
-
-        position = address - 0x400
-        column, row = divmod(position, self.rows)
-        x = self.tk_font.width_scaled * row
-        y = self.tk_font.height_scaled * column
-
-        #         log.critical("replace image %s at %i x %i", image, x, y)
-        image_id = self.images_map[(x, y)]
-        self.canvas.itemconfigure(image_id, image=image)
+            pixel_lines = [
+                " ".join(pixels)
+                for pixels in get_char_pixel_lines(CHARS_DICT, char, color, self.scale_factor)
+            ]
+            self.pixel_lines_cache[value] = pixel_lines
+            return pixel_lines
+
+    def draw_line(self, line):
+        """
+        Draw the complete character line (0-15) into the framebuffer
+        """
+        start = line * self.rows
+        pixel_lines = [
+            self.get_pixel_lines(value)
+            for value in self.displayed[start:start + self.rows]
+        ]
+        data = " ".join(
+            "{%s}" % " ".join(pixel_line)
+            for pixel_line in zip(*pixel_lines)
+        )
+        self.framebuffer.put(data, to=(0, line * self.tk_font.height_scaled))
+
+    def flush(self):
+        """
+        Draw all character lines that are changed since the last flush()
+        """
+        self._flush_after_id = None
+        dirty = self.dirty
+        self.dirty = {}
+
+        displayed = self.displayed
+        changed_lines = set()
+        for position, value in dirty.items():
+            if displayed[position] != value:
+                displayed[position] = value
+                changed_lines.add(position // self.rows)
+
+        for line in sorted(changed_lines):
+            self.draw_line(line)
@@ -49,6 +49,8 @@
 
 import logging
 
+from dragonpy.core.scheduler import get_scheduler
+
 log=logging.getLogger(__name__)
 
 
@@ -65,8 +67,13 @@ class SAM(object):
         self.cpu = cpu
         self.memory = memory
 
+        # Page bit (P1) and map type (TY) for the Dragon 64 RAM banking:
+        self.page_bit = 0
+        self.map_type = 0
+        self._memory_map = (0, 0)
 
-        self.cpu.add_sync_callback(callback_cycles=self.IRQ_CYCLES, callback=self.irq_trigger)
+        self.scheduler = get_scheduler(self.cpu)
+        self.scheduler.schedule(self.IRQ_CYCLES, self.irq_trigger, wakeup=True)
 
         #
         # TODO: Collect this information via a decorator similar to op codes in CPU!
@@ -83,12 +90,12 @@ class SAM(object):
         self.memory.add_write_byte_callback(self.write_display_offset_F4, 0xffce)
         self.memory.add_write_byte_callback(self.write_display_offset_F5, 0xffd0)
         self.memory.add_write_byte_callback(self.write_display_offset_F6, 0xffd2)
-        self.memory.add_write_byte_callback(self.write_page_bit, 0xffd4)
+        self.memory.add_write_byte_callback(self.write_page_bit, 0xffd4, 0xffd5)
         self.memory.add_write_byte_callback(self.write_MPU_rate_bit0, 0xffd6)
         self.memory.add_write_byte_callback(self.write_MPU_rate_bit1, 0xffd8)
         self.memory.add_write_byte_callback(self.write_size_select_bit0, 0xffda)
         self.memory.add_write_byte_callback(self.write_size_select_bit1, 0xffdc)
-        self.memory.add_write_byte_callback(self.write_map_type, 0xffde)
+        self.memory.add_write_byte_callback(self.write_map_type, 0xffde, 0xffdf)
         self.memory.add_write_byte_callback(self.write_map0, 0xffdd)
 
         #  Dragon 64 only:
@@ -98,11 +105,57 @@ class SAM(object):
 
     def reset(self):
         log.critical("TODO: VDG reset")
-
-    def irq_trigger(self, call_cycles):
+        self.page_bit = 0
+        self.map_type = 0
+        self.update_memory_map()
+
+    def get_state(self):
+        return {
+            "page_bit": self.page_bit,
+            "map_type": self.map_type,
+        }
+
+    def set_state(self, state):
+        self.page_bit = state["page_bit"]
+        self.map_type = state["map_type"]
+        self.update_memory_map()
+
+    def update_memory_map(self):
+        """
+        Map the upper 32KB RAM (if exists, e.g.: Dragon 64) via
+        memory.map_pages() -> no memory content will be copied.
+
+        map type 0: $0000-$7fff is the lower RAM or the upper RAM if page bit is set
+                    $8000-$feff is ROM
+        map type 1: $0000-$7fff is the lower RAM
+                    $8000-$feff is the upper RAM
+        """
+        memory_map = (self.map_type, self.page_bit)
+        if memory_map == self._memory_map:
+            return
+        if self.memory.EXTRA_RAM_SIZE < 0x8000:
+            log.debug("No upper 32KB RAM: ignore map type %i page bit %i", self.map_type, self.page_bit)
+            return
+        self._memory_map = memory_map
+
+        # The upper 32KB RAM is stored at $10000 in memory:
+        if self.map_type:
+            self.memory.map_pages(0x00, 0x7f, 0)
+            self.memory.map_pages(0x80, 0xfe, 0x8000)
+        elif self.page_bit:
+            self.memory.map_pages(0x00, 0x7f, 0x10000)
+            self.memory.map_pages(0x80, 0xfe, 0)
+        else:
+            self.memory.map_pages(0x00, 0x7f, 0)
+            self.memory.map_pages(0x80, 0xfe, 0)
+        log.info("SAM: map type %i page bit %i", self.map_type, self.page_bit)
+
+    def irq_trigger(self, due_cycles):
 #        log.critical("%04x| SAM irq trigger called %i cycles to late",
-#            self.cpu.last_op_address, call_cycles - self.IRQ_CYCLES
+#            self.cpu.last_op_address, self.cpu.cycles - due_cycles
 #        )
+        # Schedule relative to the due cycles, so the IRQ doesn't drift:
+        self.scheduler.schedule_at(due_cycles + self.IRQ_CYCLES, self.irq_trigger, wakeup=True)
         self.cpu.irq()
 
     def interrupt_vectors(self, cpu_cycles, op_address, address):
@@ -154,7 +207,11 @@ class SAM(object):
         log.debug("TODO: write display_offset_F6 $%02x to $%04x", value, address)
 
     def write_page_bit(self, cpu_cycles, op_address, address, value):
-        log.debug("TODO: write page_bit $%02x to $%04x", value, address)
+        """
+        $ffd4 clear / $ffd5 set the page bit (P1)
+        """
+        self.page_bit = address & 0x01
+        self.update_memory_map()
 
     def write_MPU_rate_bit0(self, cpu_cycles, op_address, address, value):
         log.debug("TODO: write MPU_rate_bit0 $%02x to $%04x", value, address)
@@ -169,7 +226,11 @@ class SAM(object):
         log.debug("TODO: write size_select_bit1 $%02x to $%04x", value, address)
 
     def write_map_type(self, cpu_cycles, op_address, address, value):
-        log.debug("TODO: write map_type $%02x to $%04x", value, address)
+        """
+        $ffde clear / $ffdf set the map type (TY)
+        """
+        self.map_type = address & 0x01
+        self.update_memory_map()
 
     def write_map0(self, cpu_cycles, op_address, address, value):
         log.debug("TODO: write map0 $%02x to $%04x", value, address)
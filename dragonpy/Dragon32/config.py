@@ -18,9 +18,9 @@ import six
 xrange = six.moves.xrange
 
 from dragonlib.api import Dragon32API
-from dragonpy.Dragon32.keyboard_map import get_dragon_keymatrix_pia_result
+from dragonpy.Dragon32.keyboard_map import add_to_input_queue, get_dragon_keymatrix_pia_result
 from dragonpy.Dragon32.mem_info import get_dragon_meminfo
-from dragonpy.core.configs import BaseConfig, DRAGON32
+from dragonpy.core.configs import BaseConfig, DRAGON32, DummyMemInfo
 from dragonpy.Dragon32.Dragon32_rom import Dragon32Rom
 
 
@@ -72,6 +72,17 @@ class Dragon32Cfg(BaseConfig):
     # for unittests init:
     STARTUP_END_ADDR = 0xbbe5 # scan keyboard
 
+    IDLE_PCS = (
+        0xbbe5, # %INCH% Scans keyboard, called via [$a000] while waiting for a key
+    )
+
+    BASIC_CURRENT_LINE_ADDR = 0x68 # Current Line number (0xffff in direct mode)
+
+    LINE_INPUT_ADDR = 0xb5c6 # command mode line input from DEVN
+    INCH_ADDR = 0xbbe5 # %INCH% Scans keyboard, returns char in A
+    LINE_INPUT_BUFFER_ADDR = 0x2dd # BASIC line input buffer
+    DEVICE_NUMBER_ADDR = 0x6f # %DEVNUM% 0x00 == VDU screen / keyboard
+
     def __init__(self, cmd_args):
         super(Dragon32Cfg, self).__init__(cmd_args)
 
@@ -93,6 +104,11 @@ class Dragon32Cfg(BaseConfig):
             # (0x0112, 0x0113): (self.timer_value_read_word, self.timer_value_write_word),
         }
 
+    def get_mem_info(self):
+        if isinstance(self.mem_info, DummyMemInfo):
+            self.mem_info = get_dragon_meminfo()
+        return self.mem_info
+
     def keyboard_matrix_state(self, cpu, addr, value):
         log.critical(
             "%04x|      Set keyboard matrix state $%04x to $%02x %s\t\t\t|%s",
@@ -152,6 +168,9 @@ class Dragon32Cfg(BaseConfig):
     def pia_keymatrix_result(self, inkey, pia0b):
         return get_dragon_keymatrix_pia_result(inkey, pia0b)
 
+    def add_to_input_queue(self, user_input_queue, txt):
+        add_to_input_queue(user_input_queue, txt)
+
 config = Dragon32Cfg
 
 
@@ -1230,6 +1230,42 @@ CHARS_DICT = {
 
 
 
+def get_char_pixel_lines(chars_dict, char, color, scale_factor):
+    """
+    Returns the scaled character as a list of pixel lines.
+    Every line is a list of "#rrggbb" colors, usable for PhotoImage.put()
+
+    >>> lines = get_char_pixel_lines({"X": ("X.", "..")}, "X", NORMAL, 2)
+    >>> len(lines)
+    4
+    >>> lines[0]
+    ['#004100', '#004100', '#00ff00', '#00ff00']
+    >>> lines[0] == lines[1] and lines[2] == lines[3]
+    True
+    >>> lines[2]
+    ['#00ff00', '#00ff00', '#00ff00', '#00ff00']
+    """
+    try:
+        char_data = chars_dict[char]
+    except KeyError:
+        log.log(99, "Error: character %s is not in CHARS_DICT !", repr(char))
+        char_data = chars_dict["?"]
+
+    foreground, background = get_hex_color(color)
+    colors = {
+        BACKGROUND_CHAR: "#%s" % background,
+        FOREGROUND_CHAR: "#%s" % foreground,
+    }
+
+    lines = []
+    for line in char_data:
+        pixels = []
+        for bit in line:
+            pixels += [colors[bit]] * scale_factor
+        lines += [pixels] * scale_factor
+    return lines
+
+
 class TkImageFont(object):
     """
     Important is that image must be bind to a object, without:
@@ -54,6 +54,18 @@ class Dragon32PeripheryBase(object):
         self.pia.reset()
         self.pia.internal_reset()
 
+    def get_state(self):
+        return {
+            "kbd": self.kbd,
+            "sam": self.sam.get_state(),
+            "pia": self.pia.get_state(),
+        }
+
+    def set_state(self, state):
+        self.kbd = state["kbd"]
+        self.sam.set_state(state["sam"])
+        self.pia.set_state(state["pia"])
+
     def no_dos_rom(self, cpu_cycles, op_address, address):
         log.error("%04x| TODO: DOS ROM requested. Send 0x00 back", op_address)
         return 0x00
@@ -69,12 +81,21 @@ class Dragon32PeripheryBase(object):
 class Dragon32Periphery(Dragon32PeripheryBase):
     def __init__(self, cfg, cpu, memory, display_callback, user_input_queue):
         super(Dragon32Periphery, self).__init__(cfg, cpu, memory, user_input_queue)
+        self.display_callback = display_callback
 
         # redirect writes to display RAM area 0x0400-0x0600 into display_queue:
         self.memory.add_write_byte_middleware(
             display_callback, 0x0400, 0x0600
         )
 
+    def set_state(self, state):
+        super(Dragon32Periphery, self).set_state(state)
+
+        # Redraw the display from the (restored) display RAM:
+        display_ram = bytearray(self.memory.read_block(0x0400, 0x0600))
+        for address, value in enumerate(display_ram, 0x0400):
+            self.display_callback(self.cpu.cycles, self.cpu.last_op_address, address, value)
+
 
 class Dragon32PeripheryUnittest(Dragon32PeripheryBase):
     def __init__(self, cfg, cpu, memory, display_callback, user_input_queue):
@@ -88,6 +109,10 @@ class Dragon32PeripheryUnittest(Dragon32PeripheryBase):
         # Contains the map from Display RAM value to char/color:
         self.charmap = get_charmap_dict()
 
+        self.old_columns = None
+        self.output_lines = [""]
+        self.display_buffer = {}
+
         # redirect writes to display RAM area 0x0400-0x0600 into display_queue:
         self.memory.add_write_byte_middleware(
             self.to_line_buffer, 0x0400, 0x0600
@@ -100,6 +125,19 @@ class Dragon32PeripheryUnittest(Dragon32PeripheryBase):
         self.output_lines = [""] # for unittest run_until_OK()
         self.display_buffer = {} # for striped_output()
 
+    def get_state(self):
+        state = super(Dragon32PeripheryUnittest, self).get_state()
+        state["output_lines"] = list(self.output_lines)
+        state["display_buffer"] = dict(self.display_buffer)
+        state["old_columns"] = self.old_columns
+        return state
+
+    def set_state(self, state):
+        super(Dragon32PeripheryUnittest, self).set_state(state)
+        self.output_lines = list(state["output_lines"])
+        self.display_buffer = dict(state["display_buffer"])
+        self.old_columns = state["old_columns"]
+
     def add_to_input_queue(self, txt):
         assert "\n" not in txt, "remove all \\n in unittests! Use only \\r as Enter!"
         add_to_input_queue(self.user_input_queue, txt)
@@ -20,7 +20,7 @@ xrange = six.moves.xrange
 from dragonpy.Dragon32.config import Dragon32Cfg
 from dragonpy.Dragon64.mem_info import get_dragon_meminfo
 from dragonpy.Dragon64.Dragon64_rom import Dragon64RomIC17, Dragon64RomIC18
-from dragonpy.core.configs import DRAGON64
+from dragonpy.core.configs import DRAGON64, DummyMemInfo
 
 
 class Dragon64Cfg(Dragon32Cfg):
@@ -41,6 +41,9 @@ class Dragon64Cfg(Dragon32Cfg):
 #     RAM_END = 0x3FFF # 16KB # usable
     RAM_END = 0x7FFF # 32KB
 
+    # The upper 32KB RAM, mapped in via SAM page bit / map type
+    EXTRA_RAM_SIZE = 0x8000
+
     ROM_START = 0x8000
     ROM_END = 0xFFFF
     # ROM size: 0x8000 == 32768 Bytes
@@ -62,6 +65,11 @@ class Dragon64Cfg(Dragon32Cfg):
 
         self.periphery_class = None# Dragon32Periphery
 
+    def get_mem_info(self):
+        if isinstance(self.mem_info, DummyMemInfo):
+            self.mem_info = get_dragon_meminfo()
+        return self.mem_info
+
     def get_initial_RAM(self):
         """
         init the Dragon RAM
@@ -102,12 +102,24 @@ class Simple6809PeripheryUnittest(Simple6809Periphery):
     def __init__(self, *args, **kwargs):
         super(Simple6809PeripheryUnittest, self).__init__(*args, **kwargs)
         self.display_callback = self._to_output
+        self.output = ""
+        self.output_len = 0
 
     def setUp(self):
         self.user_input_queue.queue.clear()
         self.output = "" # for unittest run_until_OK()
         self.output_len = 0
 
+    def get_state(self):
+        return {
+            "output": self.output,
+            "output_len": self.output_len,
+        }
+
+    def set_state(self, state):
+        self.output = state["output"]
+        self.output_len = state["output_len"]
+
     def add_to_input_queue(self, txt):
         log.debug("Add %s to input queue.", repr(txt))
         for char in txt:
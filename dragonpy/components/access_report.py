@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Report invalid memory accesses
+    =========================================
+
+    Invalid memory accesses (e.g.: writes into ROM) are counted per
+    address and op address. The aggregated counts are logged
+    periodically or on demand, instead of logging every access.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import logging
+import time
+
+from dragonpy.core.configs import DummyMemInfo
+
+log = logging.getLogger(__name__)
+
+
+WRITE_INTO_ROM = "writing into ROM ignored"
+READ_OUTSIDE = "reading outside memory area"
+WRITE_OUTSIDE = "writing outside RAM/ROM"
+
+
+class InvalidMemoryAccess(RuntimeError):
+    pass
+
+
+class InvalidAccessReport(object):
+    """
+    >>> report = InvalidAccessReport(mem_info=None)
+    >>> report.add(WRITE_INTO_ROM, 0xc000, 0x1234)
+    >>> report.add(WRITE_INTO_ROM, 0xc000, 0x1234)
+    >>> report.get_lines()
+    ['1234| writing into ROM ignored at $c000 (2 times)']
+    >>> report.flush()
+    >>> report.get_lines()
+    []
+
+    >>> report = InvalidAccessReport(mem_info=None, strict=True)
+    >>> try:
+    ...     report.add(READ_OUTSIDE, 0x10000, 0x1234)
+    ... except InvalidMemoryAccess as err:
+    ...     print(err)
+    1234| reading outside memory area at $10000
+    """
+    FLUSH_INTERVAL = 5 # Sec.
+
+    # Invalid accesses can happen in a tight loop, so the time
+    # is only checked after this number of accesses:
+    CHECK_INTERVAL = 1000
+
+    def __init__(self, mem_info, strict=False):
+        if isinstance(mem_info, DummyMemInfo):
+            mem_info = None
+        self.mem_info = mem_info
+        self.strict = strict
+        self.counts = collections.Counter()
+        self.next_flush = time.time() + self.FLUSH_INTERVAL
+        self._next_check = self.CHECK_INTERVAL
+
+    def add(self, kind, address, op_address):
+        if self.strict:
+            raise InvalidMemoryAccess("%04x| %s at $%04x" % (op_address, kind, address))
+
+        self.counts[(kind, address, op_address)] += 1
+
+        self._next_check -= 1
+        if self._next_check > 0:
+            return
+        self._next_check = self.CHECK_INTERVAL
+
+        now = time.time()
+        if now > self.next_flush:
+            self.next_flush = now + self.FLUSH_INTERVAL
+            self.flush()
+
+    def get_lines(self):
+        lines = []
+        for (kind, address, op_address), count in sorted(self.counts.items()):
+            line = "%04x| %s at $%04x (%i times)" % (op_address, kind, address, count)
+            if self.mem_info is not None:
+                line = "%s | %s" % (line, self.mem_info.get_shortest(address))
+            lines.append(line)
+        return lines
+
+    def flush(self):
+        """
+        Log all counted accesses and reset the counters.
+        """
+        for line in self.get_lines():
+            log.critical(line)
+        self.counts.clear()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Address range registry
+    =================================
+
+    Store memory callbacks/middlewares as sorted address ranges
+    instead of one dict entry per address.
+
+    For fast lookups, the ranges are compiled into a per-page table:
+    Pages without any range are None, all other pages contains
+    a list with one entry (the function or None) per address.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+import six
+xrange = six.moves.xrange
+
+import bisect
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+PAGE_SIZE = 0x100 # Bytes per page
+PAGE_COUNT = 0x100 # Pages in the 64K address space
+
+
+class AddressOverlapError(ValueError):
+    pass
+
+
+class AddressRangeRegistry(object):
+    """
+    >>> def func(): pass
+    >>> registry = AddressRangeRegistry("test")
+    >>> registry.add(func, 0xd000, 0xdfff)
+    >>> registry.get(0xd123) is func
+    True
+    >>> registry.get(0xe000) is None
+    True
+    >>> registry.pages[0xd0] is None, registry.pages[0xe0] is None
+    (False, True)
+    >>> registry.remove(0xd000, 0xdfff) is func
+    True
+    >>> registry.pages[0xd0] is None
+    True
+    """
+    def __init__(self, name):
+        self.name = name
+
+        # sorted list of (start_addr, end_addr, func) without overlaps:
+        self._ranges = []
+        self._start_addresses = [] # used for bisect
+
+        # Compiled lookup table. One more "guard" page for address $10000
+        self.pages = [None] * (PAGE_COUNT + 1)
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def __iter__(self):
+        return iter(self._ranges)
+
+    def __repr__(self):
+        return "<%s %r: %s>" % (
+            self.__class__.__name__, self.name,
+            ", ".join(["$%04x-$%04x" % (start, end) for start, end, __ in self._ranges])
+        )
+
+    def get(self, address):
+        """
+        Returns the function for the given address or None
+        """
+        page = self.pages[address >> 8]
+        if page is None:
+            return None
+        return page[address & 0xff]
+
+    def get_overlaps(self, start_addr, end_addr):
+        """
+        Returns all existing ranges that overlaps with the given range.
+        """
+        # Only the range before start_addr can reach into the given range:
+        index = max(bisect.bisect_right(self._start_addresses, start_addr) - 1, 0)
+        overlaps = []
+        for range_start, range_end, func in self._ranges[index:]:
+            if range_start > end_addr:
+                break
+            if range_end >= start_addr:
+                overlaps.append((range_start, range_end, func))
+        return overlaps
+
+    def _check_range(self, start_addr, end_addr):
+        if end_addr is None:
+            end_addr = start_addr
+
+        if not (0x0000 <= start_addr <= end_addr <= 0xffff):
+            raise ValueError("Invalid address range $%04x-$%04x for %s" % (
+                start_addr, end_addr, self.name
+            ))
+        return start_addr, end_addr
+
+    def add(self, func, start_addr, end_addr=None):
+        start_addr, end_addr = self._check_range(start_addr, end_addr)
+
+        overlaps = self.get_overlaps(start_addr, end_addr)
+        if overlaps:
+            raise AddressOverlapError(
+                "%s: $%04x-$%04x for %r overlaps with: %s" % (
+                    self.name, start_addr, end_addr, func,
+                    ", ".join([
+                        "$%04x-$%04x %r" % (start, end, existing_func)
+                        for start, end, existing_func in overlaps
+                    ])
+                )
+            )
+
+        index = bisect.bisect_right(self._start_addresses, start_addr)
+        self._start_addresses.insert(index, start_addr)
+        self._ranges.insert(index, (start_addr, end_addr, func))
+
+        self._compile(start_addr >> 8, end_addr >> 8)
+
+    def remove(self, start_addr, end_addr=None):
+        """
+        Remove the range that was registered with the same start/end address.
+        """
+        start_addr, end_addr = self._check_range(start_addr, end_addr)
+        index = bisect.bisect_left(self._start_addresses, start_addr)
+        try:
+            range_start, range_end, func = self._ranges[index]
+        except IndexError:
+            range_start = range_end = None
+
+        if range_start != start_addr or range_end != end_addr:
+            raise KeyError("%s: $%04x-$%04x not registered." % (self.name, start_addr, end_addr))
+
+        del self._start_addresses[index]
+        del self._ranges[index]
+
+        self._compile(start_addr >> 8, end_addr >> 8)
+        return func
+
+    def _compile(self, start_page, end_page):
+        """
+        Rebuild the lookup table for the given pages.
+        """
+        for page in xrange(start_page, end_page + 1):
+            page_start = page * PAGE_SIZE
+            page_end = page_start + PAGE_SIZE - 1
+
+            overlaps = self.get_overlaps(page_start, page_end)
+            if not overlaps:
+                self.pages[page] = None
+                continue
+
+            page_table = [None] * PAGE_SIZE
+            for range_start, range_end, func in overlaps:
+                start = max(range_start, page_start) - page_start
+                end = min(range_end, page_end) - page_start
+                page_table[start:end + 1] = [func] * (end - start + 1)
+            self.pages[page] = page_table
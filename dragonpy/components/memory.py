@@ -23,17 +23,27 @@ from __future__ import absolute_import, division, print_function
 import six
 xrange = six.moves.xrange
 
-import array
 import os
 import sys
 import logging
 
 import six
 from dragonlib.utils.logging_utils import log_hexlist
+from dragonpy.components.access_report import InvalidAccessReport, \
+    READ_OUTSIDE, WRITE_INTO_ROM, WRITE_OUTSIDE
+from dragonpy.components.address_registry import AddressRangeRegistry, \
+    PAGE_COUNT, PAGE_SIZE
 
 
 log = logging.getLogger(__name__)
 
+# Page types in the page tables:
+PAGE_RAM = 0 # plain RAM: read/write directly from/into the array
+PAGE_ROM = 1 # ROM: read directly, writes are ignored
+PAGE_IO = 2 # callbacks or middlewares exists for (some) addresses in the page
+PAGE_TRAP = 3 # plain RAM, but the next write must go through the slow path
+PAGE_BANKED = 4 # plain RAM, mapped to another address, see: map_pages()
+
 
 class Memory(object):
     def __init__(self, cfg, read_bus_request_queue=None, read_bus_response_queue=None, write_bus_queue=None):
@@ -67,23 +77,70 @@ class Memory(object):
 #        self._mem = bytearray(self.cfg.MEMORY_SIZE)
 
         # array consumes also less RAM than lists and it's a little bit faster:
-        self._mem = array.array("B", [0x00] * self.INTERNAL_SIZE) # unsigned char
+#        self._mem = array.array("B", [0x00] * self.INTERNAL_SIZE) # unsigned char
+
+        # Today bytearray is faster than array and it supports memoryview
+        # with Python 2 and 3, used for the block access, see: view()
+        #
+        # Additional RAM (e.g.: upper 32KB of the Dragon 64) is stored behind
+        # the 64KB address space and can be mapped in via map_pages()
+        self.EXTRA_RAM_SIZE = self.cfg.EXTRA_RAM_SIZE
+        self._mem = bytearray(self.INTERNAL_SIZE + self.EXTRA_RAM_SIZE)
+
+        # Offset into self._mem for every page, see: map_pages()
+        self._page_offsets = [0] * (PAGE_COUNT + 1)
+        self._banked = False
+
+        # Functions that wrap the slow path, see: add_access_wrapper()
+        self._access_wrappers = []
+
+        # Aggregate invalid accesses, e.g.: writes into ROM
+        self.access_report = InvalidAccessReport(
+            self.cfg.mem_info, strict=self.cfg.strict_memory_access
+        )
+
+        # Dirty flag for every page of the internal memory (if activated),
+        # see: enable_dirty_tracking()
+        self._dirty_pages = None
+
+        # Page contents of the last taken/restored snapshot, see: take_snapshot()
+        self._snapshot_pages = None
 
         if cfg and cfg.rom_cfg:
             for romfile in cfg.rom_cfg:
                 self.load_file(romfile)
 
-        self._read_byte_callbacks = {}
-        self._read_word_callbacks = {}
-        self._write_byte_callbacks = {}
-        self._write_word_callbacks = {}
+        # The page tables contains for every 256 Bytes page the PAGE_* type.
+        # So read_byte()/write_byte() can access plain RAM directly without
+        # any dict lookup.
+        # The last entry is a "guard" page for the address $10000
+        # (e.g.: read_word($ffff)) which will be always handled in the slow path.
+        self._read_page_types = [PAGE_RAM] * PAGE_COUNT + [PAGE_IO]
+        self._write_page_types = [PAGE_RAM] * PAGE_COUNT + [PAGE_IO]
+        self._read_word_page_types = [PAGE_RAM] * PAGE_COUNT + [PAGE_IO]
+        self._write_word_page_types = [PAGE_RAM] * PAGE_COUNT + [PAGE_IO]
+        for page in xrange(self.cfg.ROM_START >> 8, (self.cfg.ROM_END >> 8) + 1):
+            self._write_page_types[page] = PAGE_ROM
+
+        self._read_byte_callbacks = AddressRangeRegistry("read byte callbacks")
+        self._read_word_callbacks = AddressRangeRegistry("read word callbacks")
+        self._write_byte_callbacks = AddressRangeRegistry("write byte callbacks")
+        self._write_word_callbacks = AddressRangeRegistry("write word callbacks")
 
         # Memory middlewares are function that called on memory read or write
         # the function can change the value that is read/write
         #
         # init read/write byte middlewares:
-        self._read_byte_middleware = {}
-        self._write_byte_middleware = {}
+        self._read_byte_middleware = AddressRangeRegistry("read byte middleware")
+        self._write_byte_middleware = AddressRangeRegistry("write byte middleware")
+        self._read_word_middleware = AddressRangeRegistry("read word middleware")
+        self._write_word_middleware = AddressRangeRegistry("write word middleware")
+
+        # Watchers are called on memory read or write, but can't change
+        # the value, e.g.: for watchpoints, see: add_read_byte_watcher()
+        self._read_byte_watchers = AddressRangeRegistry("read byte watchers")
+        self._write_byte_watchers = AddressRangeRegistry("write byte watchers")
+
         for addr_range, functions in list(cfg.memory_byte_middlewares.items()):
             start_addr, end_addr = addr_range
             read_func, write_func = functions
@@ -95,8 +152,6 @@ class Memory(object):
                 self.add_write_byte_middleware(write_func, start_addr, end_addr)
 
         # init read/write word middlewares:
-        self._read_word_middleware = {}
-        self._write_word_middleware = {}
         for addr_range, functions in list(cfg.memory_word_middlewares.items()):
             start_addr, end_addr = addr_range
             read_func, write_func = functions
@@ -127,12 +182,302 @@ class Memory(object):
 
     #---------------------------------------------------------------------------
 
-    def _map_address_range(self, callbacks_dict, callback_func, start_addr, end_addr=None):
+    def _map_address_range(self, registry, callback_func, start_addr, end_addr=None):
+        if not callable(callback_func):
+            raise TypeError("%s: %r for $%04x is not callable!" % (
+                registry.name, callback_func, start_addr
+            ))
+        registry.add(callback_func, start_addr, end_addr)
         if end_addr is None:
-            callbacks_dict[start_addr] = callback_func
+            end_addr = start_addr
+        self._update_page_types(start_addr >> 8, end_addr >> 8)
+
+    def _unmap_address_range(self, registry, start_addr, end_addr=None):
+        callback_func = registry.remove(start_addr, end_addr)
+        if end_addr is None:
+            end_addr = start_addr
+        self._update_page_types(start_addr >> 8, end_addr >> 8)
+        return callback_func
+
+    def _has_handlers(self, page, *registries):
+        for registry in registries:
+            if registry.pages[page] is not None:
+                return True
+        return False
+
+    def _update_page_types(self, start_page, end_page):
+        """
+        Set the PAGE_* type of the given pages in all page tables.
+        Must be called after every callback/middleware change.
+        With access wrappers, all byte accesses go through the slow path.
+        """
+        wrapped = bool(self._access_wrappers)
+        for page in xrange(start_page, end_page + 1):
+            if wrapped or self._has_handlers(page,
+                    self._read_byte_callbacks, self._read_byte_middleware,
+                    self._read_byte_watchers):
+                self._read_page_types[page] = PAGE_IO
+            elif self._page_offsets[page]:
+                self._read_page_types[page] = PAGE_BANKED
+            else:
+                self._read_page_types[page] = PAGE_RAM
+
+            if wrapped or self._has_handlers(page,
+                    self._write_byte_callbacks, self._write_byte_middleware,
+                    self._write_byte_watchers):
+                self._write_page_types[page] = PAGE_IO
+            elif self._is_rom_page(page):
+                self._write_page_types[page] = PAGE_ROM
+            elif self._dirty_pages is not None and not self._dirty_pages[self._get_physical_page(page)]:
+                # Trap the first write to mark the page as dirty
+                self._write_page_types[page] = PAGE_TRAP
+            elif self._page_offsets[page]:
+                self._write_page_types[page] = PAGE_BANKED
+            else:
+                self._write_page_types[page] = PAGE_RAM
+
+            if self._has_handlers(page, self._read_word_callbacks):
+                self._read_word_page_types[page] = PAGE_IO
+            else:
+                self._read_word_page_types[page] = PAGE_RAM
+
+            if self._has_handlers(page, self._write_word_callbacks, self._write_word_middleware):
+                self._write_word_page_types[page] = PAGE_IO
+            else:
+                self._write_word_page_types[page] = PAGE_RAM
+
+    def _is_rom_page(self, page):
+        """
+        True if the page is (partial) in the ROM area.
+        Writes into partial ROM pages are checked in _write_byte_slow()
+        Pages that are mapped into the extra RAM are never ROM.
+        """
+        if self._page_offsets[page]:
+            return False
+        start_addr = page * PAGE_SIZE
+        end_addr = start_addr + PAGE_SIZE - 1
+        return start_addr <= self.cfg.ROM_END and end_addr >= self.cfg.ROM_START
+
+    def map_pages(self, start_page, end_page, offset):
+        """
+        Map the pages start_page..end_page to the internal memory at
+        address + offset. Used for RAM bank switching, e.g.: Dragon 64 SAM.
+
+        Only the page tables are changed, no memory content will be copied.
+        The mapped pages get the PAGE_BANKED type, so read_byte()/write_byte()
+        add the offset. Unmapped pages have no overhead.
+        """
+        start_addr = start_page * PAGE_SIZE
+        end_addr = (end_page + 1) * PAGE_SIZE
+        if not (0 <= start_addr + offset and end_addr + offset <= len(self._mem)):
+            raise IndexError("Can't map pages $%02x-$%02x with offset $%x: Internal memory is only $%x Bytes" % (
+                start_page, end_page, offset, len(self._mem)
+            ))
+        self._page_offsets[start_page:end_page + 1] = [offset] * (end_page - start_page + 1)
+        self._update_page_types(start_page, end_page)
+
+        self._banked = any(self._page_offsets)
+
+    def add_access_wrapper(self, wrapper):
+        """
+        Add a function that wraps the byte access, e.g.: for statistics.
+        Will be called with the current slow path functions
+        _read_byte_io(address) and _write_byte_slow(address, value)
+        and must return the new ones.
+
+        While wrappers exists, all pages are handled in the slow path.
+        The CPU binds memory.write_byte() at creation, so wrapping
+        read_byte()/write_byte() self would miss the CPU writes.
+        Normal memory access has no overhead, if no wrapper exists.
+        """
+        self._access_wrappers.append(wrapper)
+        self._update_page_types(0, PAGE_COUNT - 1)
+        self._update_slow_path_methods()
+
+    def remove_access_wrapper(self, wrapper):
+        self._access_wrappers.remove(wrapper)
+        self._update_page_types(0, PAGE_COUNT - 1)
+        self._update_slow_path_methods()
+
+    def _update_slow_path_methods(self):
+        """
+        Install _read_byte_io()/_write_byte_slow() on the instance only if
+        watchers or access wrappers exists: The normal slow path for pages
+        with callbacks/middlewares has no overhead.
+        """
+        cls = self.__class__
+        if len(self._read_byte_watchers):
+            read_byte_io = self._read_byte_io_watched
         else:
-            for addr in xrange(start_addr, end_addr + 1):
-                callbacks_dict[addr] = callback_func
+            read_byte_io = cls._read_byte_io.__get__(self)
+
+        if len(self._write_byte_watchers):
+            write_byte_slow = self._write_byte_slow_watched
+        else:
+            write_byte_slow = cls._write_byte_slow.__get__(self)
+
+        for wrapper in self._access_wrappers:
+            read_byte_io, write_byte_slow = wrapper(read_byte_io, write_byte_slow)
+
+        if read_byte_io == cls._read_byte_io.__get__(self):
+            self.__dict__.pop("_read_byte_io", None)
+        else:
+            self._read_byte_io = read_byte_io
+
+        if write_byte_slow == cls._write_byte_slow.__get__(self):
+            self.__dict__.pop("_write_byte_slow", None)
+        else:
+            self._write_byte_slow = write_byte_slow
+
+    def _read_byte_io_watched(self, address):
+        byte = self.__class__._read_byte_io(self, address)
+        watcher_func = self._read_byte_watchers.get(address)
+        if watcher_func is not None:
+            watcher_func(self.cpu.cycles, self.cpu.last_op_address, address, byte)
+        return byte
+
+    def _write_byte_slow_watched(self, address, value):
+        # Called before the write, so the watcher can read the old value:
+        watcher_func = self._write_byte_watchers.get(address)
+        if watcher_func is not None:
+            watcher_func(self.cpu.cycles, self.cpu.last_op_address, address, value)
+        return self.__class__._write_byte_slow(self, address, value)
+
+    def has_io_callback(self, address):
+        """
+        True if a read or write byte callback is registered for the address.
+        (Most I/O registers are implemented as callbacks)
+        """
+        return (
+            self._read_byte_callbacks.get(address) is not None
+            or self._write_byte_callbacks.get(address) is not None
+        )
+
+    def _get_physical_page(self, page):
+        return page + (self._page_offsets[page] >> 8)
+
+    #---------------------------------------------------------------------------
+
+    def enable_dirty_tracking(self):
+        """
+        Mark every page of the internal memory that is written as dirty.
+        All pages are clean after activation.
+
+        Only the first write into a clean page will go through the slow path.
+        Reads are not affected.
+        Note: Writes via view() are not tracked!
+        """
+        self._dirty_pages = bytearray(len(self._mem) // PAGE_SIZE)
+        self._snapshot_pages = None
+        self._update_page_types(0, PAGE_COUNT - 1)
+
+    def disable_dirty_tracking(self):
+        self._dirty_pages = None
+        self._snapshot_pages = None
+        self._update_page_types(0, PAGE_COUNT - 1)
+
+    def get_dirty_pages(self, clear=False):
+        """
+        Returns a sorted list of the dirty page numbers of the internal
+        memory. Note: Pages >=$100 are the extra RAM, see: map_pages()
+        """
+        if self._dirty_pages is None:
+            raise RuntimeError("Dirty tracking is not enabled!")
+        dirty_pages = [page for page, dirty in enumerate(self._dirty_pages) if dirty]
+        if clear:
+            self.clear_dirty_pages()
+        return dirty_pages
+
+    def clear_dirty_pages(self):
+        if self._dirty_pages is None:
+            raise RuntimeError("Dirty tracking is not enabled!")
+        self._dirty_pages[:] = bytearray(len(self._dirty_pages))
+        self._update_page_types(0, PAGE_COUNT - 1)
+
+    #---------------------------------------------------------------------------
+
+    def take_snapshot(self):
+        """
+        Returns a tuple with the content of every page of the internal memory.
+
+        Pages that are not changed since the last taken/restored snapshot
+        are shared between the snapshots (copy-on-write). With dirty
+        tracking only the dirty pages are compared, see:
+        enable_dirty_tracking()
+        """
+        page_count = len(self._mem) // PAGE_SIZE
+        if self._snapshot_pages is None:
+            pages = [None] * page_count
+            changed_pages = xrange(page_count)
+        else:
+            pages = list(self._snapshot_pages)
+            if self._dirty_pages is None:
+                changed_pages = xrange(page_count)
+            else:
+                changed_pages = self.get_dirty_pages()
+
+        mem = self._mem
+        for page in changed_pages:
+            start = page * PAGE_SIZE
+            data = bytes(mem[start:start + PAGE_SIZE])
+            if data != pages[page]:
+                pages[page] = data
+
+        self._snapshot_pages = tuple(pages)
+        if self._dirty_pages is not None:
+            self.clear_dirty_pages()
+        return self._snapshot_pages
+
+    def restore_snapshot(self, pages):
+        """
+        Restore the memory from a take_snapshot() result.
+        With dirty tracking only pages that are different will be copied.
+        """
+        if len(pages) != len(self._mem) // PAGE_SIZE:
+            raise ValueError("Snapshot with %i pages doesn't fit into memory with %i pages" % (
+                len(pages), len(self._mem) // PAGE_SIZE
+            ))
+
+        dirty_pages = self._dirty_pages
+        current_pages = self._snapshot_pages
+        for page, data in enumerate(pages):
+            if dirty_pages is None or current_pages is None \
+                    or dirty_pages[page] or data is not current_pages[page]:
+                start = page * PAGE_SIZE
+                self._mem[start:start + PAGE_SIZE] = data
+
+        self._snapshot_pages = pages
+        if dirty_pages is not None:
+            self.clear_dirty_pages()
+
+    def _mark_dirty(self, address):
+        page = address >> 8
+        self._dirty_pages[self._get_physical_page(page)] = 1
+        if self._write_page_types[page] == PAGE_TRAP:
+            self._write_page_types[page] = PAGE_BANKED if self._page_offsets[page] else PAGE_RAM
+
+    def _mark_dirty_block(self, start, end, physical=False):
+        """
+        Mark the pages of the block start..end (without end) as dirty.
+        """
+        if self._dirty_pages is None or start >= end:
+            return
+        start_page = start >> 8
+        end_page = (end - 1) >> 8
+        if physical:
+            self._dirty_pages[start_page:end_page + 1] = b"\x01" * (end_page - start_page + 1)
+            # The written pages may be mapped anywhere:
+            self._update_page_types(0, PAGE_COUNT - 1)
+        else:
+            for page in xrange(start_page, end_page + 1):
+                self._mark_dirty(page * PAGE_SIZE)
+
+    def get_page_type(self, address):
+        """
+        Returns the PAGE_* types for reading and writing the given address.
+        """
+        page = address >> 8
+        return self._read_page_types[page], self._write_page_types[page]
 
     #---------------------------------------------------------------------------
 
@@ -162,6 +507,58 @@ class Memory(object):
     def add_write_word_middleware(self, callback_func, start_addr, end_addr=None):
         self._map_address_range(self._write_word_middleware, callback_func, start_addr, end_addr)
 
+    def add_read_byte_watcher(self, callback_func, start_addr, end_addr=None):
+        """
+        callback_func(cycles, last_op_address, address, byte) is called
+        after every byte read in the address range (incl. opcode fetches)
+        """
+        self._map_address_range(self._read_byte_watchers, callback_func, start_addr, end_addr)
+        self._update_slow_path_methods()
+
+    def add_write_byte_watcher(self, callback_func, start_addr, end_addr=None):
+        """
+        callback_func(cycles, last_op_address, address, value) is called
+        before every byte write in the address range.
+        """
+        self._map_address_range(self._write_byte_watchers, callback_func, start_addr, end_addr)
+        self._update_slow_path_methods()
+
+    #---------------------------------------------------------------------------
+
+    def remove_read_byte_callback(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._read_byte_callbacks, start_addr, end_addr)
+
+    def remove_read_word_callback(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._read_word_callbacks, start_addr, end_addr)
+
+    def remove_write_byte_callback(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._write_byte_callbacks, start_addr, end_addr)
+
+    def remove_write_word_callback(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._write_word_callbacks, start_addr, end_addr)
+
+    def remove_read_byte_middleware(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._read_byte_middleware, start_addr, end_addr)
+
+    def remove_write_byte_middleware(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._write_byte_middleware, start_addr, end_addr)
+
+    def remove_read_word_middleware(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._read_word_middleware, start_addr, end_addr)
+
+    def remove_write_word_middleware(self, start_addr, end_addr=None):
+        return self._unmap_address_range(self._write_word_middleware, start_addr, end_addr)
+
+    def remove_read_byte_watcher(self, start_addr, end_addr=None):
+        callback_func = self._unmap_address_range(self._read_byte_watchers, start_addr, end_addr)
+        self._update_slow_path_methods()
+        return callback_func
+
+    def remove_write_byte_watcher(self, start_addr, end_addr=None):
+        callback_func = self._unmap_address_range(self._write_byte_watchers, start_addr, end_addr)
+        self._update_slow_path_methods()
+        return callback_func
+
     #---------------------------------------------------------------------------
 
 
@@ -169,17 +566,37 @@ class Memory(object):
         if isinstance(data, six.string_types):
             data = [ord(c) for c in data]
 
-        log.debug("ROM load at $%04x: %s", address,
-            ", ".join(["$%02x" % i for i in data])
-        )
-        for ea, datum in enumerate(data, address):
-            try:
-                self._mem[ea] = datum
-            except OverflowError as err:
-                msg="%s - datum=$%x ea=$%04x (load address was: $%04x - data length: %iBytes)" % (
-                    err, datum, ea, address, len(data)
-                )
-                raise OverflowError(msg)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("ROM load at $%04x: %s", address,
+                ", ".join(["$%02x" % i for i in data])
+            )
+        # load() writes into the internal memory without any page mapping,
+        # because the CPU state contains the complete memory incl. extra RAM
+        end = address + len(data)
+        if not (0 <= address <= end <= len(self._mem)):
+            raise IndexError("Load $%04x-$%04x is outside the internal memory ($%x Bytes)" % (
+                address, end, len(self._mem)
+            ))
+        try:
+            self._mem[address:end] = bytearray(data)
+            self._mark_dirty_block(address, end, physical=True)
+        except ValueError as err:
+            msg = "%s (load address was: $%04x - data length: %iBytes)" % (
+                err, address, len(data)
+            )
+            raise OverflowError(msg)
+
+    def set_internal_memory(self, data):
+        """
+        Replace the complete internal memory (incl. extra RAM),
+        e.g.: to load a machine state.
+        """
+        if len(data) != len(self._mem):
+            raise ValueError("%i Bytes doesn't fit into memory with %i Bytes" % (
+                len(data), len(self._mem)
+            ))
+        self._mem[:] = data
+        self._mark_dirty_block(0, len(self._mem), physical=True)
 
     def load_file(self, romfile):
         data = romfile.get_data()
@@ -191,32 +608,43 @@ class Memory(object):
     def read_byte(self, address):
         self.cpu.cycles += 1
 
-        if address in self._read_byte_callbacks:
-            byte = self._read_byte_callbacks[address](
+        if not self._read_page_types[address >> 8]: # PAGE_RAM: plain RAM or ROM
+            return self._mem[address]
+        if self._read_page_types[address >> 8] == PAGE_BANKED:
+            return self._mem[address + self._page_offsets[address >> 8]]
+
+        return self._read_byte_io(address)
+
+    def _read_byte_io(self, address):
+        """
+        read a byte from a page with read callbacks/middlewares
+        """
+        callback_func = self._read_byte_callbacks.get(address)
+        if callback_func is not None:
+            byte = callback_func(
                 self.cpu.cycles, self.cpu.last_op_address, address
             )
-            assert byte is not None, "Error: read byte callback for $%04x func %r has return None!" % (
-                address, self._read_byte_callbacks[address].__name__
-            )
+            if byte is None:
+                raise ValueError("Error: read byte callback for $%04x func %r has return None!" % (
+                    address, callback_func.__name__
+                ))
             return byte
 
         try:
-            byte = self._mem[address]
-        except KeyError:
-            msg = "reading outside memory area (PC:$%x)" % self.cpu.program_counter.value
-            self.cfg.mem_info(address, msg)
-            msg2 = "%s: $%x" % (msg, address)
-            log.warning(msg2)
-            # raise RuntimeError(msg2)
+            byte = self._mem[address + self._page_offsets[address >> 8]]
+        except (IndexError, KeyError):
+            self.access_report.add(READ_OUTSIDE, address, self.cpu.last_op_address)
             byte = 0x0
 
-        if address in self._read_byte_middleware:
-            byte = self._read_byte_middleware[address](
+        middleware_func = self._read_byte_middleware.get(address)
+        if middleware_func is not None:
+            byte = middleware_func(
                 self.cpu.cycles, self.cpu.last_op_address, address, byte
             )
-            assert byte is not None, "Error: read byte middleware for $%04x func %r has return None!" % (
-                address, self._read_byte_middleware[address].__name__
-            )
+            if byte is None:
+                raise ValueError("Error: read byte middleware for $%04x func %r has return None!" % (
+                    address, middleware_func.__name__
+                ))
 
 #        log.log(5, "%04x| (%i) read byte $%x from $%x",
 #            self.cpu.last_op_address, self.cpu.cycles,
@@ -225,14 +653,17 @@ class Memory(object):
         return byte
 
     def read_word(self, address):
-        if address in self._read_word_callbacks:
-            word = self._read_word_callbacks[address](
-                self.cpu.cycles, self.cpu.last_op_address, address
-            )
-            assert word is not None, "Error: read word callback for $%04x func %r has return None!" % (
-                address, self._read_word_callbacks[address].__name__
-            )
-            return word
+        if self._read_word_page_types[address >> 8] == PAGE_IO:
+            callback_func = self._read_word_callbacks.get(address)
+            if callback_func is not None:
+                word = callback_func(
+                    self.cpu.cycles, self.cpu.last_op_address, address
+                )
+                if word is None:
+                    raise ValueError("Error: read word callback for $%04x func %r has return None!" % (
+                        address, callback_func.__name__
+                    ))
+                return word
 
         # 6809 is Big-Endian
         return (self.read_byte(address) << 8) + self.read_byte(address + 1)
@@ -242,60 +673,82 @@ class Memory(object):
     def write_byte(self, address, value):
         self.cpu.cycles += 1
 
-        assert value >= 0, "Write negative byte hex:%00x dez:%i to $%04x" % (value, value, address)
-        assert value <= 0xff, "Write out of range byte hex:%02x dez:%i to $%04x" % (value, value, address)
+        if value < 0:
+            raise ValueError("Write negative byte hex:%00x dez:%i to $%04x" % (value, value, address))
+        if value > 0xff:
+            raise ValueError("Write out of range byte hex:%02x dez:%i to $%04x" % (value, value, address))
 #         if not (0x0 <= value <= 0xff):
 #             log.error("Write out of range value $%02x to $%04x", value, address)
 #             value = value & 0xff
 #             log.error(" ^^^^ wrap around to $%x", value)
 
-        if address in self._write_byte_middleware:
-            value = self._write_byte_middleware[address](
+        page_type = self._write_page_types[address >> 8]
+        if page_type == PAGE_RAM:
+            self._mem[address] = value
+            return
+        if page_type == PAGE_BANKED:
+            self._mem[address + self._page_offsets[address >> 8]] = value
+            return
+
+        return self._write_byte_slow(address, value)
+
+    def _write_byte_slow(self, address, value):
+        """
+        write a byte into a page with write callbacks/middlewares or into ROM
+        """
+        middleware_func = self._write_byte_middleware.get(address)
+        if middleware_func is not None:
+            value = middleware_func(
                 self.cpu.cycles, self.cpu.last_op_address, address, value
             )
-            assert value is not None, "Error: write byte middleware for $%04x func %r has return None!" % (
-                address, self._write_byte_middleware[address].__name__
-            )
-
-        if address in self._write_byte_callbacks:
-            return self._write_byte_callbacks[address](
+            if value is None:
+                raise ValueError("Error: write byte middleware for $%04x func %r has return None!" % (
+                    address, middleware_func.__name__
+                ))
+
+        callback_func = self._write_byte_callbacks.get(address)
+        if callback_func is not None:
+            return callback_func(
                 self.cpu.cycles, self.cpu.last_op_address, address, value
             )
 
-        if self.cfg.ROM_START <= address <= self.cfg.ROM_END:
-            msg = "%04x| writing into ROM at $%04x ignored." % (
-                self.cpu.program_counter.value, address
-            )
-            self.cfg.mem_info(address, msg)
-            msg2 = "%s: $%x" % (msg, address)
-            log.critical(msg2)
+        page = address >> 8
+        if self.cfg.ROM_START <= address <= self.cfg.ROM_END and not self._page_offsets[page]:
+            self.access_report.add(WRITE_INTO_ROM, address, self.cpu.last_op_address)
             return
 
         try:
-            self._mem[address] = value
+            self._mem[address + self._page_offsets[page]] = value
+            if self._dirty_pages is not None:
+                self._mark_dirty(address)
         except (IndexError, KeyError):
-            msg = "%04x| writing to %x is outside RAM/ROM !" % (
-                self.cpu.program_counter.value, address
-            )
-            self.cfg.mem_info(address, msg)
-            msg2 = "%s: $%x" % (msg, address)
-            log.warning(msg2)
-#             raise RuntimeError(msg2)
+            self.access_report.add(WRITE_OUTSIDE, address, self.cpu.last_op_address)
 
     def write_word(self, address, word):
-        assert word >= 0, "Write negative word hex:%04x dez:%i to $%04x" % (word, word, address)
-        assert word <= 0xffff, "Write out of range word hex:%04x dez:%i to $%04x" % (word, word, address)
+        if word < 0:
+            raise ValueError("Write negative word hex:%04x dez:%i to $%04x" % (word, word, address))
+        if word > 0xffff:
+            raise ValueError("Write out of range word hex:%04x dez:%i to $%04x" % (word, word, address))
+
+        if self._write_word_page_types[address >> 8] == PAGE_RAM:
+            # 6809 is Big-Endian
+            self.write_byte(address, word >> 8)
+            self.write_byte(address + 1, word & 0xff)
+            return
 
-        if address in self._write_word_middleware:
-            word = self._write_word_middleware[address](
+        middleware_func = self._write_word_middleware.get(address)
+        if middleware_func is not None:
+            word = middleware_func(
                 self.cpu.cycles, self.cpu.last_op_address, address, word
             )
-            assert word is not None, "Error: write word middleware for $%04x func %r has return None!" % (
-                address, self._write_word_middleware[address].__name__
-            )
-
-        if address in self._write_word_callbacks:
-            return self._write_word_callbacks[address](
+            if word is None:
+                raise ValueError("Error: write word middleware for $%04x func %r has return None!" % (
+                    address, middleware_func.__name__
+                ))
+
+        callback_func = self._write_word_callbacks.get(address)
+        if callback_func is not None:
+            return callback_func(
                 self.cpu.cycles, self.cpu.last_op_address, address, word
             )
 
@@ -305,15 +758,92 @@ class Memory(object):
 
     #---------------------------------------------------------------------------
 
-    def get(self, start, end):
+    def _check_block(self, start, end):
+        if not (0x0000 <= start <= end <= self.INTERNAL_SIZE):
+            raise IndexError("Memory block $%04x-$%04x is outside $0000-$%04x" % (
+                start, end, self.INTERNAL_SIZE
+            ))
+
+    def _iter_block_pages(self, start, end):
+        """
+        Split the block start..end (without end) into page parts.
+        yield: page, part_start, part_end, offset in internal memory
+        """
+        while start < end:
+            page = start >> 8
+            part_end = min((page + 1) * PAGE_SIZE, end)
+            yield page, start, part_end, self._page_offsets[page]
+            start = part_end
+
+    def view(self, start, end):
+        """
+        Returns a memoryview of the internal memory from start to end
+        (without end). Zero-copy: changes in memory are visible in the view
+        and writes into the view will change the memory directly
+        (without any callback, middleware or ROM check!)
+        """
+        self._check_block(start, end)
+        offset = self._page_offsets[start >> 8]
+        if self._banked and start < end:
+            if len(set(self._page_offsets[start >> 8:((end - 1) >> 8) + 1])) > 1:
+                raise ValueError("Memory block $%04x-$%04x is not continuous, because of mapped pages." % (
+                    start, end
+                ))
+        return memoryview(self._mem)[start + offset:end + offset]
+
+    def read_block(self, start, end, io=False):
+        """
+        Returns the memory from start to end (without end) as bytes.
+
+        The CPU cycles are not changed. With io=True read callbacks and
+        middlewares will be called for the addresses they are registered.
+        """
+        self._check_block(start, end)
+        if not io and not self._banked:
+            return memoryview(self._mem)[start:end].tobytes()
+
+        data = bytearray()
+        for page, part_start, part_end, offset in self._iter_block_pages(start, end):
+            if io and self._read_page_types[page] == PAGE_IO:
+                data.extend(
+                    self._read_byte_io(addr) for addr in xrange(part_start, part_end)
+                )
+            else:
+                data += self._mem[part_start + offset:part_end + offset]
+        return bytes(data)
+
+    def write_block(self, start, data, io=False):
+        """
+        Write the given bytes (or list of byte values) into memory.
+
+        The CPU cycles are not changed. Without io the data will be
+        copied into RAM *and* ROM, just like load().
+        With io=True write callbacks and middlewares will be called
+        and writes into ROM are ignored.
+        """
+        data = bytearray(data)
+        end = start + len(data)
+        self._check_block(start, end)
+        self._mark_dirty_block(start, end)
+        if not io and not self._banked:
+            self._mem[start:end] = data
+            return
+
+        for page, part_start, part_end, offset in self._iter_block_pages(start, end):
+            if not io or self._write_page_types[page] in (PAGE_RAM, PAGE_BANKED):
+                self._mem[part_start + offset:part_end + offset] = data[part_start - start:part_end - start]
+            else:
+                for addr in xrange(part_start, part_end):
+                    self._write_byte_slow(addr, data[addr - start])
+
+    def get(self, start, end, io=False):
         """
         used in unittests
         """
-        return [self.read_byte(addr) for addr in xrange(start, end)]
+        return list(bytearray(self.read_block(start, end, io)))
 
-    def iter_bytes(self, start, end):
-        for addr in xrange(start, end):
-            yield addr, self.read_byte(addr)
+    def iter_bytes(self, start, end, io=False):
+        return enumerate(bytearray(self.read_block(start, end, io)), start)
 
     def get_dump(self, start, end):
         dump_lines = []
@@ -331,3 +861,116 @@ class Memory(object):
         print("\n".join(["\t%s" % line for line in dump_lines]))
 
 
+class FastMemory(Memory):
+    """
+    Memory for the normal emulation run.
+
+    The callbacks/middlewares are validated on registration and the
+    values are masked to 8/16 bit, instead of checking them on every
+    memory access. Errors in callbacks or the CPU will not be noticed!
+
+    The strict value checks in Memory() are no asserts, so they are
+    still active if python runs with -O
+    Use Memory() in unittests and FastMemory() for emulation, e.g.: via
+    cli "--fast-memory" see: get_memory_class()
+    """
+    def _read_byte_io(self, address):
+        callback_func = self._read_byte_callbacks.get(address)
+        if callback_func is not None:
+            return callback_func(
+                self.cpu.cycles, self.cpu.last_op_address, address
+            ) & 0xff
+
+        try:
+            byte = self._mem[address + self._page_offsets[address >> 8]]
+        except IndexError:
+            self.access_report.add(READ_OUTSIDE, address, self.cpu.last_op_address)
+            byte = 0x0
+
+        middleware_func = self._read_byte_middleware.get(address)
+        if middleware_func is not None:
+            byte = middleware_func(
+                self.cpu.cycles, self.cpu.last_op_address, address, byte
+            ) & 0xff
+        return byte
+
+    def read_word(self, address):
+        if self._read_word_page_types[address >> 8] == PAGE_IO:
+            callback_func = self._read_word_callbacks.get(address)
+            if callback_func is not None:
+                return callback_func(
+                    self.cpu.cycles, self.cpu.last_op_address, address
+                ) & 0xffff
+
+        # 6809 is Big-Endian
+        return (self.read_byte(address) << 8) + self.read_byte(address + 1)
+
+    def write_byte(self, address, value):
+        self.cpu.cycles += 1
+        page_type = self._write_page_types[address >> 8]
+        if page_type == PAGE_RAM:
+            self._mem[address] = value & 0xff
+            return
+        if page_type == PAGE_BANKED:
+            self._mem[address + self._page_offsets[address >> 8]] = value & 0xff
+            return
+        return self._write_byte_slow(address, value & 0xff)
+
+    def _write_byte_slow(self, address, value):
+        middleware_func = self._write_byte_middleware.get(address)
+        if middleware_func is not None:
+            value = middleware_func(
+                self.cpu.cycles, self.cpu.last_op_address, address, value
+            ) & 0xff
+
+        callback_func = self._write_byte_callbacks.get(address)
+        if callback_func is not None:
+            return callback_func(
+                self.cpu.cycles, self.cpu.last_op_address, address, value
+            )
+
+        page = address >> 8
+        if self.cfg.ROM_START <= address <= self.cfg.ROM_END and not self._page_offsets[page]:
+            self.access_report.add(WRITE_INTO_ROM, address, self.cpu.last_op_address)
+            return
+
+        try:
+            self._mem[address + self._page_offsets[page]] = value
+            if self._dirty_pages is not None:
+                self._mark_dirty(address)
+        except IndexError:
+            self.access_report.add(WRITE_OUTSIDE, address, self.cpu.last_op_address)
+
+    def write_word(self, address, word):
+        word &= 0xffff
+        if self._write_word_page_types[address >> 8] == PAGE_RAM:
+            # 6809 is Big-Endian
+            self.write_byte(address, word >> 8)
+            self.write_byte(address + 1, word & 0xff)
+            return
+
+        middleware_func = self._write_word_middleware.get(address)
+        if middleware_func is not None:
+            word = middleware_func(
+                self.cpu.cycles, self.cpu.last_op_address, address, word
+            ) & 0xffff
+
+        callback_func = self._write_word_callbacks.get(address)
+        if callback_func is not None:
+            return callback_func(
+                self.cpu.cycles, self.cpu.last_op_address, address, word
+            )
+
+        # 6809 is Big-Endian
+        self.write_byte(address, word >> 8)
+        self.write_byte(address + 1, word & 0xff)
+
+
+def get_memory_class(cfg):
+    """
+    Returns FastMemory if "fast_memory" is activated in the config,
+    otherwise the Memory class with strict value checks.
+    """
+    if cfg.fast_memory:
+        return FastMemory
+    return Memory
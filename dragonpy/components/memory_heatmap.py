@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Memory access heatmap
+    ================================
+
+    Count reads, writes and executed ops per 256 Bytes page and
+    per I/O register address.
+
+    The counting functions are only installed while the heatmap is
+    enabled, so there is no overhead if it's not used. While enabled,
+    all memory accesses go through the slow path, see:
+    memory.add_access_wrapper()
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import json
+import logging
+
+from dragonpy.components.address_registry import PAGE_COUNT, PAGE_SIZE
+from dragonpy.core.configs import DummyMemInfo
+from dragonpy.core.op_hooks import get_op_hooks
+
+
+log = logging.getLogger(__name__)
+
+
+class MemoryHeatmap(object):
+    """
+    Note:
+     * reads contains also the op code fetches
+     * word accesses are counted as two byte accesses,
+       except if a word callback exists.
+    """
+    def __init__(self, cpu, memory, mem_info=None):
+        self.cpu = cpu
+        self.memory = memory
+        self.set_mem_info(mem_info)
+
+        # One more "guard" page for the address $10000, see: Memory()
+        self.reads = [0] * (PAGE_COUNT + 1)
+        self.writes = [0] * (PAGE_COUNT + 1)
+        self.executes = [0] * (PAGE_COUNT + 1)
+        self.io_reads = collections.defaultdict(int)
+        self.io_writes = collections.defaultdict(int)
+
+        self.active = False
+
+    def set_mem_info(self, mem_info):
+        if isinstance(mem_info, DummyMemInfo):
+            mem_info = None
+        self.mem_info = mem_info
+
+    def reset(self):
+        """
+        Set all counters to zero.
+        The lists are changed in place, because they are used in the
+        installed counting functions.
+        """
+        for counts in (self.reads, self.writes, self.executes):
+            counts[:] = [0] * len(counts)
+        self.io_reads.clear()
+        self.io_writes.clear()
+
+    def _wrap_access(self, read_byte_io, write_byte_slow):
+        reads = self.reads
+        writes = self.writes
+        io_reads = self.io_reads
+        io_writes = self.io_writes
+        # Only pages with I/O callbacks are counted per address:
+        read_callback_pages = self.memory._read_byte_callbacks.pages
+        write_callback_pages = self.memory._write_byte_callbacks.pages
+
+        def counting_read_byte_io(address):
+            page = address >> 8
+            reads[page] += 1
+            if read_callback_pages[page] is not None:
+                io_reads[address] += 1
+            return read_byte_io(address)
+
+        def counting_write_byte_slow(address, value):
+            page = address >> 8
+            writes[page] += 1
+            if write_callback_pages[page] is not None:
+                io_writes[address] += 1
+            return write_byte_slow(address, value)
+
+        return counting_read_byte_io, counting_write_byte_slow
+
+    def enable(self):
+        if self.active:
+            return
+        self.active = True
+
+        self.memory.add_access_wrapper(self._wrap_access)
+        get_op_hooks(self.cpu).add_post_hook(self._count_execute)
+
+    def _count_execute(self, op_address, opcode, start_cycles):
+        self.executes[op_address >> 8] += 1
+
+    def disable(self):
+        if not self.active:
+            return
+        self.active = False
+
+        self.memory.remove_access_wrapper(self._wrap_access)
+        get_op_hooks(self.cpu).remove_post_hook(self._count_execute)
+
+    #--------------------------------------------------------------------------
+
+    def _get_info(self, address):
+        if self.mem_info is None:
+            return ""
+        return self.mem_info.get_shortest(address)
+
+    def get_data(self):
+        pages = []
+        for page in range(PAGE_COUNT + 1):
+            reads = self.reads[page]
+            writes = self.writes[page]
+            executes = self.executes[page]
+            if not (reads or writes or executes):
+                continue
+            start = page * PAGE_SIZE
+            pages.append({
+                "start": start,
+                "end": start + PAGE_SIZE - 1,
+                "reads": reads,
+                "writes": writes,
+                "executes": executes,
+                "info": self._get_info(start),
+            })
+
+        io_registers = []
+        for address in sorted(set(self.io_reads) | set(self.io_writes)):
+            if not self.memory.has_io_callback(address):
+                continue
+            io_registers.append({
+                "address": address,
+                "reads": self.io_reads.get(address, 0),
+                "writes": self.io_writes.get(address, 0),
+                "info": self._get_info(address),
+            })
+
+        return {
+            "pages": pages,
+            "io_registers": io_registers,
+        }
+
+    def get_json(self):
+        return json.dumps(self.get_data(), indent=4, sort_keys=True)
+
+    def get_text_table(self):
+        data = self.get_data()
+        lines = [
+            "Memory access per page:",
+            "%-11s %12s %12s %12s | %s" % ("page", "reads", "writes", "executes", "info"),
+        ]
+        for entry in data["pages"]:
+            lines.append("$%04x-$%04x %12i %12i %12i | %s" % (
+                entry["start"], entry["end"],
+                entry["reads"], entry["writes"], entry["executes"], entry["info"]
+            ))
+
+        lines += [
+            "",
+            "I/O register access:",
+            "%-11s %12s %12s | %s" % ("address", "reads", "writes", "info"),
+        ]
+        for entry in data["io_registers"]:
+            lines.append("$%04x       %12i %12i | %s" % (
+                entry["address"], entry["reads"], entry["writes"], entry["info"]
+            ))
+        return "\n".join(lines)
+
+    def dump(self, filename):
+        """
+        Save as JSON if the filename ends with .json otherwise as text table.
+        """
+        if filename.lower().endswith(".json"):
+            content = self.get_json()
+        else:
+            content = self.get_text_table()
+        with open(filename, "w") as f:
+            f.write(content)
+        log.critical("Memory heatmap saved to %r", filename)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - BASIC line profiler
+    ==============================
+
+    Attribute the executed CPU cycles to the BASIC line numbers.
+
+    The BASIC interpreter stores the number of the current line
+    at cfg.BASIC_CURRENT_LINE_ADDR (Dragon/CoCo: $68, 0xffff in direct
+    mode) every time it starts a new line. Write middlewares on this
+    address count the line executions and add the cycles since the
+    last line change to the previous line.
+
+    The middlewares are only installed while the profiler is enabled,
+    so there is no overhead if it's not used.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import re
+
+
+log = logging.getLogger(__name__)
+
+
+DIRECT_MODE_LINE = 0xffff
+
+LINE_NUMBER_REGEX = re.compile(r"^\s*(\d+)\s?(.*)$")
+
+
+class BasicLineProfiler(object):
+    def __init__(self, cpu, memory, current_line_addr):
+        self.cpu = cpu
+        self.memory = memory
+        self.current_line_addr = current_line_addr
+
+        self.active = False
+        self.reset()
+
+    def reset(self):
+        self.lines = {} # line number: [cycles, count]
+        self._line = None
+        self._line_high = 0
+        self._last_cycles = self.cpu.cycles
+
+    def _switch_line(self, line):
+        cycles = self.cpu.cycles
+        if self._line is not None:
+            self.lines[self._line][0] += cycles - self._last_cycles
+        self._last_cycles = cycles
+        self._line = line
+        try:
+            self.lines[line][1] += 1
+        except KeyError:
+            self.lines[line] = [0, 1]
+
+    def write_line_high(self, cpu_cycles, op_address, address, value):
+        """ write middleware for the high byte of the current line number """
+        # The interpreter writes the line number as word, so the low
+        # byte write follows and the line is switched there.
+        self._line_high = value
+        return value
+
+    def write_line_low(self, cpu_cycles, op_address, address, value):
+        """ write middleware for the low byte of the current line number """
+        self._switch_line(self._line_high << 8 | value)
+        return value
+
+    def enable(self):
+        if self.active:
+            return
+        if self.current_line_addr is None:
+            raise RuntimeError("The machine config has no BASIC_CURRENT_LINE_ADDR")
+        self.active = True
+
+        address = self.current_line_addr
+        self._line_high = bytearray(self.memory.read_block(address, address + 1))[0]
+        self._line = None
+        self._last_cycles = self.cpu.cycles
+
+        self.memory.add_write_byte_middleware(self.write_line_high, address)
+        self.memory.add_write_byte_middleware(self.write_line_low, address + 1)
+        log.critical("BASIC line profiler enabled.")
+
+    def disable(self):
+        if not self.active:
+            return
+        self.active = False
+
+        # add the cycles of the current line:
+        if self._line is not None:
+            self.lines[self._line][0] += self.cpu.cycles - self._last_cycles
+            self._line = None
+
+        address = self.current_line_addr
+        self.memory.remove_write_byte_middleware(address)
+        self.memory.remove_write_byte_middleware(address + 1)
+        log.critical("BASIC line profiler disabled.")
+
+    #--------------------------------------------------------------------------
+
+    def get_data(self):
+        """
+        Returns a list of (line number, cycles, count) sorted by line number.
+        The direct mode is not included.
+        """
+        return [
+            (line, cycles, count)
+            for line, (cycles, count) in sorted(self.lines.items())
+            if line != DIRECT_MODE_LINE
+        ]
+
+    def get_report(self, listing=None):
+        """
+        Returns the text table.
+        listing: BASIC program as ASCII lines, see: Machine.get_basic_program()
+        """
+        code = {}
+        for listing_line in listing or []:
+            match = LINE_NUMBER_REGEX.match(listing_line)
+            if match:
+                code[int(match.group(1))] = match.group(2)
+
+        data = self.get_data()
+        total_cycles = sum(cycles for line, cycles, count in data) or 1
+        lines = [
+            "%6s %12s %6s %10s | %s" % ("line", "cycles", "%", "count", "code"),
+        ]
+        for line, cycles, count in data:
+            lines.append("%6i %12i %5.1f%% %10i | %s" % (
+                line, cycles, cycles * 100 / total_cycles, count, code.get(line, "")
+            ))
+        lines.append("%6s %12i %5.1f%% %10s |" % ("total", total_cycles, 100, ""))
+        return "\n".join(lines)
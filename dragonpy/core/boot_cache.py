@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Boot snapshot cache
+    ==============================
+
+    Store the machine state after the ROM initialization
+    (cfg.STARTUP_END_ADDR is reached) under the ROM directory.
+    The next start restores this snapshot, instead of running
+    the complete ROM initialization again.
+
+    The cache file name contains a hash of the machine name, the periphery
+    class, the DragonPy version and the SHA1 values of all ROM files.
+    So a changed ROM or a new DragonPy version creates a new cache file.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import logging
+import os
+
+import dragonpy
+from dragonpy.components.rom import ROMFile
+from dragonpy.core.state_file import COMPRESSION_ZLIB
+
+
+log = logging.getLogger(__name__)
+
+
+BOOT_CACHE_EXT = ".boot"
+
+
+def get_boot_cache_key(cfg, periphery_class):
+    """
+    Returns a hash over everything that changed the state after boot.
+    """
+    parts = [
+        cfg.CONFIG_NAME,
+        periphery_class.__name__,
+        dragonpy.__version__,
+        "%x" % cfg.EXTRA_RAM_SIZE,
+    ]
+    for romfile in cfg.rom_cfg:
+        parts.append("%s:%04x:%s" % (romfile.FILENAME, romfile.address, romfile.SHA1))
+    key = "\n".join(parts)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def get_boot_cache_filename(cfg, periphery_class):
+    """
+    e.g.: "Dragon32_boot_1a2b3c4d5e6f.boot"
+    """
+    return "%s_boot_%s%s" % (
+        cfg.CONFIG_NAME, get_boot_cache_key(cfg, periphery_class)[:12], BOOT_CACHE_EXT
+    )
+
+
+class BootCache(object):
+    def __init__(self, cfg, periphery_class, path=None):
+        if path is None:
+            path = ROMFile.ROM_PATH
+        self.filepath = os.path.join(path, get_boot_cache_filename(cfg, periphery_class))
+
+    def exists(self):
+        return os.path.isfile(self.filepath)
+
+    def load(self, machine):
+        """
+        Restore the machine state from the cache file.
+        Returns False if there is no usable cache file.
+        """
+        if not self.exists():
+            log.info("No boot cache file %r", self.filepath)
+            return False
+
+        try:
+            machine.load_state(self.filepath)
+        except Exception as err: # e.g.: StateFileError, IOError or a broken periphery state
+            log.error("Can't load boot cache %r: %s", self.filepath, err)
+            try:
+                self.delete()
+            except OSError as err:
+                log.error("Can't delete boot cache %r: %s", self.filepath, err)
+            # The state may be loaded partly:
+            machine.restore_snapshot(machine.init_snapshot)
+            machine.cpu.reset()
+            return False
+
+        log.info("Boot cache %r loaded.", self.filepath)
+        return True
+
+    def save(self, machine):
+        """
+        Save the machine state into the cache file.
+        Returns False if the file can't be written, e.g.: read-only ROM path
+        """
+        # Write into a temp file first, so a aborted write leaves no broken cache
+        temp_filepath = self.filepath + ".tmp"
+        try:
+            machine.save_state(temp_filepath, compression=COMPRESSION_ZLIB)
+            if os.path.isfile(self.filepath):
+                os.remove(self.filepath)
+            os.rename(temp_filepath, self.filepath)
+        except Exception as err:
+            log.error("Can't save boot cache %r: %s", self.filepath, err)
+            if os.path.isfile(temp_filepath):
+                os.remove(temp_filepath)
+            return False
+
+        log.info("Boot cache saved to %r", self.filepath)
+        return True
+
+    def delete(self):
+        if self.exists():
+            os.remove(self.filepath)
+            log.info("Boot cache %r deleted.", self.filepath)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Breakpoints and watchpoints
+    ======================================
+
+    Breakpoints stop the CPU before the op at the given address is
+    executed. Watchpoints stop the CPU after the op that reads/writes
+    (or changes) a byte in the given address range.
+
+    Both are implemented with memory watchers (see:
+    Memory.add_read_byte_watcher()), so only the memory pages with
+    a breakpoint/watchpoint use the slow path. Without any breakpoints
+    and watchpoints there is no overhead at all.
+
+    A hit raises BreakpointHit out of cpu.run(): The runner pauses the
+    CPU, e.g.: MachineThread.run_burst()
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+from MC6809.components.MC6809data.MC6809_op_data import (
+    REG_A, REG_B, REG_CC, REG_DP, REG_PC,
+    REG_S, REG_U, REG_X, REG_Y
+)
+
+from dragonpy.core.configs import DummyMemInfo
+from dragonpy.core.op_hooks import get_op_hooks
+from dragonpy.core.snapshot import get_cpu_registers
+
+
+log = logging.getLogger(__name__)
+
+
+BREAK = "break"
+WATCH_READ = "read"
+WATCH_WRITE = "write"
+WATCH_CHANGE = "change"
+WATCH_MODES = (WATCH_READ, WATCH_WRITE, WATCH_CHANGE)
+
+
+class BreakpointHit(Exception):
+    """
+    Raised on a breakpoint/watchpoint hit.
+    All information are stored in args, so it can be pickled.
+    """
+    def __init__(self, kind, address, value, registers, info):
+        super(BreakpointHit, self).__init__(kind, address, value, registers, info)
+        self.kind = kind
+        self.address = address
+        self.value = value
+        self.registers = registers
+        self.info = info
+
+    def __str__(self):
+        if self.kind == BREAK:
+            txt = "Breakpoint $%04x" % self.address
+        else:
+            txt = "Watchpoint %s $%02x at $%04x" % (self.kind, self.value, self.address)
+        registers = self.registers
+        txt += " - PC=$%04x (last op: $%04x) cycles: %i" % (
+            registers[REG_PC], registers["last_op_address"], registers["cycles"]
+        )
+        txt += "\n%s" % " ".join([
+            "%s=$%04x" % (reg, registers[reg])
+            for reg in (REG_X, REG_Y, REG_U, REG_S)
+        ] + [
+            "%s=$%02x" % (reg, registers[reg])
+            for reg in (REG_A, REG_B, REG_DP, REG_CC)
+        ])
+        if self.info:
+            txt += "\n%s" % self.info
+        return txt
+
+
+class Breakpoints(object):
+    def __init__(self, cpu, memory, mem_info=None):
+        self.cpu = cpu
+        self.memory = memory
+        self.set_mem_info(mem_info)
+
+        self.breakpoints = set()
+        self.watchpoints = set() # (start, end, mode)
+
+        self.last_hit = None
+        self.hit_count = 0
+
+        # address ranges of the registered watchers:
+        self._read_ranges = []
+        self._write_ranges = []
+
+        # Execute the op at the breakpoint address after the hit:
+        self._continue_address = None
+
+        # A watchpoint hit stops the CPU after the current op:
+        self._pending_hit = False
+
+    def set_mem_info(self, mem_info):
+        if isinstance(mem_info, DummyMemInfo):
+            mem_info = None
+        self.mem_info = mem_info
+
+    def __len__(self):
+        return len(self.breakpoints) + len(self.watchpoints)
+
+    #--------------------------------------------------------------------------
+
+    def add_breakpoint(self, address):
+        self.breakpoints.add(address)
+        self._update_watchers()
+
+    def remove_breakpoint(self, address):
+        self.breakpoints.discard(address)
+        self._update_watchers()
+
+    def add_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        """
+        mode: "read", "write" or "change" (write of a different value)
+        """
+        if mode not in WATCH_MODES:
+            raise ValueError("Unknown watchpoint mode %r, use one of: %s" % (
+                mode, ", ".join(WATCH_MODES)
+            ))
+        if end is None:
+            end = start
+        self.watchpoints.add((start, end, mode))
+        self._update_watchers()
+
+    def remove_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        if end is None:
+            end = start
+        self.watchpoints.discard((start, end, mode))
+        self._update_watchers()
+
+    def clear(self):
+        self.breakpoints.clear()
+        self.watchpoints.clear()
+        self._update_watchers()
+
+    #--------------------------------------------------------------------------
+
+    def _merge_ranges(self, ranges):
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _update_watchers(self):
+        """
+        Register one watcher function for all (merged) address ranges.
+        """
+        memory = self.memory
+        for start, end in self._read_ranges:
+            memory.remove_read_byte_watcher(start, end)
+        for start, end in self._write_ranges:
+            memory.remove_write_byte_watcher(start, end)
+
+        self._read_ranges = self._merge_ranges(
+            [(address, address) for address in self.breakpoints] + [
+                (start, end) for start, end, mode in self.watchpoints
+                if mode == WATCH_READ
+            ]
+        )
+        self._write_ranges = self._merge_ranges([
+            (start, end) for start, end, mode in self.watchpoints
+            if mode != WATCH_READ
+        ])
+
+        for start, end in self._read_ranges:
+            memory.add_read_byte_watcher(self.read_watcher, start, end)
+        for start, end in self._write_ranges:
+            memory.add_write_byte_watcher(self.write_watcher, start, end)
+
+    def _get_watchpoint_modes(self, address):
+        return set([
+            mode for start, end, mode in self.watchpoints
+            if start <= address <= end
+        ])
+
+    #--------------------------------------------------------------------------
+
+    def _create_hit(self, kind, address, value):
+        if self.mem_info is None:
+            info = ""
+        else:
+            info = self.mem_info.get_shortest(address)
+        hit = BreakpointHit(kind, address, value, get_cpu_registers(self.cpu), info)
+        self.last_hit = hit
+        self.hit_count += 1
+        log.critical("%s", hit)
+        return hit
+
+    def _stop_after_op(self, kind, address, value):
+        """
+        Stop the CPU before the next op is executed, so the current op
+        is executed completely.
+        """
+        cpu = self.cpu
+        if self._pending_hit:
+            return # The first hit of the op is reported
+        self._pending_hit = True
+
+        op_hooks = get_op_hooks(cpu)
+
+        def stop_pre_hook(op_address, opcode):
+            op_hooks.remove_pre_hook(stop_pre_hook)
+            self._pending_hit = False
+
+            # Undo the op fetch, so it will be repeated:
+            cpu.program_counter.set(op_address)
+            cpu.cycles -= 1
+            raise self._create_hit(kind, address, value)
+
+        op_hooks.add_pre_hook(stop_pre_hook)
+
+    def read_watcher(self, cpu_cycles, op_address, address, byte):
+        """ read byte watcher for breakpoints and read watchpoints """
+        cpu = self.cpu
+        if address in self.breakpoints and cpu.program_counter.value == address:
+            # opcode fetch
+            if self._continue_address == address:
+                self._continue_address = None
+            else:
+                self._continue_address = address
+                cpu.cycles -= 1 # The op fetch will be repeated
+                raise self._create_hit(BREAK, address, byte)
+
+        if WATCH_READ in self._get_watchpoint_modes(address):
+            self._stop_after_op(WATCH_READ, address, byte)
+
+    def write_watcher(self, cpu_cycles, op_address, address, value):
+        """ write byte watcher (called before the write) """
+        modes = self._get_watchpoint_modes(address)
+        if WATCH_WRITE in modes:
+            self._stop_after_op(WATCH_WRITE, address, value)
+        elif WATCH_CHANGE in modes:
+            old_value = bytearray(self.memory.read_block(address, address + 1))[0]
+            if old_value != value:
+                self._stop_after_op(WATCH_CHANGE, address, value)
@@ -50,6 +50,8 @@ from dragonpy.Simple6809.config import Simple6809Cfg
 from dragonpy.Simple6809.machine import run_Simple6809
 from dragonpy.core import configs
 from dragonpy.core.configs import machine_dict
+from dragonpy.core.trace_diff import REGISTERS, diff_trace_files
+from dragonpy.core.trace_file import convert_to_xroar
 from dragonpy.sbc09.config import SBC09Cfg
 from dragonpy.sbc09.machine import run_sbc09
 from dragonpy.vectrex.config import VectrexCfg
@@ -174,6 +176,30 @@ def editor(cli_config):
 @click.option("--rom", default=None, help="ROM file to use (default set by machine configuration)")
 @click.option("--max_ops", default=None, type=int,
     help="If given: Stop CPU after given cycles else: run forever")
+@click.option("--fast-memory", "fast_memory", is_flag=True, default=False,
+    help="Use the memory implementation without value checks (faster)")
+@click.option("--strict-memory", "strict_memory_access", is_flag=True, default=False,
+    help="Abort on invalid memory access (e.g. writes into ROM) instead of counting them")
+@click.option("--heatmap", default=None,
+    help="Count memory accesses and save them on exit into this file (*.json or text)")
+@click.option("--profile", default=None,
+    help="Count executed ops/cycles per ROM routine and save the report into this file (+ .folded call stacks)")
+@click.option("--basic-profile", "basic_profile", default=None,
+    help="Count the cycles per BASIC line and save the report on exit into this file")
+@click.option("--trace-file", "trace_file", default=None,
+    help="Write every executed op into this binary trace file (*.zst/*.zlib compressed)")
+@click.option("--boot-cache/--cold-boot", "boot_cache", default=True,
+    help="Restore the state after ROM initialization from the boot cache (default) or run a cold boot")
+@click.option("--threaded", is_flag=True, default=False,
+    help="Run the CPU in a separate thread, so the GUI doesn't slow down the emulation")
+@click.option("--multiprocess", is_flag=True, default=False,
+    help="Run the CPU in a separate process with the display RAM in shared memory (Python 3.8+)")
+@click.option("--idle-detection/--no-idle-detection", "idle_detection", default=True,
+    help="Fast-forward/sleep while the ROM waits for input (default) or run the wait loop at full speed")
+@click.option("--record-input", "input_record", default=None,
+    help="Save all user input with the CPU cycles on exit into this file")
+@click.option("--replay-input", "input_replay", default=None,
+    help="Replay the user input from a --record-input file at the same CPU cycles")
 @cli_config
 def run(cli_config, **kwargs):
     log.critical("Use machine func: %s", cli_config.machine_run_func.__name__)
@@ -182,6 +208,50 @@ def run(cli_config, **kwargs):
     cli_config.machine_run_func(cli_config.cfg_dict)
 
 
+@cli.command(help="Convert a binary --trace-file into the XRoar trace text format")
+@click.argument("trace_file", type=click.File("rb"))
+@click.argument("out_file", type=click.File("w"), default="-")
+@click.option("--max-lines", "max_lines", default=None, type=int,
+    help="Stop after the given number of lines")
+@click.option("--mem-info/--no-mem-info", "mem_info", default=False,
+    help="Add the memory info of the machine configuration to every line")
+@cli_config
+def convert_trace(cli_config, trace_file, out_file, max_lines, mem_info):
+    if mem_info:
+        cfg = cli_config.machine_cfg(cli_config.cfg_dict)
+        mem_info = cfg.get_mem_info()
+    else:
+        mem_info = None
+    count = convert_to_xroar(trace_file, out_file, mem_info, max_lines)
+    click.echo("%i trace lines converted." % count, err=True)
+
+
+@cli.command(help="Find the first divergences between a DragonPy and a XRoar trace")
+@click.argument("dragonpy_trace", type=click.Path(exists=True, dir_okay=False))
+@click.argument("xroar_trace", type=click.Path(exists=True, dir_okay=False))
+@click.option("--max", "max_count", default=10, type=int,
+    help="Stop after the given number of divergences (default: 10)")
+@click.option("--ignore", multiple=True, type=click.Choice(REGISTERS),
+    help="Don't compare this register, e.g.: --ignore cc --ignore s")
+@click.option("--mem-info/--no-mem-info", "mem_info", default=True,
+    help="Add the memory info of the machine configuration to every divergence")
+@cli_config
+def trace_diff(cli_config, dragonpy_trace, xroar_trace, max_count, ignore, mem_info):
+    if mem_info:
+        cfg = cli_config.machine_cfg(cli_config.cfg_dict)
+        mem_info = cfg.get_mem_info()
+    else:
+        mem_info = None
+    diff, divergences = diff_trace_files(
+        dragonpy_trace, xroar_trace,
+        max_count=max_count, mem_info=mem_info, ignore_registers=ignore
+    )
+    for no, divergence in enumerate(divergences, 1):
+        click.secho("\n*** divergence %i:" % no, bold=True)
+        click.echo(divergence)
+    click.echo("\n%s" % diff.get_summary())
+
+
 @cli.command(help="List all exiting loggers and exit.")
 def log_list():
     print("A list of all loggers:")
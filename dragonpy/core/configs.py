@@ -74,6 +74,28 @@ class BaseConfig(object):
 
     DEFAULT_ROMS = {}
 
+    # RAM that is not in the 64KB address space and can be mapped
+    # via memory.map_pages() e.g.: upper 32KB RAM of the Dragon 64
+    EXTRA_RAM_SIZE = 0
+
+    # PC after the ROM initialization, e.g.: "wait for user input" routine
+    # Used to create the boot snapshot, see: Machine.boot()
+    STARTUP_END_ADDR = None
+    BOOT_MAX_OPS = 500000
+
+    # Start addresses of the ROM routines, that are called in a loop
+    # while the machine waits for input, see: IdleDetector()
+    IDLE_PCS = ()
+
+    # Address of the current BASIC line number, see: BasicLineProfiler()
+    BASIC_CURRENT_LINE_ADDR = None
+
+    # ROM line input routine and the addresses it uses, see: TurboInput()
+    LINE_INPUT_ADDR = None
+    INCH_ADDR = None # called in a loop while the line input waits for a key
+    LINE_INPUT_BUFFER_ADDR = None
+    DEVICE_NUMBER_ADDR = None
+
     def __init__(self, cfg_dict):
         self.cfg_dict = cfg_dict
         self.cfg_dict["cfg_module"] = self.__module__ # FIXME: !
@@ -103,10 +125,62 @@ class BaseConfig(object):
 
         self.verbosity = cfg_dict["verbosity"]
 
+        # Use FastMemory() without value checks? see: memory.get_memory_class()
+        self.fast_memory = bool(cfg_dict.get("fast_memory", False))
+
+        # Raise an error on invalid memory access (e.g.: write into ROM)
+        # instead of counting them, see: InvalidAccessReport()
+        self.strict_memory_access = bool(cfg_dict.get("strict_memory_access", False))
+
+        # Filename for the memory access heatmap, see: Machine()
+        self.heatmap = cfg_dict.get("heatmap", None)
+
+        # Filename for the execution profile, see: ExecutionProfiler()
+        self.profile = cfg_dict.get("profile", None)
+
+        # Filename for the BASIC line profile, see: BasicLineProfiler()
+        self.basic_profile = cfg_dict.get("basic_profile", None)
+
+        # Filename for the binary execution trace, see: TraceRecorder()
+        self.trace_file = cfg_dict.get("trace_file", None)
+
+        # Restore the state after ROM initialization from a cache file
+        # in ROMFile.ROM_PATH (or "boot_cache_path"), see: BootCache()
+        self.boot_cache = bool(cfg_dict.get("boot_cache", False))
+        self.boot_cache_path = cfg_dict.get("boot_cache_path", None)
+
+        # Run the CPU in a separate thread, see: MachineThread()
+        self.threaded = bool(cfg_dict.get("threaded", False))
+
+        # Run the CPU in a separate process, see: MachineProcess()
+        self.multiprocess = bool(cfg_dict.get("multiprocess", False))
+
+        # Fast-forward/sleep while the ROM waits for input, see: IdleDetector()
+        self.idle_detection = bool(cfg_dict.get("idle_detection", False))
+
+        # Filenames to record/replay the user input, see: input_events
+        self.input_record = cfg_dict.get("input_record", None)
+        self.input_replay = cfg_dict.get("input_replay", None)
+
         self.mem_info = DummyMemInfo()
         self.memory_byte_middlewares = {}
         self.memory_word_middlewares = {}
 
+    def get_mem_info(self):
+        """
+        Returns the memory info, load it if not done in __init__()
+        e.g. for the profiler
+        """
+        return self.mem_info
+
+    def add_to_input_queue(self, user_input_queue, txt):
+        """
+        Send the text as key presses, e.g.: if the text can't be
+        entered via the ROM line input routine, see: TurboInput()
+        """
+        for char in txt:
+            user_input_queue.put(char)
+
     def _get_initial_Memory(self, size):
         return [0x00] * size
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Display ring buffer
+    ==============================
+
+    Transfer the display writes from the CPU thread to the GUI thread.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class DisplayRingBuffer(object):
+    """
+    Fixed size ring buffer for one producer (the CPU thread) and
+    one consumer (the GUI thread).
+
+    The producer changes only write_pos and overflow_count, the consumer
+    only read_pos. So no lock is needed.
+    If the buffer is full, new items are dropped and counted. The
+    consumer should redraw the complete display in this case.
+
+    >>> buffer = DisplayRingBuffer(size=4)
+    >>> buffer.put(1), buffer.put(2), buffer.put(3)
+    (True, True, True)
+    >>> buffer.put(4)
+    False
+    >>> buffer.drain()
+    [1, 2, 3]
+    >>> buffer.has_overflowed()
+    True
+    >>> buffer.has_overflowed()
+    False
+    >>> buffer.put(5), buffer.put(6)
+    (True, True)
+    >>> buffer.drain()
+    [5, 6]
+    >>> buffer.drain()
+    []
+    """
+    def __init__(self, size=0x1000):
+        self.size = size
+        self._buffer = [None] * size
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overflow_count = 0
+        self._last_overflow_count = 0
+
+    def put(self, item):
+        """
+        Called from the producer. Returns False if the buffer is full.
+        """
+        write_pos = self.write_pos
+        next_pos = write_pos + 1
+        if next_pos == self.size:
+            next_pos = 0
+        if next_pos == self.read_pos:
+            self.overflow_count += 1
+            return False
+        self._buffer[write_pos] = item
+        self.write_pos = next_pos
+        return True
+
+    def drain(self):
+        """
+        Called from the consumer. Returns all items in order of put().
+        """
+        read_pos = self.read_pos
+        write_pos = self.write_pos
+        if write_pos >= read_pos:
+            items = self._buffer[read_pos:write_pos]
+        else:
+            items = self._buffer[read_pos:] + self._buffer[:write_pos]
+        self.read_pos = write_pos
+        return items
+
+    def has_overflowed(self):
+        """
+        Called from the consumer.
+        Returns True if items are dropped since the last call.
+        """
+        overflow_count = self.overflow_count
+        if overflow_count == self._last_overflow_count:
+            return False
+        log.info("Display buffer overflow: %i items dropped.",
+            overflow_count - self._last_overflow_count
+        )
+        self._last_overflow_count = overflow_count
+        return True
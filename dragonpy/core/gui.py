@@ -43,6 +43,8 @@ from dragonpy.Dragon32.keyboard_map import inkey_from_tk_event, add_to_input_que
 from dragonlib.utils.auto_shift import invert_shift
 import dragonpy
 from dragonpy.Dragon32.keyboard_map import inkey_from_tk_event, add_to_input_queue
+from dragonpy.core.breakpoints import BreakpointHit
+from dragonpy.core.display_buffer import DisplayRingBuffer
 from dragonpy.core.gui_starter import MultiStatusBar
 from dragonpy.Dragon32.MC6847 import MC6847_TextModeCanvas
 from dragonpy.Dragon32.gui_config import RuntimeCfg, BaseTkinterGUIConfig
@@ -55,6 +57,13 @@ class BaseTkinterGUI(object):
     """
     The complete Tkinter GUI window
     """
+    # Used in threaded mode, see: get_threaded_display_callback()
+    DISPLAY_BUFFER_SIZE = 0x1000
+    DISPLAY_INTERVAL = 20 # ms
+
+    # Display RAM start/end (without end) for the machine process mode,
+    # see: video_ram_interval(). None == not supported by this GUI
+    VIDEO_RAM = None
 
     def __init__(self, cfg, user_input_queue):
         self.cfg = cfg
@@ -66,6 +75,8 @@ class BaseTkinterGUI(object):
         self.op_delay = 0
         self.burst_op_count = 100
         self.cpu_after_id = None # Used to call CPU OP burst loop
+        self.cpu_thread = None # MachineThread() in threaded mode
+        self.display_buffer = None
         self.target_burst_duration = 0.1 # Duration how long should a CPU Op burst loop take
 
         self.init_statistics() # Called also after reset
@@ -112,6 +123,9 @@ class BaseTkinterGUI(object):
         self.cpu_menu.add_separator()
         self.cpu_menu.add_command(label="soft reset", command=self.command_cpu_soft_reset)
         self.cpu_menu.add_command(label="hard reset", command=self.command_cpu_hard_reset)
+        self.cpu_menu.add_separator()
+        self.cpu_menu.add_command(label="start profiler", command=self.command_profiler_start)
+        self.cpu_menu.add_command(label="stop profiler + save", command=self.command_profiler_stop, state=tk.DISABLED)
         self.menubar.add_cascade(label="6809", menu=self.cpu_menu)
 
         self.config_window = None
@@ -172,48 +186,92 @@ class BaseTkinterGUI(object):
     def status_paused(self):
         self.status.set("%s paused.\n" % self.cfg.MACHINE_NAME)
 
+    def is_cpu_paused(self):
+        if self.cpu_thread is not None:
+            return self.cpu_thread.is_paused()
+        return self.cpu_after_id is None
+
     def command_cpu_pause(self):
-        if self.cpu_after_id is not None:
+        if not self.is_cpu_paused():
             # stop CPU
-            self.root.after_cancel(self.cpu_after_id)
-            self.cpu_after_id = None
+            if self.cpu_thread is not None:
+                self.cpu_thread.pause()
+            else:
+                self.root.after_cancel(self.cpu_after_id)
+                self.cpu_after_id = None
             self.status_paused()
             self.cpu_menu.entryconfig(index=0, state=tk.DISABLED)
             self.cpu_menu.entryconfig(index=1, state=tk.NORMAL)
         else:
             # restart
-            self.cpu_interval(interval=1)
+            if self.cpu_thread is not None:
+                self.cpu_thread.resume()
+            else:
+                self.cpu_interval(interval=1)
             self.cpu_menu.entryconfig(index=0, state=tk.NORMAL)
             self.cpu_menu.entryconfig(index=1, state=tk.DISABLED)
             self.init_statistics() # Reset statistics
 
+    def machine_call(self, func, *args, **kwargs):
+        """
+        Call func in the CPU thread (between two bursts) in threaded mode.
+        """
+        if self.cpu_thread is not None:
+            return self.cpu_thread.call(func, *args, **kwargs)
+        return func(*args, **kwargs)
+
     def command_cpu_soft_reset(self):
-        self.machine.cpu.reset()
+        self.machine_call(self.machine.cpu.reset)
         self.init_statistics() # Reset statistics
 
     def command_cpu_hard_reset(self):
-        self.machine.hard_reset()
+        self.machine_call(self.machine.hard_reset)
         self.init_statistics() # Reset statistics
 
+    def command_profiler_start(self):
+        self.machine_call(self.machine.enable_profiler)
+        self.cpu_menu.entryconfig(index="start profiler", state=tk.DISABLED)
+        self.cpu_menu.entryconfig(index="stop profiler + save", state=tk.NORMAL)
+
+    def command_profiler_stop(self):
+        filename = self.cfg.profile or "%s_profile.txt" % self.cfg.CONFIG_NAME
+        self.machine_call(self.machine.disable_profiler, filename)
+        self.cpu_menu.entryconfig(index="start profiler", state=tk.NORMAL)
+        self.cpu_menu.entryconfig(index="stop profiler + save", state=tk.DISABLED)
+        self.status_bar.set_label("profile", "Profile saved to %r" % filename)
+
     # -----------------------------------------------------------------------------------------
 
     def add_user_input(self, txt):
         add_to_input_queue(self.user_input_queue, txt)
 
+    def cpu_burst(self):
+        """
+        Run one CPU burst, also if the CPU is paused.
+        """
+        if self.cpu_thread is not None:
+            self.cpu_thread.call(self.cpu_thread.run_burst)
+        else:
+            self.cpu_interval()
+
     def wait_until_input_queue_empty(self):
         for count in xrange(1, 10):
-            self.cpu_interval()
-            if self.user_input_queue.empty():
+            self.cpu_burst()
+            if not self.machine_call(self.machine.is_input_pending):
                 log.critical("user_input_queue is empty, after %i burst runs, ok.", count)
-                if self.cpu_after_id is None:
+                if self.is_cpu_paused():
                     self.status_paused()
                 return
-        if self.cpu_after_id is None:
+        if self.is_cpu_paused():
             self.status_paused()
         log.critical("user_input_queue not empty, after %i burst runs!", count)
 
     def add_user_input_and_wait(self, txt):
-        self.add_user_input(txt)
+        """
+        Enter the text via the ROM line input routine, if possible.
+        see: TurboInput()
+        """
+        self.machine_call(self.machine.inject_text, txt)
         self.wait_until_input_queue_empty()
 
     def paste_clipboard(self, event):
@@ -222,9 +280,9 @@ class BaseTkinterGUI(object):
         """
         log.critical("paste clipboard")
         clipboard = self.root.clipboard_get()
-        for line in clipboard.splitlines():
-            log.critical("paste line: %s", repr(line))
-            self.add_user_input(line + "\r")
+        lines = clipboard.splitlines()
+        log.critical("paste %i lines", len(lines))
+        self.machine_call(self.machine.inject_text, "".join(line + "\r" for line in lines))
 
     def event_key_pressed(self, event):
         log.critical("event.char: %-6r event.keycode: %-3r event.keysym: %-11r event.keysym_num: %5r",
@@ -249,10 +307,20 @@ class BaseTkinterGUI(object):
             target_cycles_per_sec = None
 
         start_time = time.time()
-        self.machine.cpu.run(
-            max_run_time=self.runtime_cfg.max_run_time,
-            target_cycles_per_sec=target_cycles_per_sec,
-        )
+        try:
+            self.machine.cpu.run(
+                max_run_time=self.runtime_cfg.max_run_time,
+                target_cycles_per_sec=target_cycles_per_sec,
+            )
+        except BreakpointHit as hit:
+            self.total_burst_duration += (time.time() - start_time)
+            if interval is not None:
+                # pause the CPU, same as command_cpu_pause()
+                self.cpu_after_id = None
+                self.cpu_menu.entryconfig(index=0, state=tk.DISABLED)
+                self.cpu_menu.entryconfig(index=1, state=tk.NORMAL)
+            self.status.set("%s\n" % hit)
+            return
         now = time.time()
         self.total_burst_duration += (now - start_time)
 
@@ -262,11 +330,68 @@ class BaseTkinterGUI(object):
             else:
                 log.critical("CPU stopped.")
 
+    def get_threaded_display_callback(self):
+        """
+        Returns the display callback for the CPU thread: The display
+        writes are only stored in a ring buffer and display_interval()
+        calls display_callback() with them in the Tk mainloop.
+        """
+        self.display_buffer = DisplayRingBuffer(self.DISPLAY_BUFFER_SIZE)
+        put = self.display_buffer.put
+
+        def threaded_display_callback(*args):
+            put(args)
+
+        return threaded_display_callback
+
+    def display_buffer_overflow(self):
+        log.error("Display buffer overflow: display output is lost!")
+
+    def display_interval(self, interval):
+        display_callback = self.display_callback
+        for args in self.display_buffer.drain():
+            display_callback(*args)
+        if self.display_buffer.has_overflowed():
+            self.display_buffer_overflow()
+
+        self.root.after(interval, self.display_interval, interval)
+
+    def video_ram_interval(self, video_ram, last_video_ram, interval):
+        """
+        Used in machine process mode: Update the display with all
+        changed bytes in the shared display RAM.
+        """
+        current_video_ram = bytearray(video_ram)
+        if current_video_ram != last_video_ram:
+            start = self.VIDEO_RAM[0]
+            display_callback = self.display_callback
+            for offset, value in enumerate(current_video_ram):
+                if last_video_ram is None or last_video_ram[offset] != value:
+                    display_callback(None, None, start + offset, value)
+
+        self.root.after(interval, self.video_ram_interval, video_ram, current_video_ram, interval)
+
     last_update = 0
+    last_burst_count = 0
 
     def update_status_interval(self, interval=500):
         # Update CPU settings:
-        self.machine.cpu.max_burst_count = self.runtime_cfg.max_burst_count
+        if self.cpu_thread is None:
+            self.machine.cpu.max_burst_count = self.runtime_cfg.max_burst_count
+        else:
+            if self.runtime_cfg.speedlimit:
+                target_cycles_per_sec = self.runtime_cfg.cycles_per_sec
+            else:
+                target_cycles_per_sec = None
+            self.cpu_thread.update_settings(
+                max_run_time=self.runtime_cfg.max_run_time,
+                target_cycles_per_sec=target_cycles_per_sec,
+                max_burst_count=self.runtime_cfg.max_burst_count,
+            )
+
+            burst_count = self.cpu_thread.burst_count
+            self.cpu_interval_calls = burst_count - self.last_burst_count
+            self.last_burst_count = burst_count
 
         new_cycles = self.machine.cpu.cycles - self.last_cpu_cycles
         duration = time.time() - self.last_update
@@ -305,12 +430,21 @@ class BaseTkinterGUI(object):
 
         self.root.after(interval, self.update_status_interval, interval)
 
-    def mainloop(self, machine):
+    def mainloop(self, machine, cpu_thread=None):
         self.machine = machine
+        self.cpu_thread = cpu_thread
 
         self.update_status_interval(interval=500)
 
-        self.cpu_interval(interval=1)
+        if cpu_thread is None:
+            self.cpu_interval(interval=1)
+        else:
+            cpu_thread.start()
+            if self.display_buffer is not None:
+                self.display_interval(interval=self.DISPLAY_INTERVAL)
+            else:
+                # machine process mode
+                self.video_ram_interval(cpu_thread.video_ram, None, self.DISPLAY_INTERVAL)
 
         log.critical("Start root.mainloop()")
         try:
@@ -348,6 +482,27 @@ class DragonTkinterGUI(BaseTkinterGUI):
         self.display.write_byte(cpu_cycles, op_address, address, value)
         return value
 
+    VIDEO_RAM = (0x0400, 0x0600)
+
+    def get_threaded_display_callback(self):
+        self.display_buffer = DisplayRingBuffer(self.DISPLAY_BUFFER_SIZE)
+        put = self.display_buffer.put
+
+        def threaded_display_callback(cpu_cycles, op_address, address, value):
+            """ called via memory write_byte_middleware in the CPU thread """
+            put((cpu_cycles, op_address, address, value))
+            return value
+
+        return threaded_display_callback
+
+    def display_buffer_overflow(self):
+        """
+        Display writes are lost: Redraw the complete display from display RAM
+        """
+        display_ram = bytearray(self.machine.cpu.memory.read_block(0x0400, 0x0600))
+        for address, value in enumerate(display_ram, 0x0400):
+            self.display.write_byte(None, None, address, value)
+
     def close_basic_editor(self):
         if messagebox.askokcancel("Quit", "Do you really wish to close the Editor?"):
             self._editor_window.root.destroy()
@@ -363,20 +518,24 @@ class DragonTkinterGUI(BaseTkinterGUI):
             editmenu.add_command(label="load from DragonPy", command=self.command_load_from_DragonPy)
             editmenu.add_command(label="inject into DragonPy", command=self.command_inject_into_DragonPy)
             editmenu.add_command(label="inject + RUN into DragonPy", command=self.command_inject_and_run_into_DragonPy)
+            editmenu.add_separator()
+            editmenu.add_command(label="start BASIC profiler", command=self.command_basic_profiler_start)
+            editmenu.add_command(label="stop BASIC profiler", command=self.command_basic_profiler_stop, state=tk.DISABLED)
+            self._editor_profiler_menu = editmenu
             self._editor_window.menubar.insert_cascade(index=2, label="DragonPy", menu=editmenu)
 
         self._editor_window.focus_text()
 
     def command_load_from_DragonPy(self):
         self.add_user_input_and_wait("'SAVE TO EDITOR")
-        listing_ascii = self.machine.get_basic_program()
+        listing_ascii = self.machine_call(self.machine.get_basic_program)
         self._editor_window.set_content(listing_ascii)
         self.add_user_input_and_wait("\n")
 
     def command_inject_into_DragonPy(self):
         self.add_user_input_and_wait("'LOAD FROM EDITOR")
         content = self._editor_window.get_content()
-        result = self.machine.inject_basic_program(content)
+        result = self.machine_call(self.machine.inject_basic_program, content)
         log.critical("program loaded: %s", result)
         self.add_user_input_and_wait("\n")
 
@@ -385,6 +544,24 @@ class DragonTkinterGUI(BaseTkinterGUI):
         self.add_user_input_and_wait("\n") # FIXME: Sometimes this input will be "ignored"
         self.add_user_input_and_wait("RUN\n")
 
+    def command_basic_profiler_start(self):
+        self.machine_call(self.machine.enable_basic_profiler)
+        self._editor_profiler_menu.entryconfig(index="start BASIC profiler", state=tk.DISABLED)
+        self._editor_profiler_menu.entryconfig(index="stop BASIC profiler", state=tk.NORMAL)
+
+    def command_basic_profiler_stop(self):
+        report = self.machine_call(self.machine.disable_basic_profiler)
+        self._editor_profiler_menu.entryconfig(index="start BASIC profiler", state=tk.NORMAL)
+        self._editor_profiler_menu.entryconfig(index="stop BASIC profiler", state=tk.DISABLED)
+
+        window = tk.Toplevel(self._editor_window.root)
+        window.title("BASIC line profile")
+        text = scrolledtext.ScrolledText(master=window, height=30, width=100)
+        text.config(font=('courier', 11))
+        text.insert(tk.END, report)
+        text.config(state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
+
     # ##########################################################################
 
     # -------------------------------------------------------------------------------------
@@ -89,6 +89,14 @@ class SettingsFrame(tk.LabelFrame):
         w.config(width=20)
         w.grid(row=0, column=2, sticky=tk.W)
 
+        self.var_cold_boot = tk.BooleanVar()
+        self.var_cold_boot.set(False)
+        w = tk.Checkbutton(self,
+            text="cold boot (don't use the boot cache)",
+            variable=self.var_cold_boot
+        )
+        w.grid(row=1, column=1, columnspan=2, sticky=tk.W)
+
 
 class RunButtonsFrame(tk.LabelFrame):
     def __init__(self, master, **kwargs):
@@ -237,18 +245,21 @@ class StarterGUI(tk.Tk):
         click.echo("\n")
         run_dragonpy(*args, verbose=True)
 
-    def _run_command(self, command):
+    def _run_command(self, command, *command_args):
         """
         Run DragonPy cli with given command like "run" or "editor"
         Add "--machine" from GUI.
         "--verbosity" will also be set, later.
         """
         machine_name = self.frame_run_buttons.var_machine.get()
-        self._run_dragonpy_cli("--machine", machine_name, command)
+        self._run_dragonpy_cli("--machine", machine_name, command, *command_args)
 
     def run_machine(self):
         self._print_run_info("Run machine emulation")
-        self._run_command("run")
+        if self.frame_settings.var_cold_boot.get():
+            self._run_command("run", "--cold-boot")
+        else:
+            self._run_command("run", "--boot-cache")
 
     def run_basic_editor(self):
         self._print_run_info("Run only the BASIC editor")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Idle loop detection
+    ==============================
+
+    While e.g. BASIC waits for input, the ROM calls the keyboard polling
+    routine in a tight loop and the emulator burns 100% host CPU.
+
+    The start addresses of these routines are listed in cfg.IDLE_PCS.
+    A read middleware on these addresses is called on every opcode fetch
+    there, so only the memory page of the routine pays for the detection.
+    If the routine is called again and again within MAX_LOOP_CYCLES and
+    the user input queue is empty, the machine is idle:
+
+     * The CPU cycles are fast-forwarded to the next scheduled wakeup
+       event (e.g. the SAM IRQ), so the emulated loop runs only once per
+       event. Other events (e.g. timeouts) are not skipped.
+       Not while user input is recorded or replayed: The skipped cycles
+       depend on the timing of the live input, see: InputRecorder()
+     * The host sleeps the emulated time of the loop and the skipped
+       cycles, at most MAX_SLEEP_TIME, so new input is handled after a
+       short delay.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import time
+
+from dragonpy.core.input_events import CycleStampedInput
+
+
+log = logging.getLogger(__name__)
+
+
+class IdleDetector(object):
+    # Number of fast calls in a row, before the machine is idle:
+    IDLE_HITS = 10
+
+    # Maximum CPU cycles between two calls of the idle routine. A BASIC
+    # program that calls INKEY$ needs many more cycles per loop.
+    MAX_LOOP_CYCLES = 2000
+
+    # Dragon/CoCo: 14.31818 MHz crystal / 16
+    CYCLES_PER_SEC = 894886
+
+    MAX_SLEEP_TIME = 0.02
+
+    def __init__(self, cpu, memory, scheduler, user_input_queue, idle_pcs):
+        self.cpu = cpu
+        self.memory = memory
+        self.scheduler = scheduler
+        self.user_input_queue = user_input_queue
+        self.idle_pcs = idle_pcs
+        self.fast_forward = not isinstance(user_input_queue, CycleStampedInput)
+
+        self.active = False
+        self.hit_count = 0
+        self.last_hit_cycles = 0
+
+        # statistics:
+        self.idle_count = 0
+        self.skipped_cycles = 0
+        self.sleep_time = 0
+
+    def enable(self):
+        if self.active:
+            return
+        for address in self.idle_pcs:
+            self.memory.add_read_byte_middleware(self.idle_pc_read, address)
+        self.active = True
+        log.info("Idle detection for: %s",
+            ", ".join(["$%04x" % address for address in self.idle_pcs])
+        )
+
+    def disable(self):
+        if not self.active:
+            return
+        for address in self.idle_pcs:
+            self.memory.remove_read_byte_middleware(address)
+        self.active = False
+        self.hit_count = 0
+
+    def idle_pc_read(self, cpu_cycles, op_address, address, byte):
+        """ read byte middleware for the idle PCs """
+        if cpu_cycles - self.last_hit_cycles > self.MAX_LOOP_CYCLES \
+                or not self.user_input_queue.empty():
+            self.hit_count = 0
+        else:
+            self.hit_count += 1
+        loop_cycles = cpu_cycles - self.last_hit_cycles
+        self.last_hit_cycles = cpu_cycles
+
+        if self.hit_count >= self.IDLE_HITS:
+            self.idle(loop_cycles)
+        return byte
+
+    def idle(self, loop_cycles):
+        self.idle_count += 1
+
+        cpu = self.cpu
+        skipped_cycles = 0
+        next_cycles = None
+        if self.fast_forward:
+            next_cycles = self.scheduler.next_wakeup_cycles()
+        if next_cycles is not None and next_cycles > cpu.cycles:
+            skipped_cycles = next_cycles - cpu.cycles
+            self.skipped_cycles += skipped_cycles
+            cpu.cycles = next_cycles
+            # Don't count the skipped cycles as loop time:
+            self.last_hit_cycles = next_cycles
+
+        # Run the idle loop not faster than the real machine:
+        sleep_time = (loop_cycles + skipped_cycles) / self.CYCLES_PER_SEC
+        if sleep_time > self.MAX_SLEEP_TIME:
+            sleep_time = self.MAX_SLEEP_TIME
+
+        start_time = time.time()
+        time.sleep(sleep_time)
+        self.sleep_time += time.time() - start_time
+
+    def get_info(self):
+        return "idle: %i times, %i cycles skipped, %.1f sec. sleep" % (
+            self.idle_count, self.skipped_cycles, self.sleep_time
+        )
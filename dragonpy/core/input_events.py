@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Record and replay user input
+    =======================================
+
+    The periphery consumes user input from the user_input_queue, whenever
+    the emulated machine polls it. So the CPU cycle of a consumed input
+    depends on the timing of the GUI.
+
+    InputRecorder() stores every consumed input with the current CPU cycle.
+    InputReplay() delivers the same inputs not before the same CPU cycles,
+    so a session runs exactly like the recorded one.
+
+    Both are used as user_input_queue, e.g.:
+
+        run --record-input session.json
+        run --replay-input session.json
+
+    Note: Use the same boot mode (boot cache or cold boot) for record and
+    replay, because the cycles after boot are different.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import json
+import logging
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+
+log = logging.getLogger(__name__)
+
+
+INPUT_EVENTS_FORMAT = 1
+
+
+def save_input_events(filename, cfg, events):
+    data = {
+        "format": INPUT_EVENTS_FORMAT,
+        "machine": cfg.CONFIG_NAME,
+        "events": [[cycles, item] for cycles, item in events],
+    }
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=0)
+    log.critical("%i input events saved to %r", len(events), filename)
+
+
+def load_input_events(filename, cfg):
+    with open(filename, "r") as f:
+        data = json.load(f)
+
+    if data.get("format") != INPUT_EVENTS_FORMAT:
+        raise ValueError("Input events format %r is not supported" % data.get("format"))
+    if data.get("machine") != cfg.CONFIG_NAME:
+        raise ValueError("Input events are recorded with %r and not with %r" % (
+            data.get("machine"), cfg.CONFIG_NAME
+        ))
+
+    events = [(cycles, item) for cycles, item in data["events"]]
+    log.critical("%i input events loaded from %r", len(events), filename)
+    return events
+
+
+class CycleStampedInput(object):
+    """
+    Base class for a user_input_queue replacement.
+    Everything that is not about consuming the input,
+    e.g.: put(), empty(), queue.clear() is done by the wrapped queue.
+    The CPU is set by Machine()
+    """
+    cpu = None
+
+    def __init__(self, user_input_queue=None):
+        if user_input_queue is None:
+            user_input_queue = queue.Queue()
+        self.user_input_queue = user_input_queue
+
+    def __getattr__(self, name):
+        return getattr(self.user_input_queue, name)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class InputRecorder(CycleStampedInput):
+    def __init__(self, user_input_queue=None):
+        super(InputRecorder, self).__init__(user_input_queue)
+        self.events = []
+
+    def get(self, block=True, timeout=None):
+        item = self.user_input_queue.get(block, timeout)
+        self.events.append((self.cpu.cycles, item))
+        return item
+
+    def save(self, filename, cfg):
+        save_input_events(filename, cfg, self.events)
+
+
+class InputReplay(CycleStampedInput):
+    """
+    Live input (e.g.: from the GUI) goes into the wrapped queue
+    and will be ignored.
+    """
+    def __init__(self, events, user_input_queue=None):
+        super(InputReplay, self).__init__(user_input_queue)
+        self.events = collections.deque(events)
+        self.late_count = 0 # consumed later than recorded
+
+    def get(self, block=True, timeout=None):
+        if self.events:
+            cycles, item = self.events[0]
+            current_cycles = self.cpu.cycles
+            if current_cycles >= cycles:
+                self.events.popleft()
+                if current_cycles > cycles:
+                    self.late_count += 1
+                    log.warning("Input %r replayed at cycle %i instead of %i",
+                        item, current_cycles, cycles
+                    )
+                if not self.events:
+                    log.critical("Input replay finished.")
+                return item
+        raise queue.Empty
+
+    def empty(self):
+        return not self.events or self.events[0][0] > self.cpu.cycles
+
+    def is_finished(self):
+        return not self.events
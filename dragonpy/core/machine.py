@@ -12,6 +12,7 @@
 
 from __future__ import absolute_import, division, print_function
 
+import multiprocessing
 import threading
 
 from dragonlib.core.basic import log_program_dump
@@ -19,7 +20,21 @@ import logging
 
 log=logging.getLogger(__name__)
 from MC6809.components.cpu6809 import CPU
-from dragonpy.components.memory import Memory
+from dragonpy.components.memory import get_memory_class
+from dragonpy.components.memory_heatmap import MemoryHeatmap
+from dragonpy.core.basic_profiler import BasicLineProfiler
+from dragonpy.core.boot_cache import BootCache
+from dragonpy.core.breakpoints import BreakpointHit, Breakpoints, WATCH_WRITE
+from dragonpy.core.idle import IdleDetector
+from dragonpy.core.profiler import ExecutionProfiler
+from dragonpy.core.scheduler import get_scheduler
+from dragonpy.core.snapshot import MachineSnapshot
+from dragonpy.core.trace_file import TraceRecorder
+from dragonpy.core.turbo_input import TurboInput
+from dragonpy.core import state_file
+from dragonpy.core.input_events import (
+    CycleStampedInput, InputRecorder, InputReplay, load_input_events
+)
 from dragonpy.utils.simple_debugger import print_exc_plus
 
 
@@ -44,13 +59,26 @@ class Machine(object):
         # "write into Display RAM" for render them in DragonTextDisplayCanvas():
         self.display_callback = display_callback
 
-        # Queue to send keyboard inputs to CPU Thread:
-        self.user_input_queue = user_input_queue
-
-        memory = Memory(self.cfg)
+        memory_class = get_memory_class(self.cfg)
+        memory = memory_class(self.cfg)
         self.cpu = CPU(memory, self.cfg)
         memory.cpu = self.cpu  # FIXME
 
+        # Cycle triggered device events, replaces cpu.burst_run():
+        self.scheduler = get_scheduler(self.cpu)
+
+        # Record/replay the user input with CPU cycles, if activated:
+        if self.cfg.input_replay:
+            events = load_input_events(self.cfg.input_replay, self.cfg)
+            user_input_queue = InputReplay(events, user_input_queue)
+        elif self.cfg.input_record:
+            user_input_queue = InputRecorder(user_input_queue)
+        if isinstance(user_input_queue, CycleStampedInput):
+            user_input_queue.cpu = self.cpu
+
+        # Queue to send keyboard inputs to CPU Thread:
+        self.user_input_queue = user_input_queue
+
         try:
             self.periphery = self.periphery_class(
                 self.cfg, self.cpu, memory, self.display_callback, self.user_input_queue
@@ -58,12 +86,55 @@ class Machine(object):
         except TypeError as err:
             raise TypeError("%s - class: %s" % (err, self.periphery_class.__name__))
 
-        self.cpu_init_state = self.cpu.get_state() # Used for hard reset
-#        from dragonpy.tests.test_base import print_cpu_state_data
-#        print_cpu_state_data(self.cpu_init_state)
+        self.init_snapshot = self.take_snapshot() # Used for hard reset
+
+        # Count memory accesses, if activated e.g.: via cli --heatmap
+        self.heatmap = MemoryHeatmap(self.cpu, memory)
+        if self.cfg.heatmap:
+            self.enable_heatmap()
+
+        # Count executed ops and cycles per address, e.g.: via cli --profile
+        self.profiler = ExecutionProfiler(self.cpu)
+        if self.cfg.profile:
+            self.enable_profiler()
+
+        # Count cycles per BASIC line, e.g.: via cli --basic-profile
+        self.basic_profiler = BasicLineProfiler(
+            self.cpu, memory, self.cfg.BASIC_CURRENT_LINE_ADDR
+        )
+        if self.cfg.basic_profile:
+            self.enable_basic_profiler()
+
+        # Write every executed op into a binary file, e.g.: via cli --trace-file
+        self.trace_recorder = TraceRecorder(self.cpu)
+        if self.cfg.trace_file:
+            self.start_trace(self.cfg.trace_file)
 
         self.cpu.reset()
 
+        if self.cfg.boot_cache:
+            self.boot_cache = BootCache(
+                self.cfg, self.periphery_class, path=self.cfg.boot_cache_path
+            )
+            self.boot()
+        else:
+            self.boot_cache = None
+
+        # Don't burn host CPU while the ROM waits for input:
+        self.idle_detector = IdleDetector(
+            self.cpu, memory, self.scheduler, self.user_input_queue, self.cfg.IDLE_PCS
+        )
+        if self.cfg.idle_detection and self.cfg.IDLE_PCS:
+            self.idle_detector.enable()
+
+        # Stop the CPU on PC/memory access, see: add_breakpoint()
+        self.breakpoints = Breakpoints(self.cpu, memory)
+
+        # Enter text lines directly via the ROM line input routine:
+        self.turbo_input = TurboInput(
+            self.cpu, memory, self.scheduler, self.user_input_queue, self.cfg
+        )
+
         self.max_ops = self.cfg.cfg_dict["max_ops"]
         self.op_count = 0
 
@@ -81,10 +152,7 @@ class Machine(object):
         log.critical("variables....: $%04x-$%04x", variables_start, variables_end)
         log.critical("array........: $%04x-$%04x", array_start, array_end)
 
-        dump = [
-            value
-            for addr, value in self.cpu.memory.iter_bytes(program_start, program_end)
-        ]
+        dump = bytearray(self.cpu.memory.read_block(program_start, program_end))
         log.critical("Dump: %s", repr(dump))
         log_program_dump(dump)
 
@@ -100,7 +168,7 @@ class Machine(object):
             self.machine_api.PROGRAM_START_ADDR
         )
         tokens = self.machine_api.ascii_listing2program_dump(ascii_listing)
-        self.cpu.memory.load(program_start, tokens)
+        self.cpu.memory.write_block(program_start, tokens)
         log.critical("BASIC program injected into Memory.")
 
         # Update the BASIC addresses:
@@ -110,60 +178,291 @@ class Machine(object):
         self.cpu.memory.write_word(self.machine_api.FREE_SPACE_START_ADDR, program_end)
         log.critical("BASIC addresses updated.")
 
+    def inject_text(self, txt):
+        """
+        Enter the given text, e.g.: pasted text. Much faster than
+        sending the chars via user_input_queue, see: TurboInput()
+        """
+        self.turbo_input.add_text(txt)
+
+    def is_input_pending(self):
+        return self.turbo_input.pending() or not self.user_input_queue.empty()
+
+    def take_snapshot(self):
+        """
+        Returns a MachineSnapshot of CPU, memory and periphery.
+        Memory pages are shared with older snapshots (copy-on-write).
+        """
+        return MachineSnapshot.take(self.cpu, self.cpu.memory, self.periphery)
+
+    def restore_snapshot(self, snapshot):
+        snapshot.restore(self.cpu, self.cpu.memory, self.periphery)
+
+    def save_state(self, filename, compression=state_file.COMPRESSION_NONE):
+        """
+        Save the complete machine state into a binary file, see: state_file
+        """
+        state_file.save_state(
+            filename, self.cfg, self.cpu, self.cpu.memory, self.periphery, compression
+        )
+
+    def load_state(self, filename):
+        """
+        Load a machine state saved by save_state().
+        Raise StateFileError if the file is not for this machine/ROMs.
+        """
+        state_file.load_state(
+            filename, self.cfg, self.cpu, self.cpu.memory, self.periphery
+        )
+
+    def boot(self):
+        """
+        Restore the state after the ROM initialization from the boot cache.
+        On the first boot: run the ROM initialization until
+        cfg.STARTUP_END_ADDR and save the state into the boot cache.
+        Returns True if the machine is in the state after the ROM
+        initialization, otherwise the CPU just continues the boot.
+        """
+        if self.boot_cache.load(self):
+            log.critical("Machine state restored from %r", self.boot_cache.filepath)
+            return True
+
+        if self.cfg.STARTUP_END_ADDR is None:
+            log.info("No STARTUP_END_ADDR: Can't create a boot snapshot.")
+            return False
+        if not hasattr(self.periphery, "get_state"):
+            log.info("Periphery %s has no state: Can't create a boot snapshot.",
+                self.periphery_class.__name__
+            )
+            return False
+
+        log.critical("Run ROM initialization until $%04x...", self.cfg.STARTUP_END_ADDR)
+        try:
+            self.cpu.test_run(
+                start=self.cpu.program_counter.value,
+                end=self.cfg.STARTUP_END_ADDR,
+                max_ops=self.cfg.BOOT_MAX_OPS,
+            )
+        except RuntimeError as err:
+            log.error("Boot snapshot not created: %s", err)
+            return False
+
+        self.boot_cache.save(self)
+        return True
+
     def hard_reset(self):
         self.periphery.reset()
-#        from dragonpy.tests.test_base import print_cpu_state_data
-#        print_cpu_state_data(self.cpu_init_state)
-        self.cpu.set_state(self.cpu_init_state)
-#        print_cpu_state_data(self.cpu.get_state())
+        self.restore_snapshot(self.init_snapshot)
         self.cpu.reset()
 
+    def enable_heatmap(self):
+        self.heatmap.set_mem_info(self.cfg.get_mem_info())
+        self.heatmap.enable()
+        return self.heatmap
+
+    def disable_heatmap(self):
+        self.heatmap.disable()
+        return self.heatmap
+
+    def enable_profiler(self):
+        self.profiler.set_mem_info(self.cfg.get_mem_info())
+        self.profiler.reset()
+        self.profiler.enable()
+
+    def disable_profiler(self, filename=None):
+        """
+        Stop the profiler and save the report, if filename is given.
+        """
+        self.profiler.disable()
+        if filename:
+            self.profiler.dump(filename)
+
+    def enable_basic_profiler(self):
+        self.basic_profiler.reset()
+        self.basic_profiler.enable()
+
+    def disable_basic_profiler(self, filename=None):
+        """
+        Stop the BASIC line profiler and returns the report with the
+        BASIC listing. Save it, if filename is given.
+        """
+        self.basic_profiler.disable()
+        try:
+            listing = self.get_basic_program()
+        except Exception as err:
+            log.error("Can't get the BASIC listing: %s", err)
+            listing = None
+        report = self.basic_profiler.get_report(listing)
+        if filename:
+            with open(filename, "w") as f:
+                f.write(report)
+            log.critical("BASIC line profile saved to %r", filename)
+        return report
+
+    def start_trace(self, filename):
+        """
+        Record all executed ops into the binary trace file. The compression
+        is selected by the filename extension: .zst, .zlib or uncompressed
+        """
+        self.trace_recorder.start(filename)
+
+    def stop_trace(self):
+        self.trace_recorder.stop()
+
+    def add_breakpoint(self, address):
+        self.breakpoints.set_mem_info(self.cfg.get_mem_info())
+        self.breakpoints.add_breakpoint(address)
+
+    def remove_breakpoint(self, address):
+        self.breakpoints.remove_breakpoint(address)
+
+    def add_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        """
+        Stop the CPU after a "read", "write" or "change" in start-end
+        """
+        self.breakpoints.set_mem_info(self.cfg.get_mem_info())
+        self.breakpoints.add_watchpoint(start, end, mode)
+
+    def remove_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        self.breakpoints.remove_watchpoint(start, end, mode)
+
+    def get_last_break(self):
+        """
+        Returns the last BreakpointHit or None
+        """
+        return self.breakpoints.last_hit
+
     def quit(self):
         self.cpu.running = False
+        self.cpu.memory.access_report.flush()
+        if self.cfg.input_record and isinstance(self.user_input_queue, InputRecorder):
+            self.user_input_queue.save(self.cfg.input_record, self.cfg)
+        if self.cfg.heatmap and self.heatmap.active:
+            self.heatmap.dump(self.cfg.heatmap)
+        if self.cfg.profile and self.profiler.active:
+            self.disable_profiler(self.cfg.profile)
+        if self.cfg.basic_profile and self.basic_profiler.active:
+            self.disable_basic_profiler(self.cfg.basic_profile)
+        self.stop_trace()
 
 
 class MachineThread(threading.Thread):
     """
     run machine in a seperated thread.
+
+    The GUI thread must not access the machine while the CPU runs.
+    Use call() to execute something between two CPU bursts.
     """
-    def __init__(self, cfg, periphery_class,  user_input_queue):
+    def __init__(self, machine):
         super(MachineThread, self).__init__(name="CPU-Thread")
-        log.critical(" *** MachineThread init *** ")
-        self.machine = Machine(
-            cfg, periphery_class,  user_input_queue
-        )
+        self.daemon = True
+        self.machine = machine
+
+        # Changed by the GUI, e.g.: from runtime config:
+        self.max_run_time = 0.1
+        self.target_cycles_per_sec = None
+
+        self.burst_count = 0
+
+        self._call_queue = queue.Queue()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+        self._stop_event = threading.Event()
+
+    def run_burst(self):
+        try:
+            self.machine.cpu.run(
+                max_run_time=self.max_run_time,
+                target_cycles_per_sec=self.target_cycles_per_sec,
+            )
+        except BreakpointHit:
+            self.pause()
+        self.burst_count += 1
+
+    def update_settings(self, max_run_time, target_cycles_per_sec, max_burst_count):
+        self.max_run_time = max_run_time
+        self.target_cycles_per_sec = target_cycles_per_sec
+        self.machine.cpu.max_burst_count = max_burst_count
+
+    def _process_calls(self):
+        while True:
+            try:
+                func, args, kwargs, result_queue = self._call_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = func(*args, **kwargs)
+            except Exception as err:
+                result_queue.put((False, err))
+            else:
+                result_queue.put((True, result))
 
     def run(self):
         log.critical(" *** MachineThread.run() start *** ")
+        cpu = self.machine.cpu
         try:
-            self.machine.run()
+            while cpu.running and not self._stop_event.is_set():
+                self._process_calls()
+                if not self._resume_event.wait(0.05):
+                    continue # paused
+                self.run_burst()
         except Exception as err:
             log.critical("MachineThread exception: %s", err)
             print_exc_plus()
             _thread.interrupt_main()
             raise
+        finally:
+            self._process_calls()
         log.critical(" *** MachineThread.run() stopped. *** ")
 
-    def quit(self):
+    def call(self, func, *args, **kwargs):
+        """
+        Execute func in the CPU thread between two CPU bursts and
+        return the result. Also works if the CPU is paused.
+        """
+        if threading.current_thread() is self or not self.is_alive():
+            return func(*args, **kwargs)
+
+        result_queue = queue.Queue(maxsize=1)
+        self._call_queue.put((func, args, kwargs, result_queue))
+        while True:
+            try:
+                ok, result = result_queue.get(timeout=0.1)
+            except queue.Empty:
+                if not self.is_alive():
+                    # The CPU thread has stopped in the meantime
+                    self._process_calls()
+            else:
+                break
+        if not ok:
+            raise result
+        return result
+
+    def pause(self):
+        self._resume_event.clear()
+
+    def resume(self):
+        self._resume_event.set()
+
+    def is_paused(self):
+        return not self._resume_event.is_set()
+
+    def quit(self, timeout=5):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
         self.machine.quit()
 
 
 class ThreadedMachine(object):
-    def __init__(self, cfg, periphery_class,  user_input_queue):
-        self.cpu_thread = MachineThread(
-            cfg, periphery_class,  user_input_queue
+    def __init__(self, cfg, periphery_class, display_callback, user_input_queue):
+        self.machine = Machine(
+            cfg, periphery_class, display_callback, user_input_queue
         )
-        self.cpu_thread.deamon = True
+        self.cpu_thread = MachineThread(self.machine)
+
+    def start(self):
         self.cpu_thread.start()
-#         log.critical("Wait for CPU thread stop.")
-#         try:
-#             cpu_thread.join()
-#         except KeyboardInterrupt:
-#             log.critical("CPU thread stops by keyboard interrupt.")
-#             thread.interrupt_main()
-#         else:
-#             log.critical("CPU thread stopped.")
-#         cpu.running = False
 
     def quit(self):
         self.cpu_thread.quit()
@@ -173,8 +472,11 @@ class MachineGUI(object):
     def __init__(self, cfg):
         self.cfg = cfg
 
-        # Queue to send keyboard inputs from GUI to CPU Thread:
-        self.user_input_queue = queue.Queue()
+        # Queue to send keyboard inputs from GUI to CPU Thread/Process:
+        if self.cfg.multiprocess:
+            self.user_input_queue = multiprocessing.Queue()
+        else:
+            self.user_input_queue = queue.Queue()
 
 
     def run(self, PeripheryClass, GUI_Class):
@@ -188,20 +490,55 @@ class MachineGUI(object):
         )
 
         log.critical("init machine")
-        # start CPU+Memory+Periphery in a separate thread
-        machine = Machine(
-            self.cfg,
-            PeripheryClass,
-            gui.display_callback,
-            self.user_input_queue
-        )
+        if self.cfg.multiprocess and GUI_Class.VIDEO_RAM is None:
+            log.error("%s doesn't support the machine process mode: use threaded mode.",
+                GUI_Class.__name__
+            )
+            self.cfg.multiprocess = False
+            self.cfg.threaded = True
+
+        if self.cfg.multiprocess:
+            # start CPU+Memory+Periphery in a separate process, the
+            # display RAM is shared with the GUI process
+            from dragonpy.core.machine_process import MachineProcess
+            video_ram_start, video_ram_end = GUI_Class.VIDEO_RAM
+            cpu_thread = MachineProcess(
+                self.cfg,
+                PeripheryClass,
+                self.user_input_queue,
+                video_ram_start, video_ram_end
+            )
+            machine = cpu_thread.machine
+        elif self.cfg.threaded:
+            # start CPU+Memory+Periphery in a separate thread, the
+            # display writes are transfered via a ring buffer
+            threaded_machine = ThreadedMachine(
+                self.cfg,
+                PeripheryClass,
+                gui.get_threaded_display_callback(),
+                self.user_input_queue
+            )
+            machine = threaded_machine.machine
+            cpu_thread = threaded_machine.cpu_thread
+        else:
+            machine = Machine(
+                self.cfg,
+                PeripheryClass,
+                gui.display_callback,
+                self.user_input_queue
+            )
+            cpu_thread = None
 
         try:
-            gui.mainloop(machine)
+            gui.mainloop(machine, cpu_thread)
         except Exception as err:
             log.critical("GUI exception: %s", err)
             print_exc_plus()
-        machine.quit()
+
+        if cpu_thread is None:
+            machine.quit()
+        else:
+            cpu_thread.quit()
 
         log.log(99, " --- END ---")
 
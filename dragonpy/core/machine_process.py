@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Run the machine in a separate process
+    ================================================
+
+    The CPU runs in a child process, so the GUI and the CPU don't share
+    the GIL. The display RAM (e.g.: $0400-$05ff for the text screen)
+    is mirrored into a multiprocessing.shared_memory block: The display
+    middleware in the child process writes into it and the GUI process
+    reads it once per frame. Key input goes over a multiprocessing.Queue
+    and control commands (pause, reset, BASIC load/inject, ...) over
+    a pipe.
+
+    MachineProcess has the same interface as MachineThread, so the GUI
+    can use both.
+
+    Needs Python 3.8 or newer for multiprocessing.shared_memory
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import multiprocessing
+
+try:
+    from multiprocessing import shared_memory # Python 3.8+
+except ImportError:
+    shared_memory = None
+
+from dragonpy.core.breakpoints import BreakpointHit, WATCH_WRITE
+from dragonpy.core.machine import Machine
+from dragonpy.utils.simple_debugger import print_exc_plus
+
+
+log = logging.getLogger(__name__)
+
+
+class MachineProcessServer(object):
+    """
+    Runs in the child process: Execute CPU bursts and the commands
+    from the pipe.
+    """
+    def __init__(self, machine, conn):
+        self.machine = machine
+        self.conn = conn
+
+        self.max_run_time = 0.1
+        self.target_cycles_per_sec = None
+        self.burst_count = 0
+        self.paused = False
+
+    def run_burst(self):
+        try:
+            self.machine.cpu.run(
+                max_run_time=self.max_run_time,
+                target_cycles_per_sec=self.target_cycles_per_sec,
+            )
+        except BreakpointHit:
+            self.paused = True
+        self.burst_count += 1
+
+    def process_command(self):
+        command, args = self.conn.recv()
+        func = getattr(self, "command_%s" % command)
+        try:
+            result = func(*args)
+        except Exception as err:
+            log.critical("Command %r error: %s", command, err)
+            self.conn.send((False, err))
+        else:
+            self.conn.send((True, result))
+
+    def run(self):
+        cpu = self.machine.cpu
+        conn = self.conn
+        while cpu.running:
+            if self.paused:
+                if conn.poll(0.05):
+                    self.process_command()
+                continue
+            while conn.poll():
+                self.process_command()
+            if not self.paused and cpu.running:
+                self.run_burst()
+
+    #--------------------------------------------------------------------------
+
+    def command_pause(self):
+        self.paused = True
+
+    def command_resume(self):
+        self.paused = False
+
+    def command_run_burst(self):
+        self.run_burst()
+
+    def command_update_settings(self, max_run_time, target_cycles_per_sec, max_burst_count):
+        self.max_run_time = max_run_time
+        self.target_cycles_per_sec = target_cycles_per_sec
+        cpu = self.machine.cpu
+        cpu.max_burst_count = max_burst_count
+        return {
+            "burst_count": self.burst_count,
+            "cycles": cpu.cycles,
+            "outer_burst_op_count": cpu.outer_burst_op_count,
+            "inner_burst_op_count": cpu.inner_burst_op_count,
+            "delay": getattr(cpu, "delay", 0),
+            "running": cpu.running,
+            "paused": self.paused, # e.g.: after a breakpoint hit
+        }
+
+    def command_reset(self):
+        self.machine.cpu.reset()
+
+    def command_hard_reset(self):
+        self.machine.hard_reset()
+
+    def command_get_basic_program(self):
+        return self.machine.get_basic_program()
+
+    def command_inject_basic_program(self, ascii_listing):
+        return self.machine.inject_basic_program(ascii_listing)
+
+    def command_inject_text(self, txt):
+        self.machine.inject_text(txt)
+
+    def command_is_input_pending(self):
+        return self.machine.is_input_pending()
+
+    def command_add_breakpoint(self, address):
+        self.machine.add_breakpoint(address)
+
+    def command_remove_breakpoint(self, address):
+        self.machine.remove_breakpoint(address)
+
+    def command_add_watchpoint(self, start, end, mode):
+        self.machine.add_watchpoint(start, end, mode)
+
+    def command_remove_watchpoint(self, start, end, mode):
+        self.machine.remove_watchpoint(start, end, mode)
+
+    def command_get_last_break(self):
+        return self.machine.get_last_break()
+
+    def command_enable_profiler(self):
+        self.machine.enable_profiler()
+
+    def command_disable_profiler(self, filename=None):
+        self.machine.disable_profiler(filename)
+
+    def command_enable_basic_profiler(self):
+        self.machine.enable_basic_profiler()
+
+    def command_disable_basic_profiler(self, filename=None):
+        return self.machine.disable_basic_profiler(filename)
+
+    def command_start_trace(self, filename):
+        self.machine.start_trace(filename)
+
+    def command_stop_trace(self):
+        self.machine.stop_trace()
+
+    def command_quit(self):
+        self.machine.quit()
+
+
+def run_machine_process(cfg_class, cfg_dict, periphery_class, user_input_queue,
+        conn, shm_name, video_ram_start, video_ram_end):
+    """
+    main function of the child process
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    video_ram = shm.buf
+    ready = False
+
+    def display_callback(cpu_cycles, op_address, address, value):
+        """ called via memory write_byte_middleware """
+        if video_ram_start <= address < video_ram_end:
+            video_ram[address - video_ram_start] = value
+        return value
+
+    try:
+        machine = Machine(
+            cfg_class(cfg_dict), periphery_class, display_callback, user_input_queue
+        )
+        conn.send((True, None)) # machine is ready
+        ready = True
+        MachineProcessServer(machine, conn).run()
+    except Exception as err:
+        log.critical("Machine process exception: %s", err)
+        print_exc_plus()
+        if not ready:
+            conn.send((False, err))
+        raise
+    finally:
+        shm.close()
+
+
+class RemoteCPU(object):
+    """
+    CPU status in the GUI process, updated via MachineProcess.update_settings()
+    """
+    def __init__(self, machine_process):
+        self._machine_process = machine_process
+
+        self.cycles = 0
+        self.max_burst_count = None
+        self.outer_burst_op_count = 0
+        self.inner_burst_op_count = 0
+        self.delay = 0
+        self.running = True
+
+    def reset(self):
+        self._machine_process.send_command("reset")
+
+
+class RemoteMachine(object):
+    """
+    Used in the GUI process instead of Machine()
+    """
+    def __init__(self, machine_process):
+        self._machine_process = machine_process
+        self.cpu = RemoteCPU(machine_process)
+
+    def hard_reset(self):
+        self._machine_process.send_command("hard_reset")
+
+    def get_basic_program(self):
+        return self._machine_process.send_command("get_basic_program")
+
+    def inject_basic_program(self, ascii_listing):
+        return self._machine_process.send_command("inject_basic_program", ascii_listing)
+
+    def inject_text(self, txt):
+        self._machine_process.send_command("inject_text", txt)
+
+    def is_input_pending(self):
+        return self._machine_process.send_command("is_input_pending")
+
+    def add_breakpoint(self, address):
+        self._machine_process.send_command("add_breakpoint", address)
+
+    def remove_breakpoint(self, address):
+        self._machine_process.send_command("remove_breakpoint", address)
+
+    def add_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        self._machine_process.send_command("add_watchpoint", start, end, mode)
+
+    def remove_watchpoint(self, start, end=None, mode=WATCH_WRITE):
+        self._machine_process.send_command("remove_watchpoint", start, end, mode)
+
+    def get_last_break(self):
+        return self._machine_process.send_command("get_last_break")
+
+    def enable_profiler(self):
+        self._machine_process.send_command("enable_profiler")
+
+    def disable_profiler(self, filename=None):
+        self._machine_process.send_command("disable_profiler", filename)
+
+    def enable_basic_profiler(self):
+        self._machine_process.send_command("enable_basic_profiler")
+
+    def disable_basic_profiler(self, filename=None):
+        return self._machine_process.send_command("disable_basic_profiler", filename)
+
+    def start_trace(self, filename):
+        self._machine_process.send_command("start_trace", filename)
+
+    def stop_trace(self):
+        self._machine_process.send_command("stop_trace")
+
+
+class MachineProcess(object):
+    """
+    GUI side of the machine process.
+    """
+    def __init__(self, cfg, periphery_class, user_input_queue, video_ram_start, video_ram_end):
+        if shared_memory is None:
+            raise RuntimeError("Machine process mode needs multiprocessing.shared_memory (Python 3.8+)")
+
+        self.video_ram_start = video_ram_start
+        self.video_ram_end = video_ram_end
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=video_ram_end - video_ram_start
+        )
+
+        self.burst_count = 0
+        self._paused = False
+
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            name="CPU-Process",
+            target=run_machine_process,
+            args=(
+                cfg.__class__, cfg.cfg_dict, periphery_class, user_input_queue,
+                child_conn, self._shm.name, video_ram_start, video_ram_end
+            ),
+        )
+        self.process.daemon = True
+        self.machine = RemoteMachine(self)
+
+    @property
+    def video_ram(self):
+        """
+        memoryview of the display RAM, changed by the machine process
+        """
+        return self._shm.buf
+
+    def start(self):
+        self.process.start()
+        self._receive_result() # wait until the machine is created
+
+    def _receive_result(self):
+        ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def send_command(self, command, *args):
+        self.conn.send((command, args))
+        return self._receive_result()
+
+    def run_burst(self):
+        self.send_command("run_burst")
+
+    def call(self, func, *args, **kwargs):
+        """
+        Same interface as MachineThread.call(): func must be
+        a method of self or self.machine, that sends a command.
+        """
+        return func(*args, **kwargs)
+
+    def update_settings(self, max_run_time, target_cycles_per_sec, max_burst_count):
+        status = self.send_command(
+            "update_settings", max_run_time, target_cycles_per_sec, max_burst_count
+        )
+        self.burst_count = status.pop("burst_count")
+        self._paused = status.pop("paused")
+        cpu = self.machine.cpu
+        for key, value in status.items():
+            setattr(cpu, key, value)
+
+    def pause(self):
+        self.send_command("pause")
+        self._paused = True
+
+    def resume(self):
+        self.send_command("resume")
+        self._paused = False
+
+    def is_paused(self):
+        return self._paused
+
+    def quit(self, timeout=5):
+        if self.process.is_alive():
+            try:
+                self.send_command("quit")
+            except (EOFError, IOError) as err:
+                log.error("Machine process quit error: %s", err)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self._shm.close()
+        self._shm.unlink()
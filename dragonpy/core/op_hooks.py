@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Hooks around every executed op
+    =========================================
+
+    The execution profiler, the trace recorder, the memory heatmap and
+    the watchpoints need a function call for every executed op. They
+    register hooks here, instead of wrapping cpu.call_instruction_func()
+    themselves. So they can be enabled and disabled in any order.
+
+    e.g.:
+
+        op_hooks = get_op_hooks(cpu)
+        op_hooks.add_post_hook(count_op)
+        ...
+        op_hooks.remove_post_hook(count_op)
+
+    The wrapper is only installed while hooks exists,
+    so there is no overhead if no hook is used.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+class OpHooks(object):
+    """
+    Paged ops (e.g.: $10 $8e) calls cpu.call_instruction_func() again
+    for the second opcode byte. The hooks are called only once for
+    the complete op, with the full opcode (e.g.: $108e)
+
+    >>> class FakeCPU(object):
+    ...     cycles = 0
+    ...     def call_instruction_func(self, op_address, opcode):
+    ...         self.cycles += 2
+    ...         if opcode == 0x10:
+    ...             self.call_instruction_func(op_address + 1, 0x108e)
+    >>> cpu = FakeCPU()
+    >>> op_hooks = OpHooks(cpu)
+    >>> def post_hook(op_address, opcode, start_cycles):
+    ...     print("$%04x $%x %i cycles" % (op_address, opcode, cpu.cycles - start_cycles))
+    >>> op_hooks.add_post_hook(post_hook)
+    >>> cpu.call_instruction_func(0x1000, 0x12)
+    $1000 $12 2 cycles
+    >>> cpu.call_instruction_func(0x1001, 0x10)
+    $1001 $108e 4 cycles
+    >>> op_hooks.remove_post_hook(post_hook)
+    >>> "call_instruction_func" in cpu.__dict__
+    False
+    """
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.pre_hooks = ()
+        self.post_hooks = ()
+        self._origin_call_instruction_func = None
+        self._in_op = False
+        self._last_opcode = None
+
+    def add_pre_hook(self, hook):
+        """
+        hook(op_address, opcode) is called before every op.
+        A exception in the hook prevents the execution of the op.
+        """
+        self.pre_hooks += (hook,)
+        self._update()
+
+    def remove_pre_hook(self, hook):
+        self.pre_hooks = tuple(h for h in self.pre_hooks if h != hook)
+        self._update()
+
+    def add_post_hook(self, hook):
+        """
+        hook(op_address, opcode, start_cycles) is called after every op.
+        """
+        self.post_hooks += (hook,)
+        self._update()
+
+    def remove_post_hook(self, hook):
+        self.post_hooks = tuple(h for h in self.post_hooks if h != hook)
+        self._update()
+
+    def _update(self):
+        """
+        Install the wrapper, if hooks exists and remove it otherwise.
+        The hook tuples are replaced on every change, so hooks can be
+        added/removed while the hooks are called.
+        """
+        cpu = self.cpu
+        installed = cpu.__dict__.get("call_instruction_func") == self.call_instruction_func
+        if self.pre_hooks or self.post_hooks:
+            if not installed:
+                self._origin_call_instruction_func = cpu.call_instruction_func
+                cpu.call_instruction_func = self.call_instruction_func
+        elif installed:
+            # Note: _origin_call_instruction_func is still needed,
+            # if the last hook is removed while a op is executed.
+            del cpu.call_instruction_func
+
+    def call_instruction_func(self, op_address, opcode):
+        self._last_opcode = opcode
+        if self._in_op:
+            # second opcode byte of a paged op
+            return self._origin_call_instruction_func(op_address, opcode)
+
+        for hook in self.pre_hooks:
+            hook(op_address, opcode)
+
+        start_cycles = self.cpu.cycles
+        self._in_op = True
+        try:
+            self._origin_call_instruction_func(op_address, opcode)
+        finally:
+            self._in_op = False
+
+        opcode = self._last_opcode
+        for hook in self.post_hooks:
+            hook(op_address, opcode, start_cycles)
+
+
+def get_op_hooks(cpu):
+    """
+    Returns the OpHooks instance of the CPU, it will be created on the first call.
+    """
+    op_hooks = getattr(cpu, "op_hooks", None)
+    if op_hooks is None:
+        op_hooks = OpHooks(cpu)
+        cpu.op_hooks = op_hooks
+    return op_hooks
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - 6809 execution profiler
+    ==================================
+
+    Count the executions and the used CPU cycles of every op address.
+    The results are aggregated by ROM routines, via the mem_info tables
+    of the machine config (e.g. DragonMemInfo).
+
+    A shadow call stack follows JSR/BSR/LBSR, RTS, PULS ...,PC, IRQ/SWI
+    and RTI. The cycles per call stack are saved as "collapsed stack" file,
+    e.g. for flamegraph.pl
+
+    The counting function is only registered as op hook while the profiler
+    is enabled, so there is no overhead if it's not used.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+from dragonpy.core.configs import DummyMemInfo
+from dragonpy.core.op_hooks import get_op_hooks
+
+
+log = logging.getLogger(__name__)
+
+
+OPCODES_CALL = frozenset((
+    0x17, # LBSR
+    0x8d, # BSR
+    0x9d, 0xad, 0xbd, # JSR
+))
+OPCODE_SWI = 0x3f
+OPCODE_RTS = 0x39
+OPCODE_RTI = 0x3b
+OPCODE_PULS = 0x35
+
+INTERRUPT_FLAG = 0x10000 # marks a interrupt entry in the call stack
+MAX_STACK_DEPTH = 32
+
+
+class ExecutionProfiler(object):
+    def __init__(self, cpu, mem_info=None):
+        self.cpu = cpu
+        self.set_mem_info(mem_info)
+
+        self.executes = [0] * 0x10000
+        self.cycles = [0] * 0x10000
+
+        self.active = False
+        self._post_hook = None
+        self._origin_irq = None
+        self._reset_stack()
+
+    def set_mem_info(self, mem_info):
+        if isinstance(mem_info, DummyMemInfo):
+            mem_info = None
+        self.mem_info = mem_info
+
+    def _reset_stack(self):
+        self._stack = []
+        self._stack_ids = {(): 0}
+        self._stack_keys = [()]
+        self.stack_cycles = [0]
+        self._stack_id = 0
+
+    def reset(self):
+        """
+        Set all counters to zero.
+        """
+        self.executes[:] = [0] * 0x10000
+        self.cycles[:] = [0] * 0x10000
+        self._reset_stack()
+
+    #--------------------------------------------------------------------------
+    # shadow call stack
+
+    def _set_stack(self, stack):
+        if len(stack) > MAX_STACK_DEPTH:
+            # e.g.: the ROM drops return addresses via LEAS
+            del stack[0]
+        key = tuple(stack)
+        try:
+            self._stack_id = self._stack_ids[key]
+        except KeyError:
+            self._stack_id = len(self._stack_keys)
+            self._stack_ids[key] = self._stack_id
+            self._stack_keys.append(key)
+            self.stack_cycles.append(0)
+
+    def _push(self, entry):
+        self._stack.append(entry)
+        self._set_stack(self._stack)
+
+    def _pop(self, interrupt=False):
+        stack = self._stack
+        if not stack:
+            return
+        if interrupt:
+            # RTI: remove everything up to the interrupt entry
+            while stack:
+                if stack.pop() & INTERRUPT_FLAG:
+                    break
+        elif stack[-1] & INTERRUPT_FLAG:
+            return # RTS without a call inside of the interrupt routine
+        else:
+            stack.pop()
+        self._set_stack(stack)
+
+    def _update_stack(self, op_address, opcode):
+        if opcode in OPCODES_CALL:
+            self._push(self.cpu.program_counter.value)
+        elif opcode == OPCODE_SWI:
+            self._push(self.cpu.program_counter.value | INTERRUPT_FLAG)
+        elif opcode == OPCODE_RTS:
+            self._pop()
+        elif opcode == OPCODE_RTI:
+            self._pop(interrupt=True)
+        elif opcode == OPCODE_PULS:
+            if self.cpu.program_counter.value != op_address + 2:
+                # PC was pulled from stack
+                self._pop()
+
+    #--------------------------------------------------------------------------
+
+    def enable(self):
+        if self.active:
+            return
+        self.active = True
+
+        cpu = self.cpu
+        executes = self.executes
+        cycles = self.cycles
+        stack_opcodes = OPCODES_CALL | frozenset((OPCODE_SWI, OPCODE_RTS, OPCODE_RTI, OPCODE_PULS))
+        update_stack = self._update_stack
+
+        def profiling_post_hook(op_address, opcode, start_cycles):
+            used_cycles = cpu.cycles - start_cycles
+            executes[op_address] += 1
+            cycles[op_address] += used_cycles
+            self.stack_cycles[self._stack_id] += used_cycles
+            if opcode in stack_opcodes:
+                update_stack(op_address, opcode)
+
+        self._post_hook = profiling_post_hook
+        get_op_hooks(cpu).add_post_hook(profiling_post_hook)
+
+        self._origin_irq = cpu.__dict__.get("irq")
+        irq = cpu.irq
+
+        def profiling_irq():
+            program_counter = cpu.program_counter.value
+            irq()
+            if cpu.program_counter.value != program_counter:
+                self._push(cpu.program_counter.value | INTERRUPT_FLAG)
+
+        cpu.irq = profiling_irq
+        log.critical("Execution profiler enabled.")
+
+    def disable(self):
+        if not self.active:
+            return
+        self.active = False
+
+        cpu = self.cpu
+        get_op_hooks(cpu).remove_post_hook(self._post_hook)
+        self._post_hook = None
+        if self._origin_irq is None:
+            del cpu.irq
+        else:
+            cpu.irq = self._origin_irq
+        log.critical("Execution profiler disabled.")
+
+    #--------------------------------------------------------------------------
+
+    # Bigger mem info ranges are areas (e.g.: "Monitor ROM") and no routines:
+    MAX_ROUTINE_SIZE = 0x400
+
+    # Ops without a routine range are grouped by the nearest label before:
+    MAX_LABEL_DISTANCE = 0x40
+
+    def get_routine_table(self):
+        """
+        Returns the routine (start, end, txt) for every address:
+         * The shortest mem info range that contains the address,
+           e.g.: (0xbbe5, 0xbc70, "scan keyboard & return ASCII")
+         * else the nearest single address mem info entry before
+         * else the shortest mem info area, e.g.: (0x8000, 0xbfff, "ROM")
+         * else the 256 Bytes page
+        """
+        table = [None] * 0x10000
+        labels = {}
+        routines = []
+        areas = []
+        if self.mem_info is not None:
+            for start, end, txt in self.mem_info.MEM_INFO:
+                if start == end:
+                    labels[start] = txt
+                elif end - start < self.MAX_ROUTINE_SIZE:
+                    routines.append((start, end, txt))
+                else:
+                    areas.append((start, end, txt))
+
+        def fill(ranges):
+            # longer ranges first, so shorter ranges overwrite them:
+            ranges.sort(key=lambda entry: entry[1] - entry[0], reverse=True)
+            layer = {}
+            for entry in ranges:
+                start, end = entry[:2]
+                for address in range(start, min(end, 0xffff) + 1):
+                    layer[address] = entry
+            for address, entry in layer.items():
+                if table[address] is None:
+                    table[address] = entry
+
+        fill(routines)
+
+        label = None
+        for address in range(0x10000):
+            if address in labels:
+                label = (address, address, labels[address])
+            if table[address] is None and label is not None \
+                    and address - label[0] <= self.MAX_LABEL_DISTANCE:
+                table[address] = label
+
+        fill(areas)
+
+        for address in range(0x10000):
+            if table[address] is None:
+                start = address & 0xff00
+                table[address] = (start, start + 0xff, "unknown")
+        return table
+
+    def get_entry_name(self, entry):
+        """
+        Name of a call stack entry, e.g.: "$bbe5 scan keyboard & return ASCII"
+        """
+        address = entry & 0xffff
+        txt = ""
+        if self.mem_info is not None:
+            for start, end, info in self.mem_info.MEM_INFO:
+                if start == address:
+                    txt = info
+                    break
+        if entry & INTERRUPT_FLAG:
+            name = "interrupt $%04x %s" % (address, txt)
+        else:
+            name = "$%04x %s" % (address, txt)
+        return name.strip().replace(";", ",")
+
+    def get_routine_data(self):
+        """
+        Returns a list of (cycles, executes, (start, end, txt)) sorted by cycles
+        """
+        routine_table = self.get_routine_table()
+        routines = {}
+        for address in range(0x10000):
+            executes = self.executes[address]
+            if not executes:
+                continue
+            routine = routine_table[address]
+            try:
+                data = routines[routine]
+            except KeyError:
+                data = routines[routine] = [0, 0]
+            data[0] += self.cycles[address]
+            data[1] += executes
+        return sorted(
+            [(cycles, executes, routine) for routine, (cycles, executes) in routines.items()],
+            reverse=True
+        )
+
+    def get_report(self, max_addresses=50):
+        total_cycles = sum(self.cycles) or 1
+        lines = [
+            "Cycles per ROM routine:",
+            "%12s %6s %12s | %s" % ("cycles", "%", "executes", "routine"),
+        ]
+        for cycles, executes, (start, end, txt) in self.get_routine_data():
+            lines.append("%12i %5.1f%% %12i | $%04x-$%04x %s" % (
+                cycles, cycles * 100 / total_cycles, executes, start, end, txt
+            ))
+
+        lines += [
+            "",
+            "Top %i op addresses:" % max_addresses,
+            "%12s %6s %12s | %s" % ("cycles", "%", "executes", "address"),
+        ]
+        addresses = sorted(
+            [address for address in range(0x10000) if self.executes[address]],
+            key=lambda address: self.cycles[address], reverse=True
+        )
+        for address in addresses[:max_addresses]:
+            if self.mem_info is None:
+                info = "$%04x" % address
+            else:
+                info = self.mem_info.get_shortest(address)
+            lines.append("%12i %5.1f%% %12i | %s" % (
+                self.cycles[address], self.cycles[address] * 100 / total_cycles,
+                self.executes[address], info
+            ))
+        return "\n".join(lines)
+
+    def get_collapsed_stacks(self):
+        """
+        One line per call stack: "entry;entry;... cycles"
+        """
+        lines = []
+        for stack_id, cycles in enumerate(self.stack_cycles):
+            if not cycles:
+                continue
+            key = self._stack_keys[stack_id]
+            names = ["main"] + [self.get_entry_name(entry) for entry in key]
+            lines.append("%s %i" % (";".join(names), cycles))
+        return "\n".join(sorted(lines))
+
+    def dump(self, filename):
+        """
+        Save the report into filename and the collapsed stacks
+        into filename + ".folded"
+        """
+        with open(filename, "w") as f:
+            f.write(self.get_report())
+        stack_filename = filename + ".folded"
+        with open(stack_filename, "w") as f:
+            f.write(self.get_collapsed_stacks())
+        log.critical("Execution profile saved to %r and %r", filename, stack_filename)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Cycle event scheduler
+    ================================
+
+    Devices schedule callbacks at absolute CPU cycle counts, e.g.: VSYNC,
+    HSYNC, timers, cassette edges or the ACIA byte timing.
+    The events are stored in a heap, so the next due event is always known.
+
+    The scheduler replaces cpu.burst_run(): The ops are executed in chunks
+    up to the next due event, instead of checking every sync callback
+    after a fixed number of ops (see: cpu.add_sync_callback()).
+
+    e.g.:
+
+        scheduler = get_scheduler(cpu)
+        scheduler.schedule(17784, irq_trigger)
+
+    The callback is called with the cycle count, the event was due.
+    A event is called at most one op late.
+
+    Events that can end a wait loop of the ROM (e.g. the VSYNC IRQ) are
+    scheduled with wakeup=True. The idle detection fast-forwards only
+    to these events, see: IdleDetector()
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import heapq
+import itertools
+import logging
+
+import six
+
+xrange = six.moves.xrange
+
+
+log = logging.getLogger(__name__)
+
+
+class EventScheduler(object):
+    """
+    >>> class FakeCPU(object):
+    ...     cycles = 0
+    ...     outer_burst_op_count = 1
+    ...     inner_burst_op_count = 100
+    ...     def get_and_call_next_op(self):
+    ...         self.cycles += 3
+    ...     def call_sync_callbacks(self):
+    ...         pass
+    >>> cpu = FakeCPU()
+    >>> scheduler = EventScheduler(cpu)
+    >>> calls = []
+    >>> event = scheduler.schedule(100, calls.append)
+    >>> scheduler.schedule_at(50, calls.append) is not None
+    True
+    >>> scheduler.next_event_cycles()
+    50
+    >>> scheduler.next_wakeup_cycles() is None
+    True
+    >>> scheduler.schedule_at(200, calls.append, wakeup=True) is not None
+    True
+    >>> scheduler.next_wakeup_cycles()
+    200
+    >>> scheduler.cancel(event)
+    >>> scheduler.burst_run()
+    >>> calls, cpu.cycles
+    ([50, 200], 300)
+    >>> scheduler.next_event_cycles() is None
+    True
+    """
+
+    # The longest 6809 ops need ~20 cycles, but they are rare. Running
+    # remaining_cycles // MAX_OP_CYCLES ops per chunk gets near the due
+    # cycles in a few chunks, the last ops are run one by one.
+    MAX_OP_CYCLES = 8
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self._queue = []
+        self._counter = itertools.count() # same due cycles -> call in schedule order
+
+    def schedule_at(self, cycles, callback, wakeup=False):
+        """
+        Call callback(cycles) if the CPU reached the absolute cycles.
+        wakeup: The event can end a wait loop, e.g.: IRQ or video events
+        Returns the event, for cancel()
+        """
+        event = [cycles, next(self._counter), callback, wakeup]
+        heapq.heappush(self._queue, event)
+        return event
+
+    def schedule(self, cycles, callback, wakeup=False):
+        """
+        Call callback(due_cycles) in the given number of CPU cycles.
+        """
+        return self.schedule_at(self.cpu.cycles + cycles, callback, wakeup)
+
+    def cancel(self, event):
+        # Mark as canceled, the event will be skipped if it's due:
+        event[2] = None
+
+    def next_event_cycles(self):
+        """
+        Returns the cycles of the next event or None.
+        """
+        queue = self._queue
+        while queue and queue[0][2] is None:
+            heapq.heappop(queue)
+        if queue:
+            return queue[0][0]
+        return None
+
+    def next_wakeup_cycles(self):
+        """
+        Returns the cycles of the next wakeup event or None.
+        """
+        cycles = [
+            event[0] for event in self._queue
+            if event[3] and event[2] is not None
+        ]
+        if cycles:
+            return min(cycles)
+        return None
+
+    def shift(self, cycles):
+        """
+        Move all events by the given cycles, e.g.: if the CPU cycles
+        are restored from a snapshot.
+        """
+        for event in self._queue:
+            event[0] += cycles
+        # the order is unchanged, so the heap is still valid
+
+    def run_due_events(self):
+        queue = self._queue
+        cpu = self.cpu
+        while queue and queue[0][0] <= cpu.cycles:
+            cycles, __, callback, __ = heapq.heappop(queue)
+            if callback is not None:
+                callback(cycles)
+
+    def burst_run(self):
+        """
+        Replacement for cpu.burst_run(): Runs the same number of ops,
+        but calls the events at the cycles they are due.
+        """
+        cpu = self.cpu
+        get_and_call_next_op = cpu.get_and_call_next_op
+        queue = self._queue
+        max_op_cycles = self.MAX_OP_CYCLES
+
+        op_count = cpu.outer_burst_op_count * cpu.inner_burst_op_count
+        while op_count > 0:
+            if queue:
+                remaining_cycles = queue[0][0] - cpu.cycles
+                if remaining_cycles <= 0:
+                    self.run_due_events()
+                    continue
+                chunk = remaining_cycles // max_op_cycles
+                if chunk < 1:
+                    chunk = 1
+                elif chunk > op_count:
+                    chunk = op_count
+            else:
+                chunk = op_count
+
+            for __ in xrange(chunk):
+                get_and_call_next_op()
+            op_count -= chunk
+
+        self.run_due_events()
+
+        # Callbacks that still use cpu.add_sync_callback():
+        cpu.call_sync_callbacks()
+
+
+def get_scheduler(cpu):
+    """
+    Returns the scheduler of the CPU. It will be created and
+    replace cpu.burst_run() on the first call.
+    """
+    scheduler = getattr(cpu, "scheduler", None)
+    if scheduler is None:
+        scheduler = EventScheduler(cpu)
+        cpu.scheduler = scheduler
+        cpu.burst_run = scheduler.burst_run
+    return scheduler
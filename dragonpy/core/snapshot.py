@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Machine snapshots
+    ============================
+
+    Capture the complete machine state: CPU registers, memory and
+    periphery (e.g.: PIA, SAM, display) to restore them later,
+    e.g.: for a hard reset or to isolate unittests.
+
+    The memory pages are shared between snapshots (copy-on-write),
+    see: Memory.take_snapshot()
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+from MC6809.components.MC6809data.MC6809_op_data import (
+    REG_A, REG_B, REG_CC, REG_DP, REG_PC,
+    REG_S, REG_U, REG_X, REG_Y
+)
+
+
+log = logging.getLogger(__name__)
+
+
+def get_cpu_registers(cpu):
+    """
+    Similar to cpu.get_state() but without the memory content.
+    """
+    return {
+        REG_X: cpu.index_x.value,
+        REG_Y: cpu.index_y.value,
+
+        REG_U: cpu.user_stack_pointer.value,
+        REG_S: cpu.system_stack_pointer.value,
+
+        REG_PC: cpu.program_counter.value,
+
+        REG_A: cpu.accu_a.value,
+        REG_B: cpu.accu_b.value,
+
+        REG_DP: cpu.direct_page.value,
+        REG_CC: cpu.get_cc_value(),
+
+        "cycles": cpu.cycles,
+        "last_op_address": cpu.last_op_address,
+        "irq_enabled": cpu.irq_enabled,
+    }
+
+
+def set_cpu_registers(cpu, registers):
+    cpu.index_x.set(registers[REG_X])
+    cpu.index_y.set(registers[REG_Y])
+
+    cpu.user_stack_pointer.set(registers[REG_U])
+    cpu.system_stack_pointer.set(registers[REG_S])
+
+    cpu.program_counter.set(registers[REG_PC])
+
+    cpu.accu_a.set(registers[REG_A])
+    cpu.accu_b.set(registers[REG_B])
+
+    cpu.direct_page.set(registers[REG_DP])
+    cpu.set_cc(registers[REG_CC])
+
+    old_cycles = cpu.cycles
+    cpu.cycles = registers["cycles"]
+    scheduler = getattr(cpu, "scheduler", None)
+    if scheduler is not None:
+        # Keep the scheduled events relative to the CPU cycles:
+        scheduler.shift(cpu.cycles - old_cycles)
+    cpu.last_op_address = registers["last_op_address"]
+    cpu.irq_enabled = registers["irq_enabled"]
+
+
+class MachineSnapshot(object):
+    def __init__(self, cpu_registers, memory_pages, periphery_state):
+        self.cpu_registers = cpu_registers
+        self.memory_pages = memory_pages
+        self.periphery_state = periphery_state
+
+    @classmethod
+    def take(cls, cpu, memory, periphery):
+        get_periphery_state = getattr(periphery, "get_state", None)
+        if get_periphery_state is None:
+            log.info("Periphery %s has no state.", periphery.__class__.__name__)
+            periphery_state = None
+        else:
+            periphery_state = get_periphery_state()
+
+        return cls(
+            cpu_registers=get_cpu_registers(cpu),
+            memory_pages=memory.take_snapshot(),
+            periphery_state=periphery_state,
+        )
+
+    def restore(self, cpu, memory, periphery):
+        set_cpu_registers(cpu, self.cpu_registers)
+        memory.restore_snapshot(self.memory_pages)
+        if self.periphery_state is not None:
+            periphery.set_state(self.periphery_state)
+
+    def __repr__(self):
+        return "<%s PC:$%04x cycles:%i>" % (
+            self.__class__.__name__,
+            self.cpu_registers[REG_PC], self.cpu_registers["cycles"]
+        )
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Machine state file
+    =============================
+
+    Binary file format to save/load the complete machine state.
+    All numbers are stored big endian.
+
+    Header (never compressed):
+
+        offset  size  content
+        0       8     magic: b"DPySTATE"
+        8       2     FORMAT_VERSION
+        10      1     compression of the body: 0=none, 1=zlib, 2=lzma
+        11      1     length of the machine name (cfg.CONFIG_NAME)
+        12      n     machine name (ASCII)
+        ...     1     length of the DragonPy version string
+        ...     n     DragonPy version (ASCII, only as information)
+        ...     1     number of ROM files
+        ...     20*n  SHA1 digest of every ROM file (cfg.rom_cfg)
+        ...     4     size of the internal memory (incl. extra RAM)
+
+    Body (compressed, if activated):
+
+        size          content
+        memory size   raw internal memory, see: Memory._mem
+        22            CPU registers, see: REGISTER_STRUCT
+        4             length of the periphery state
+        n             periphery state as Python literal (UTF-8)
+
+    The memory block will be read with one readinto() call into a buffer.
+    The machine is only changed after the complete file is read and checked.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import ast
+import binascii
+import io
+import logging
+import struct
+import zlib
+
+try:
+    import lzma # Python 3
+except ImportError:
+    lzma = None
+
+from MC6809.components.MC6809data.MC6809_op_data import (
+    REG_A, REG_B, REG_CC, REG_DP, REG_PC,
+    REG_S, REG_U, REG_X, REG_Y
+)
+
+import dragonpy
+from dragonpy.core.snapshot import get_cpu_registers, set_cpu_registers
+
+
+log = logging.getLogger(__name__)
+
+
+MAGIC = b"DPySTATE"
+FORMAT_VERSION = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+
+HEADER_STRUCT = struct.Struct(">8sHB")
+LENGTH8_STRUCT = struct.Struct(">B")
+LENGTH32_STRUCT = struct.Struct(">I")
+
+# X, Y, U, S, PC, A, B, DP, CC, irq_enabled, last_op_address, cycles
+REGISTER_STRUCT = struct.Struct(">HHHHHBBBBBHQ")
+
+
+class StateFileError(ValueError):
+    pass
+
+
+def get_rom_digests(cfg):
+    return [binascii.unhexlify(romfile.SHA1) for romfile in cfg.rom_cfg]
+
+
+def _compress(data, compression):
+    if compression == COMPRESSION_NONE:
+        return data
+    elif compression == COMPRESSION_ZLIB:
+        return zlib.compress(data, 6)
+    elif compression == COMPRESSION_LZMA:
+        if lzma is None:
+            raise StateFileError("lzma compression is not available")
+        return lzma.compress(data)
+    raise StateFileError("Unknown compression: %r" % compression)
+
+
+def _decompress(data, compression):
+    if compression == COMPRESSION_ZLIB:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as err:
+            raise StateFileError("Can't decompress state file: %s" % err)
+    elif compression == COMPRESSION_LZMA:
+        if lzma is None:
+            raise StateFileError("lzma compression is not available")
+        try:
+            return lzma.decompress(data)
+        except (lzma.LZMAError, EOFError) as err:
+            raise StateFileError("Can't decompress state file: %s" % err)
+    raise StateFileError("Unknown compression: %r" % compression)
+
+
+def _write_string(f, txt):
+    data = txt.encode("ascii")
+    f.write(LENGTH8_STRUCT.pack(len(data)))
+    f.write(data)
+
+
+def _read(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise StateFileError("Unexpected end of state file")
+    return data
+
+
+def _read_string(f):
+    length = LENGTH8_STRUCT.unpack(_read(f, LENGTH8_STRUCT.size))[0]
+    return _read(f, length).decode("ascii")
+
+
+def write_state(f, cfg, cpu, memory, periphery, compression=COMPRESSION_NONE):
+    """
+    Write the machine state into the binary file object f.
+    """
+    f.write(HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, compression))
+    _write_string(f, cfg.CONFIG_NAME)
+    _write_string(f, dragonpy.__version__)
+    rom_digests = get_rom_digests(cfg)
+    f.write(LENGTH8_STRUCT.pack(len(rom_digests)))
+    for digest in rom_digests:
+        f.write(digest)
+    f.write(LENGTH32_STRUCT.pack(len(memory._mem)))
+
+    registers = get_cpu_registers(cpu)
+    get_periphery_state = getattr(periphery, "get_state", None)
+    if get_periphery_state is None:
+        periphery_state = None
+    else:
+        periphery_state = get_periphery_state()
+    periphery_data = repr(periphery_state).encode("utf-8")
+
+    tail = b"".join([
+        REGISTER_STRUCT.pack(
+            registers[REG_X], registers[REG_Y],
+            registers[REG_U], registers[REG_S],
+            registers[REG_PC],
+            registers[REG_A], registers[REG_B],
+            registers[REG_DP], registers[REG_CC],
+            1 if registers["irq_enabled"] else 0,
+            registers["last_op_address"],
+            registers["cycles"],
+        ),
+        LENGTH32_STRUCT.pack(len(periphery_data)),
+        periphery_data,
+    ])
+
+    if compression == COMPRESSION_NONE:
+        f.write(memory._mem)
+        f.write(tail)
+    else:
+        f.write(_compress(bytes(memory._mem) + tail, compression))
+
+
+def read_state(f, cfg, cpu, memory, periphery):
+    """
+    Load the machine state from the binary file object f.
+    A StateFileError will be raised, if the header doesn't match
+    to the given machine or the file is broken.
+    In this case nothing is changed.
+    """
+    magic, format_version, compression = HEADER_STRUCT.unpack(_read(f, HEADER_STRUCT.size))
+    if magic != MAGIC:
+        raise StateFileError("No DragonPy state file")
+    if format_version != FORMAT_VERSION:
+        raise StateFileError("State file format version %i is not supported (current version: %i)" % (
+            format_version, FORMAT_VERSION
+        ))
+
+    machine_name = _read_string(f)
+    if machine_name != cfg.CONFIG_NAME:
+        raise StateFileError("State file is for machine %r and not for %r" % (
+            machine_name, cfg.CONFIG_NAME
+        ))
+    version = _read_string(f)
+    log.debug("State file created by DragonPy v%s", version)
+
+    rom_count = LENGTH8_STRUCT.unpack(_read(f, LENGTH8_STRUCT.size))[0]
+    rom_digests = [_read(f, 20) for _ in range(rom_count)]
+    if rom_digests != get_rom_digests(cfg):
+        raise StateFileError("ROM files doesn't match: %s" % ", ".join(
+            [binascii.hexlify(digest).decode("ascii") for digest in rom_digests]
+        ))
+
+    memory_size = LENGTH32_STRUCT.unpack(_read(f, LENGTH32_STRUCT.size))[0]
+    if memory_size != len(memory._mem):
+        raise StateFileError("State file memory size $%x doesn't match: $%x" % (
+            memory_size, len(memory._mem)
+        ))
+
+    if compression != COMPRESSION_NONE:
+        f = io.BytesIO(_decompress(f.read(), compression))
+
+    # Read and check the complete body, before the machine is changed:
+    mem = bytearray(memory_size)
+    if f.readinto(mem) != memory_size:
+        raise StateFileError("Unexpected end of state file")
+
+    register_values = REGISTER_STRUCT.unpack(_read(f, REGISTER_STRUCT.size))
+    registers = dict(zip(
+        (REG_X, REG_Y, REG_U, REG_S, REG_PC, REG_A, REG_B, REG_DP, REG_CC,
+        "irq_enabled", "last_op_address", "cycles"),
+        register_values
+    ))
+    registers["irq_enabled"] = bool(registers["irq_enabled"])
+
+    length = LENGTH32_STRUCT.unpack(_read(f, LENGTH32_STRUCT.size))[0]
+    try:
+        periphery_state = ast.literal_eval(_read(f, length).decode("utf-8"))
+    except (SyntaxError, ValueError) as err: # UnicodeDecodeError is a ValueError
+        raise StateFileError("Broken periphery state: %s" % err)
+
+    # Same order as MachineSnapshot.restore(): The periphery may use the
+    # restored memory, e.g.: Dragon32Periphery redraws the display RAM.
+    old_mem = bytes(memory._mem)
+    old_registers = get_cpu_registers(cpu)
+    memory.set_internal_memory(mem)
+    set_cpu_registers(cpu, registers)
+    if periphery_state is not None:
+        old_periphery_state = periphery.get_state()
+        try:
+            periphery.set_state(periphery_state)
+        except (KeyError, TypeError) as err:
+            memory.set_internal_memory(old_mem)
+            set_cpu_registers(cpu, old_registers)
+            periphery.set_state(old_periphery_state)
+            raise StateFileError("Periphery state doesn't match: %r" % err)
+
+
+def save_state(filename, cfg, cpu, memory, periphery, compression=COMPRESSION_NONE):
+    with open(filename, "wb") as f:
+        write_state(f, cfg, cpu, memory, periphery, compression)
+    log.info("Machine state saved to %r", filename)
+
+
+def load_state(filename, cfg, cpu, memory, periphery):
+    with open(filename, "rb") as f:
+        read_state(f, cfg, cpu, memory, periphery)
+    log.info("Machine state loaded from %r", filename)
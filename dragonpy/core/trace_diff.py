@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Trace divergence finder
+    ==================================
+
+    Walk a DragonPy trace and a XRoar trace in lockstep and find the
+    places where the emulations diverge.
+
+    The DragonPy trace can be a binary trace file (see: trace_file.py)
+    or a text trace in the XRoar layout. Text traces are parsed directly
+    from a mmap with one regular expression, so multi-GB files can be
+    compared. Only a small lookahead window is hold in memory.
+
+    Interrupts are not taken at the same op in both emulations. If the
+    PCs differs, both traces are searched within the lookahead window for
+    the next place where RESYNC_LENGTH PCs are the same again. The skipped
+    ops (e.g. the interrupt handler) are counted, but not reported.
+
+    Reported are:
+     * "registers": The same op, but different registers after it.
+       Only the start of a run of different registers is reported.
+     * "pc": The traces can't be synchronized again. The walk stops.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import logging
+import mmap
+import re
+
+from dragonpy.core.configs import DummyMemInfo
+from dragonpy.core import trace_file
+
+
+log = logging.getLogger(__name__)
+
+
+REGISTERS = ("cc", "a", "b", "dp", "x", "y", "u", "s")
+REGISTER_WIDTHS = (2, 2, 2, 2, 4, 4, 4, 4)
+
+DIVERGENCE_REGISTERS = "registers"
+DIVERGENCE_PC = "pc"
+
+XROAR_LINE_RE = re.compile(
+    br"^([0-9a-fA-F]{4})\|[^\n]*?"
+    br"cc=([0-9a-fA-F]{2}) a=([0-9a-fA-F]{2}) b=([0-9a-fA-F]{2}) dp=([0-9a-fA-F]{2}) "
+    br"x=([0-9a-fA-F]{4}) y=([0-9a-fA-F]{4}) u=([0-9a-fA-F]{4}) s=([0-9a-fA-F]{4})",
+    re.MULTILINE
+)
+
+# One executed op from a trace:
+#  index: number of the op in the trace (starts with 0)
+#  registers: values in the order of REGISTERS
+TraceOp = collections.namedtuple("TraceOp", "index pc registers")
+
+
+def iter_xroar_trace(filename):
+    """
+    Yields TraceOp for every trace line in the XRoar text trace file.
+    Other lines are skipped.
+    """
+    with open(filename, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            return
+        try:
+            for index, match in enumerate(XROAR_LINE_RE.finditer(mm)):
+                values = [int(value, 16) for value in match.groups()]
+                yield TraceOp(index, values[0], tuple(values[1:]))
+        finally:
+            mm.close()
+
+
+def iter_binary_trace(filename):
+    """
+    Yields TraceOp for every record in the DragonPy binary trace file.
+    """
+    with open(filename, "rb") as f:
+        for index, record in enumerate(trace_file.iter_records(f)):
+            yield TraceOp(index, record[0], record[2:10])
+
+
+def iter_trace(filename):
+    """
+    Yields TraceOp from a binary or XRoar text trace file.
+    """
+    with open(filename, "rb") as f:
+        magic = f.read(len(trace_file.MAGIC))
+    if magic == trace_file.MAGIC:
+        return iter_binary_trace(filename)
+    return iter_xroar_trace(filename)
+
+
+class Divergence(object):
+    def __init__(self, kind, left, right, info, context):
+        self.kind = kind
+        self.left = left
+        self.right = right
+        self.info = info
+        self.context = context # the last synchronous ops
+
+    def get_register_diffs(self):
+        """
+        Returns a list of (register name, left value, right value)
+        """
+        if self.left is None or self.right is None:
+            return []
+        return [
+            (name, left, right)
+            for name, left, right in zip(REGISTERS, self.left.registers, self.right.registers)
+            if left != right
+        ]
+
+    def _format_op(self, op):
+        if op is None:
+            return "end of trace"
+        return "#%i $%04x %s" % (op.index, op.pc, " ".join(
+            "%s=%0*x" % (name, width, value)
+            for name, width, value in zip(REGISTERS, REGISTER_WIDTHS, op.registers)
+        ))
+
+    def __str__(self):
+        lines = []
+        for op in self.context:
+            lines.append("    %s" % self._format_op(op))
+        lines.append("DragonPy: %s" % self._format_op(self.left))
+        lines.append("XRoar...: %s" % self._format_op(self.right))
+        if self.kind == DIVERGENCE_REGISTERS:
+            lines.append("different registers: %s" % ", ".join(
+                "%s: $%x != $%x" % diff for diff in self.get_register_diffs()
+            ))
+        else:
+            lines.append("different program flow, can't resync.")
+        if self.info:
+            lines.append(self.info)
+        return "\n".join(lines)
+
+
+class _Lookahead(object):
+    """
+    Buffer only the needed ops of a trace iterator.
+    """
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.buffer = collections.deque()
+        self.exhausted = False
+
+    def peek(self, index=0):
+        """ Returns the op at the index or None at the end of the trace """
+        while len(self.buffer) <= index:
+            if self.exhausted:
+                return None
+            try:
+                self.buffer.append(next(self.iterator))
+            except StopIteration:
+                self.exhausted = True
+                return None
+        return self.buffer[index]
+
+    def skip(self, count):
+        for __ in range(count):
+            self.buffer.popleft()
+
+    def pop(self):
+        op = self.peek()
+        if op is not None:
+            self.buffer.popleft()
+        return op
+
+
+class TraceDiff(object):
+    RESYNC_WINDOW = 2000 # max. skipped ops per trace
+    RESYNC_LENGTH = 8 # same PCs needed after a resync
+    CONTEXT_LENGTH = 3
+
+    def __init__(self, left, right, mem_info=None, ignore_registers=()):
+        """
+        left, right: iterators of TraceOp, e.g.: from iter_trace()
+        """
+        self.left = _Lookahead(iter(left))
+        self.right = _Lookahead(iter(right))
+        if isinstance(mem_info, DummyMemInfo):
+            mem_info = None
+        self.mem_info = mem_info
+        self.compare_indexes = [
+            index for index, name in enumerate(REGISTERS)
+            if name not in ignore_registers
+        ]
+
+        # statistics:
+        self.op_count = 0
+        self.resync_count = 0
+        self.skipped_left = 0
+        self.skipped_right = 0
+
+    def _get_info(self, op):
+        if self.mem_info is None or op is None:
+            return ""
+        return self.mem_info.get_shortest(op.pc)
+
+    def _same_flow(self, left_offset, right_offset):
+        left, right = self.left, self.right
+        for offset in range(self.RESYNC_LENGTH):
+            left_op = left.peek(left_offset + offset)
+            right_op = right.peek(right_offset + offset)
+            if left_op is None or right_op is None:
+                # The end of one trace: good enough, if both ends here
+                return left_op is None and right_op is None and offset > 0
+            if left_op.pc != right_op.pc:
+                return False
+        return True
+
+    def _resync(self):
+        """
+        Search the smallest skip in both traces, after that the PCs are
+        the same again. Returns False if not found within RESYNC_WINDOW.
+        """
+        for distance in range(1, self.RESYNC_WINDOW * 2 + 1):
+            for left_offset in range(max(0, distance - self.RESYNC_WINDOW), min(distance, self.RESYNC_WINDOW) + 1):
+                right_offset = distance - left_offset
+                if self._same_flow(left_offset, right_offset):
+                    self.left.skip(left_offset)
+                    self.right.skip(right_offset)
+                    self.resync_count += 1
+                    self.skipped_left += left_offset
+                    self.skipped_right += right_offset
+                    return True
+        return False
+
+    def _registers_diff(self, left_op, right_op):
+        left, right = left_op.registers, right_op.registers
+        return tuple(
+            index for index in self.compare_indexes
+            if left[index] != right[index]
+        )
+
+    def iter_divergences(self):
+        """
+        Yields Divergence instances.
+        """
+        left, right = self.left, self.right
+        context = collections.deque(maxlen=self.CONTEXT_LENGTH)
+        last_diff = ()
+        while True:
+            left_op = left.peek()
+            right_op = right.peek()
+            if left_op is None or right_op is None:
+                if left_op is not right_op:
+                    log.info("Trace ends different: %s - %s", left_op, right_op)
+                return
+
+            if left_op.pc != right_op.pc:
+                if not self._resync():
+                    yield Divergence(
+                        DIVERGENCE_PC, left_op, right_op,
+                        self._get_info(left_op), list(context)
+                    )
+                    return
+                continue
+
+            left.pop()
+            right.pop()
+            self.op_count += 1
+
+            diff = self._registers_diff(left_op, right_op)
+            if diff and diff != last_diff:
+                yield Divergence(
+                    DIVERGENCE_REGISTERS, left_op, right_op,
+                    self._get_info(left_op), list(context)
+                )
+            last_diff = diff
+            context.append(left_op)
+
+    def get_divergences(self, max_count=10):
+        result = []
+        if max_count <= 0:
+            return result
+        for divergence in self.iter_divergences():
+            result.append(divergence)
+            if len(result) >= max_count:
+                break
+        return result
+
+    def get_summary(self):
+        return "%i ops compared, %i resyncs (skipped DragonPy: %i ops, XRoar: %i ops)" % (
+            self.op_count, self.resync_count, self.skipped_left, self.skipped_right
+        )
+
+
+def diff_trace_files(dragonpy_filename, xroar_filename, max_count=10, mem_info=None, ignore_registers=()):
+    """
+    Returns the TraceDiff instance and the first max_count divergences.
+    """
+    trace_diff = TraceDiff(
+        iter_trace(dragonpy_filename), iter_xroar_trace(xroar_filename),
+        mem_info=mem_info, ignore_registers=ignore_registers,
+    )
+    return trace_diff, trace_diff.get_divergences(max_count)
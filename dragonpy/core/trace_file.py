@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Binary execution trace
+    =================================
+
+    Compact trace file with one fixed size record per executed op.
+    All numbers are stored big endian.
+
+    Header (never compressed):
+
+        offset  size  content
+        0       8     magic: b"DPyTRACE"
+        8       2     FORMAT_VERSION
+        10      1     compression of the records: 0=none, 1=zlib, 2=zstd
+
+    Records (as one compressed stream, if activated), see: RECORD_STRUCT
+
+        offset  size  content
+        0       2     op address (PC)
+        2       2     opcode (paged ops e.g.: $108e)
+        4       1     CC
+        5       1     A
+        6       1     B
+        7       1     DP
+        8       2     X
+        10      2     Y
+        12      2     U
+        14      2     S
+        16      8     CPU cycles
+
+    The registers are the values after the op was executed, same as
+    in XRoar traces. The records are collected in a buffer and written
+    (compressed) in big blocks.
+
+    zstd compression needs the "zstandard" package.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import struct
+import zlib
+
+import six
+xrange = six.moves.xrange
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from MC6809.components.MC6809data.MC6809_data_utils import MC6809OP_DATA_DICT
+
+from dragonpy.core.op_hooks import get_op_hooks
+
+
+log = logging.getLogger(__name__)
+
+
+MAGIC = b"DPyTRACE"
+FORMAT_VERSION = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# filename extension -> compression, see: get_compression()
+COMPRESSION_EXTENSIONS = {
+    ".z": COMPRESSION_ZLIB,
+    ".zlib": COMPRESSION_ZLIB,
+    ".zst": COMPRESSION_ZSTD,
+}
+
+HEADER_STRUCT = struct.Struct(">8sHB")
+
+# PC, opcode, CC, A, B, DP, X, Y, U, S, cycles
+RECORD_STRUCT = struct.Struct(">HHBBBBHHHHQ")
+RECORD_SIZE = RECORD_STRUCT.size
+
+READ_SIZE = RECORD_SIZE * 0x10000
+
+XROAR_LINE = (
+    "%04x| %-12s%-28s"
+    "cc=%02x a=%02x b=%02x dp=%02x x=%04x y=%04x u=%04x s=%04x"
+)
+
+
+class TraceFileError(ValueError):
+    pass
+
+
+def get_compression(filename):
+    """
+    >>> get_compression("trace.bin") == COMPRESSION_NONE
+    True
+    >>> get_compression("TRACE.ZST") == COMPRESSION_ZSTD
+    True
+    """
+    for extension, compression in COMPRESSION_EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return compression
+    return COMPRESSION_NONE
+
+
+def _get_compressor(compression):
+    if compression == COMPRESSION_NONE:
+        return None
+    elif compression == COMPRESSION_ZLIB:
+        # The fastest level: The records are very redundant anyway
+        return zlib.compressobj(1)
+    elif compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise TraceFileError("zstd compression needs the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=1).compressobj()
+    raise TraceFileError("Unknown compression: %r" % compression)
+
+
+def _get_decompressor(compression):
+    if compression == COMPRESSION_NONE:
+        return None
+    elif compression == COMPRESSION_ZLIB:
+        return zlib.decompressobj()
+    elif compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise TraceFileError("zstd compression needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise TraceFileError("Unknown compression: %r" % compression)
+
+
+class TraceWriter(object):
+    """
+    Write trace records into the binary file object f.
+    """
+    BUFFER_RECORDS = 0x4000
+
+    def __init__(self, f, compression=COMPRESSION_NONE):
+        self.f = f
+        self.compressor = _get_compressor(compression)
+        f.write(HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, compression))
+
+        self.buffer = bytearray(RECORD_SIZE * self.BUFFER_RECORDS)
+        self.offset = 0
+        self.record_count = 0
+
+    def add(self, pc, opcode, cc, a, b, dp, x, y, u, s, cycles):
+        RECORD_STRUCT.pack_into(
+            self.buffer, self.offset, pc, opcode, cc, a, b, dp, x, y, u, s, cycles
+        )
+        self.offset += RECORD_SIZE
+        if self.offset >= len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        data = bytes(self.buffer[:self.offset])
+        self.record_count += self.offset // RECORD_SIZE
+        self.offset = 0
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        self.f.write(data)
+
+    def close(self):
+        self.flush()
+        if self.compressor is not None:
+            self.f.write(self.compressor.flush())
+        self.f.flush()
+
+
+def iter_records(f):
+    """
+    Yields all records from the binary file object f as tuples,
+    see: RECORD_STRUCT
+    """
+    header = f.read(HEADER_STRUCT.size)
+    if len(header) != HEADER_STRUCT.size:
+        raise TraceFileError("Unexpected end of trace file")
+    magic, format_version, compression = HEADER_STRUCT.unpack(header)
+    if magic != MAGIC:
+        raise TraceFileError("No DragonPy trace file")
+    if format_version != FORMAT_VERSION:
+        raise TraceFileError("Trace file format version %i is not supported (current version: %i)" % (
+            format_version, FORMAT_VERSION
+        ))
+    decompressor = _get_decompressor(compression)
+
+    rest = b""
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            break
+        if decompressor is not None:
+            data = decompressor.decompress(data)
+        if rest:
+            data = rest + data
+        end = len(data) - len(data) % RECORD_SIZE
+        unpack_from = RECORD_STRUCT.unpack_from # Struct.iter_unpack() is new in Python 3.4
+        for offset in xrange(0, end, RECORD_SIZE):
+            yield unpack_from(data, offset)
+        rest = data[end:]
+
+    if rest:
+        raise TraceFileError("Trace file ends with a incomplete record")
+
+
+class TraceRecorder(object):
+    """
+    Write a trace record for every executed op.
+
+    The trace function is only registered as op hook while recording,
+    so there is no overhead if it's not used.
+    """
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.active = False
+        self.writer = None
+        self._file = None
+        self._post_hook = None
+
+    def start(self, filename, compression=None):
+        """
+        Start recording into filename. Without a compression,
+        it's selected by the filename extension, see: get_compression()
+        """
+        if self.active:
+            self.stop()
+        if compression is None:
+            compression = get_compression(filename)
+        self._file = open(filename, "wb")
+        self.writer = TraceWriter(self._file, compression)
+        self.active = True
+
+        cpu = self.cpu
+        add = self.writer.add
+        get_cc_value = cpu.get_cc_value
+        accu_a = cpu.accu_a
+        accu_b = cpu.accu_b
+        direct_page = cpu.direct_page
+        index_x = cpu.index_x
+        index_y = cpu.index_y
+        user_stack_pointer = cpu.user_stack_pointer
+        system_stack_pointer = cpu.system_stack_pointer
+
+        def tracing_post_hook(op_address, opcode, start_cycles):
+            add(
+                op_address, opcode, get_cc_value(),
+                accu_a.value, accu_b.value, direct_page.value,
+                index_x.value, index_y.value,
+                user_stack_pointer.value, system_stack_pointer.value,
+                cpu.cycles
+            )
+
+        self._post_hook = tracing_post_hook
+        get_op_hooks(cpu).add_post_hook(tracing_post_hook)
+        log.critical("Trace recording into %r started.", filename)
+
+    def stop(self):
+        if not self.active:
+            return
+        self.active = False
+
+        get_op_hooks(self.cpu).remove_post_hook(self._post_hook)
+        self._post_hook = None
+
+        self.writer.close()
+        self._file.close()
+        log.critical("Trace with %i ops saved to %r", self.writer.record_count, self._file.name)
+        self._file = None
+
+
+def format_xroar_line(record, mem_info=None):
+    """
+    Returns the record in the XRoar trace layout. The op bytes contains
+    only the opcode and the operands are not disassembled.
+
+    >>> print(format_xroar_line((0xb3ba, 0x8e, 0x50, 1, 2, 0, 0x400, 0, 0, 0x7f36, 1234)))
+    b3ba| 8e          LDX                         cc=50 a=01 b=02 dp=00 x=0400 y=0000 u=0000 s=7f36
+    """
+    pc, opcode, cc, a, b, dp, x, y, u, s, cycles = record
+    try:
+        mnemonic = MC6809OP_DATA_DICT[opcode]["mnemonic"]
+    except KeyError:
+        mnemonic = "???"
+    line = XROAR_LINE % (pc, "%02x" % opcode, mnemonic, cc, a, b, dp, x, y, u, s)
+    if mem_info is not None:
+        line += " | %s" % mem_info.get_shortest(pc)
+    return line
+
+
+def convert_to_xroar(infile, outfile, mem_info=None, max_lines=None):
+    """
+    Convert the binary trace file object infile to a XRoar text trace.
+    """
+    lines = []
+    count = 0
+    for count, record in enumerate(iter_records(infile), 1):
+        lines.append(format_xroar_line(record, mem_info))
+        if len(lines) >= 0x1000:
+            outfile.write("\n".join(lines) + "\n")
+            lines = []
+        if max_lines is not None and count >= max_lines:
+            break
+    if lines:
+        outfile.write("\n".join(lines) + "\n")
+    return count
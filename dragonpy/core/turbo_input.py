@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - Turbo text input
+    ===========================
+
+    Pasting text via the keyboard matrix is slow: The ROM scans the
+    keyboard, debounces every key and the PIA must send a "no key pressed"
+    between two keys (see: PIA.read_PIA0_A_data)
+
+    The turbo input traps the ROM line input routine (cfg.LINE_INPUT_ADDR)
+    instead: On the opcode fetch of the routine, the next pending line is
+    written into the BASIC line input buffer, the registers are set like
+    the routine returns and the CPU gets a RTS instead of the origin op.
+    So a complete line is entered in a few CPU cycles.
+    These lines are not echoed on the screen.
+
+    At the OK prompt the ROM is already inside the line input routine and
+    waits for a key in cfg.INCH_ADDR. So this routine is trapped, too:
+    The chars of the next line are returned like pressed keys, until the
+    line is complete. So the line input routine returns as usual and the
+    following lines are entered via the line input trap.
+
+    Text is send via the keyboard matrix, if:
+     * the machine has no known line input routine (e.g.: sbc09, CoCo)
+     * user input is recorded or replayed, because only the keyboard
+       input is stored with the CPU cycles, see: InputRecorder()
+     * no routine is called within FALLBACK_CYCLES, because the
+       running software scans the keyboard itself
+
+    The read middlewares are only installed while text is pending,
+    so there is no overhead if it's not used.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import collections
+import logging
+
+from dragonpy.core.input_events import CycleStampedInput
+
+
+log = logging.getLogger(__name__)
+
+
+OPCODE_RTS = 0x39
+
+
+class TurboInput(object):
+    # Send the pending text via keyboard matrix, if the line input
+    # routine was not called within this CPU cycles (~1 sec.):
+    FALLBACK_CYCLES = 900000
+
+    MAX_LINE_LENGTH = 0xfa # same as the ROM routine
+
+    def __init__(self, cpu, memory, scheduler, user_input_queue, cfg):
+        self.cpu = cpu
+        self.memory = memory
+        self.scheduler = scheduler
+        self.user_input_queue = user_input_queue
+        self.add_to_input_queue = cfg.add_to_input_queue
+
+        self.line_input_addr = cfg.LINE_INPUT_ADDR
+        self.inch_addr = cfg.INCH_ADDR
+        self.line_buffer_addr = cfg.LINE_INPUT_BUFFER_ADDR
+        self.device_number_addr = cfg.DEVICE_NUMBER_ADDR
+        if isinstance(user_input_queue, CycleStampedInput):
+            log.info("Input is recorded/replayed: Turbo input disabled.")
+            self.line_input_addr = None
+
+        self.lines = collections.deque()
+        self.partial_line = ""
+        self.line_chars = collections.deque() # rest of the line for INCH
+
+        self.active = False
+        self._origin_inch_read = None
+        self.last_hit_cycles = 0
+        self._fallback_event = None
+
+        # statistics:
+        self.line_count = 0
+
+    def pending(self):
+        """ Are complete lines waiting for the line input routine? """
+        return bool(self.lines or self.line_chars)
+
+    def _has_text(self):
+        return bool(self.lines or self.line_chars or self.partial_line)
+
+    def add_text(self, txt):
+        """
+        Enter the given text. Only complete lines are trapped,
+        the rest is enter with the next text or via fallback.
+        """
+        if self.line_input_addr is None:
+            self.add_to_input_queue(self.user_input_queue, txt)
+            return
+
+        txt = self.partial_line + txt.replace("\r\n", "\r").replace("\n", "\r")
+        lines = txt.split("\r")
+        self.partial_line = lines.pop()
+        self.lines.extend(lines)
+
+        if self._has_text():
+            self.last_hit_cycles = self.cpu.cycles
+            self.enable()
+
+    def enable(self):
+        if self.active:
+            return
+        self.active = True
+        self.memory.add_read_byte_middleware(self.line_input_read, self.line_input_addr)
+        if self.inch_addr is not None:
+            # e.g.: the idle detection uses the same address
+            try:
+                self._origin_inch_read = self.memory.remove_read_byte_middleware(self.inch_addr)
+            except KeyError:
+                self._origin_inch_read = None
+            self.memory.add_read_byte_middleware(self.inch_read, self.inch_addr)
+        self._fallback_event = self.scheduler.schedule(
+            self.FALLBACK_CYCLES, self.fallback
+        )
+
+    def disable(self):
+        if not self.active:
+            return
+        self.active = False
+        self.memory.remove_read_byte_middleware(self.line_input_addr)
+        if self.inch_addr is not None:
+            self.memory.remove_read_byte_middleware(self.inch_addr)
+            if self._origin_inch_read is not None:
+                self.memory.add_read_byte_middleware(self._origin_inch_read, self.inch_addr)
+                self._origin_inch_read = None
+        if self._fallback_event is not None:
+            self.scheduler.cancel(self._fallback_event)
+            self._fallback_event = None
+
+    def fallback(self, due_cycles):
+        """ scheduler event: Send the pending text via keyboard matrix """
+        self._fallback_event = None
+        if not self._has_text():
+            return
+        next_cycles = self.last_hit_cycles + self.FALLBACK_CYCLES
+        if next_cycles > due_cycles:
+            # The ROM reads lines: check again later
+            self._fallback_event = self.scheduler.schedule_at(next_cycles, self.fallback)
+            return
+
+        txt = "".join(chr(char) for char in self.line_chars)
+        txt += "".join(line + "\r" for line in self.lines) + self.partial_line
+        log.critical("Line input routine not called: Send %i chars via keyboard.", len(txt))
+        self.line_chars.clear()
+        self.lines.clear()
+        self.partial_line = ""
+        self.disable()
+        self.add_to_input_queue(self.user_input_queue, txt)
+
+    def _can_enter(self, address):
+        if self.cpu.program_counter.value != address:
+            return False # Not the opcode fetch
+        if not self.user_input_queue.empty():
+            return False # Key presses before the text
+        if self.memory.read_block(self.device_number_addr, self.device_number_addr + 1) != b"\x00":
+            return False # Input not from keyboard, e.g.: tape
+        return True
+
+    def _pop_line(self):
+        line = self.lines.popleft()
+        # The Dragon keyboard has no lower case and the ROM accepts
+        # only $20-$7a:
+        data = bytearray(
+            char for char in bytearray(line.upper(), "ascii", "replace")
+            if 0x20 <= char <= 0x7a
+        )
+        if len(data) > self.MAX_LINE_LENGTH:
+            log.error("Line too long, cut to %i chars: %r", self.MAX_LINE_LENGTH, line)
+            data = data[:self.MAX_LINE_LENGTH]
+        self.line_count += 1
+        return data
+
+    def line_input_read(self, cpu_cycles, op_address, address, byte):
+        """ read byte middleware for the ROM line input routine """
+        if self.line_chars or not self.lines:
+            return byte # Line entered via INCH or only a partial line is pending
+        if not self._can_enter(address):
+            return byte
+
+        data = self._pop_line()
+        self.memory.write_block(self.line_buffer_addr, data + b"\x00")
+
+        # Return like the ROM routine: X = buffer - 1, carry clear (no BREAK)
+        self.cpu.index_x.set(self.line_buffer_addr - 1)
+        self.cpu.C = 0
+
+        self.last_hit_cycles = cpu_cycles
+        if not self._has_text():
+            self.disable()
+        return OPCODE_RTS
+
+    def inch_read(self, cpu_cycles, op_address, address, byte):
+        """
+        read byte middleware for the ROM routine,
+        that is called in a loop while the line input waits for a key.
+        """
+        if self.line_chars or self.lines:
+            if self._can_enter(address):
+                if not self.line_chars:
+                    self.line_chars.extend(self._pop_line() + b"\r")
+
+                # Return like a key is pressed: char in A, Z clear
+                self.cpu.accu_a.set(self.line_chars.popleft())
+                self.cpu.Z = 0
+
+                self.last_hit_cycles = cpu_cycles
+                if not self._has_text():
+                    self.disable()
+                return OPCODE_RTS
+
+        if self._origin_inch_read is not None:
+            return self._origin_inch_read(cpu_cycles, op_address, address, byte)
+        return byte
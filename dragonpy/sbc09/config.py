@@ -51,6 +51,10 @@ class SBC09Cfg(BaseConfig):
     # Used in unittest for init the machine:
     STARTUP_END_ADDR = 0xe45a # == O.S. routine to read a character into B register.
 
+    IDLE_PCS = (
+        0xe45a, # read a character: polls the ACIA status
+    )
+
     def __init__(self, cmd_args):
         super(SBC09Cfg, self).__init__(cmd_args)
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the MC6847 text mode canvas
+    ====================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from dragonpy.Dragon32.MC6847 import MC6847_TextModeCanvas
+
+
+class Canvas(object):
+    def after(self, ms, func):
+        return "after#1"
+
+
+class TextModeCanvas(MC6847_TextModeCanvas):
+    """
+    Only the write/flush logic, without Tk: The drawn lines are collected.
+    """
+    def __init__(self):
+        self.rows = 32
+        self.columns = 16
+        self.canvas = Canvas()
+        self.dirty = {}
+        self._flush_after_id = None
+        self.displayed = [0x00] * (self.rows * self.columns)
+        self.drawn_lines = []
+
+    def draw_line(self, line):
+        self.drawn_lines.append(line)
+
+
+class TestMC6847TextModeCanvas(unittest.TestCase):
+    def setUp(self):
+        self.display = TextModeCanvas()
+
+    def test_flush(self):
+        self.display.write_byte(0, 0x1000, 0x0400, 0x41)
+        self.display.write_byte(0, 0x1000, 0x0401, 0x00) # not changed
+        self.display.write_byte(0, 0x1000, 0x05ff, 0x42)
+        self.assertEqual(self.display._flush_after_id, "after#1")
+        self.display.flush()
+        self.assertEqual(self.display.drawn_lines, [0, 15])
+        self.assertEqual(self.display.displayed[0], 0x41)
+        self.assertEqual(self.display.displayed[511], 0x42)
+        self.assertEqual(self.display.dirty, {})
+        self.assertIsNone(self.display._flush_after_id)
+
+    def test_behind_text_screen(self):
+        # The display write middleware is registered for $0400-$0600
+        self.display.write_byte(0, 0x1000, 0x0600, 0x41)
+        self.display.write_byte(0, 0x1000, 0x0420, 0x41)
+        self.display.flush()
+        self.assertEqual(self.display.drawn_lines, [1])
+        self.assertEqual(len(self.display.displayed), 512)
+
+
+if __name__ == '__main__':
+    unittest.main()
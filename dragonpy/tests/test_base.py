@@ -17,8 +17,6 @@ xrange = six.moves.xrange
 import hashlib
 import logging
 import os
-import pickle as pickle
-import sys
 import tempfile
 import time
 import unittest
@@ -37,6 +35,7 @@ from dragonpy.Simple6809.periphery_simple6809 import Simple6809PeripheryUnittest
 from MC6809.components.cpu6809 import CPU
 from dragonpy.components.memory import Memory
 from dragonpy.core.machine import Machine
+from dragonpy.core.state_file import StateFileError
 from MC6809.components.cpu_utils.MC6809_registers import ValueStorage8Bit
 from dragonpy.sbc09.config import SBC09Cfg
 from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
@@ -135,7 +134,7 @@ class Test6809_BASIC_simple6809_Base(BaseCPUTestCase):
     """
     TEMP_FILE = os.path.join(
         tempfile.gettempdir(),
-        "DragonPy_simple6809_unittests_Py%i.dat" % sys.version_info[0]
+        "DragonPy_simple6809_unittests.state"
     )
 
     @classmethod
@@ -146,7 +145,7 @@ class Test6809_BASIC_simple6809_Base(BaseCPUTestCase):
         """
         super(Test6809_BASIC_simple6809_Base, cls).setUpClass()
 
-        log.info("CPU state pickle file: %r" % cls.TEMP_FILE)
+        log.info("Machine state file: %r" % cls.TEMP_FILE)
 #         if os.path.isfile(cls.TEMP_FILE):os.remove(cls.TEMP_FILE);print "Delete CPU data file!"
 
         cfg = Simple6809Cfg(cls.UNITTEST_CFG_DICT)
@@ -163,12 +162,12 @@ class Test6809_BASIC_simple6809_Base(BaseCPUTestCase):
         cls.periphery = cls.machine.periphery
         cls.periphery.setUp()
 
-        if os.path.isfile(cls.TEMP_FILE):
-            log.info("Load CPU init state from: %r" % cls.TEMP_FILE)
-            with open(cls.TEMP_FILE, "rb") as temp_file:
-                cls.__init_state = pickle.load(temp_file)
-        else:
-            log.info("init machine...")
+        try:
+            cls.machine.load_state(cls.TEMP_FILE)
+        except (IOError, StateFileError) as err:
+            log.info("init machine (%s)...", err)
+            cls.machine.restore_snapshot(cls.machine.init_snapshot)
+            cls.cpu.reset()
             init_start = time.time()
             cls.cpu.test_run(
                 start=cls.cpu.program_counter.value,
@@ -187,19 +186,21 @@ class Test6809_BASIC_simple6809_Base(BaseCPUTestCase):
                 '\r\n'
                 'OK\r\n'
             ), "Outlines are: %s" % repr(cls.periphery.output_lines)
-            # Save CPU state
-            init_state = cls.cpu.get_state()
-            with open(cls.TEMP_FILE, "wb") as f:
-                pickle.dump(init_state, f)
-                log.info("Save CPU init state to: %r" % cls.TEMP_FILE)
-            cls.__init_state = init_state
+            # Save machine state
+            cls.machine.save_state(cls.TEMP_FILE)
+            log.info("Save machine init state to: %r" % cls.TEMP_FILE)
+        else:
+            log.info("Machine init state loaded from: %r" % cls.TEMP_FILE)
+
+        # Restore the state via copy-on-write snapshot in every setUp():
+        cls.__init_snapshot = cls.machine.take_snapshot()
 
 #        print_cpu_state_data(cls.__init_state)
 
     def setUp(self):
         """ restore CPU/Periphery state to a fresh startup. """
+        self.machine.restore_snapshot(self.__init_snapshot)
         self.periphery.setUp()
-        self.cpu.set_state(self.__init_state)
 #         print_cpu_state_data(self.cpu.get_state())
 
     def _run_until_OK(self, OK_count=1, max_ops=5000):
@@ -236,7 +237,7 @@ class Test6809_sbc09_Base(BaseCPUTestCase):
     """
     TEMP_FILE = os.path.join(
         tempfile.gettempdir(),
-        "DragonPy_sbc09_unittests_Py%i.dat" % sys.version_info[0]
+        "DragonPy_sbc09_unittests.state"
     )
 
     @classmethod
@@ -247,7 +248,7 @@ class Test6809_sbc09_Base(BaseCPUTestCase):
         """
         super(Test6809_sbc09_Base, cls).setUpClass()
 
-        log.info("CPU state pickle file: %r" % cls.TEMP_FILE)
+        log.info("Machine state file: %r" % cls.TEMP_FILE)
 #        if os.path.isfile(cls.TEMP_FILE):
 #            print("Delete CPU date file!")
 #            os.remove(cls.TEMP_FILE)
@@ -268,9 +269,11 @@ class Test6809_sbc09_Base(BaseCPUTestCase):
         cls.periphery.setUp()
 
         try:
-            temp_file = open(cls.TEMP_FILE, "rb")
-        except IOError:
-            log.info("init machine...")
+            cls.machine.load_state(cls.TEMP_FILE)
+        except (IOError, StateFileError) as err:
+            log.info("init machine (%s)...", err)
+            cls.machine.restore_snapshot(cls.machine.init_snapshot)
+            cls.cpu.reset()
             init_start = time.time()
             cls.cpu.test_run(
                 start=cls.cpu.program_counter.value,
@@ -285,23 +288,21 @@ class Test6809_sbc09_Base(BaseCPUTestCase):
             assert cls.periphery.output == (
                 'Welcome to BUGGY version 1.0\r\n'
             ), "Outlines are: %s" % repr(cls.periphery.output)
-            # Save CPU state
-            init_state = cls.cpu.get_state()
-            with open(cls.TEMP_FILE, "wb") as f:
-                pickle.dump(init_state, f)
-                log.info("Save CPU init state to: %r" % cls.TEMP_FILE)
-            cls.__init_state = init_state
+            # Save machine state
+            cls.machine.save_state(cls.TEMP_FILE)
+            log.info("Save machine init state to: %r" % cls.TEMP_FILE)
         else:
-            log.info("Load CPU init state from: %r" % cls.TEMP_FILE)
-            cls.__init_state = pickle.load(temp_file)
-            temp_file.close()
+            log.info("Machine init state loaded from: %r" % cls.TEMP_FILE)
+
+        # Restore the state via copy-on-write snapshot in every setUp():
+        cls.__init_snapshot = cls.machine.take_snapshot()
 
 #         print_cpu_state_data(cls.__init_state)
 
     def setUp(self):
         """ restore CPU/Periphery state to a fresh startup. """
+        self.machine.restore_snapshot(self.__init_snapshot)
         self.periphery.setUp()
-        self.cpu.set_state(self.__init_state)
 #         print_cpu_state_data(self.cpu.get_state())
 
     def _run_until(self, terminator, count, max_ops):
@@ -346,7 +347,7 @@ class Test6809_Dragon32_Base(BaseCPUTestCase):
     """
     TEMP_FILE = os.path.join(
         tempfile.gettempdir(),
-        "DragonPy_Dragon32_unittests_Py%i.dat" % sys.version_info[0]
+        "DragonPy_Dragon32_unittests.state"
     )
 
     @classmethod
@@ -357,7 +358,7 @@ class Test6809_Dragon32_Base(BaseCPUTestCase):
         """
         super(Test6809_Dragon32_Base, cls).setUpClass()
 
-        log.info("CPU state pickle file: %r" % cls.TEMP_FILE)
+        log.info("Machine state file: %r" % cls.TEMP_FILE)
 #         os.remove(cls.TEMP_FILE);print "Delete CPU date file!"
 
         cfg = Dragon32Cfg(cls.UNITTEST_CFG_DICT)
@@ -376,9 +377,11 @@ class Test6809_Dragon32_Base(BaseCPUTestCase):
 
 #        os.remove(cls.TEMP_FILE)
         try:
-            temp_file = open(cls.TEMP_FILE, "rb")
-        except IOError:
-            log.info("init machine...")
+            cls.machine.load_state(cls.TEMP_FILE)
+        except (IOError, StateFileError) as err:
+            log.info("init machine (%s)...", err)
+            cls.machine.restore_snapshot(cls.machine.init_snapshot)
+            cls.cpu.reset()
             init_start = time.time()
             cls.cpu.test_run(
                 start=cls.cpu.program_counter.value,
@@ -397,24 +400,21 @@ class Test6809_Dragon32_Base(BaseCPUTestCase):
                 '(C) 1982 BY MICROSOFT',
                 '', 'OK'
             ]
-            # Save CPU state
-            init_state = cls.cpu.get_state()
-            with open(cls.TEMP_FILE, "wb") as f:
-                pickle.dump(init_state, f)
-                log.info("Save CPU init state to: %r" % cls.TEMP_FILE)
-            cls.__init_state = init_state
+            # Save machine state
+            cls.machine.save_state(cls.TEMP_FILE)
+            log.info("Save machine init state to: %r" % cls.TEMP_FILE)
         else:
-            log.info("Load CPU init state from: %r" % cls.TEMP_FILE)
-            cls.__init_state = pickle.load(temp_file)
-            temp_file.close()
+            log.info("Machine init state loaded from: %r" % cls.TEMP_FILE)
+
+        # Restore the state via copy-on-write snapshot in every setUp():
+        cls.__init_snapshot = cls.machine.take_snapshot()
 
 #        print "cls.__init_state:", ;print_cpu_state_data(cls.__init_state)
 
     def setUp(self):
         """ restore CPU/Periphery state to a fresh startup. """
+        self.machine.restore_snapshot(self.__init_snapshot)
         self.periphery.setUp()
-#        print "self.__init_state:", ;print_cpu_state_data(self.__init_state)
-        self.cpu.set_state(self.__init_state)
 #        print "self.cpu.get_state():", ;print_cpu_state_data(self.cpu.get_state())
 
     def _run_until_OK(self, OK_count=1, max_ops=5000):
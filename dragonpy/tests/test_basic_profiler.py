@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the BASIC line profiler
+    ================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.components.memory import Memory
+from dragonpy.core.basic_profiler import BasicLineProfiler
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TestBasicLineProfiler(unittest.TestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        memory = Memory(cfg)
+        self.cpu = CPU(memory, cfg)
+        memory.cpu = self.cpu # FIXME
+
+        # Simulate the interpreter, that set the current line number:
+        self.cpu.memory.load(0x1000, [
+            0xcc, 0x00, 0x0a, # LDD #10
+            0xfd, 0x00, 0x68, # STD $0068
+            0x12, # NOP
+            0xcc, 0x00, 0x14, # LDD #20
+            0xfd, 0x00, 0x68, # STD $0068
+            0x12, # NOP
+            0x12, # NOP
+            0x20, 0xef, # BRA $1000
+        ])
+        self.cpu.program_counter.set(0x1000)
+        self.cpu.outer_burst_op_count = 100
+        self.cpu.inner_burst_op_count = 80 # 1000 loops with 8 ops
+
+        self.profiler = BasicLineProfiler(self.cpu, memory, current_line_addr=0x68)
+
+    def test_cycles_per_line(self):
+        start_cycles = self.cpu.cycles
+        self.profiler.enable()
+        self.cpu.burst_run()
+        self.profiler.disable()
+
+        data = self.profiler.get_data()
+        self.assertEqual([line for line, cycles, count in data], [10, 20])
+        self.assertEqual([count for line, cycles, count in data], [1000, 1000])
+
+        line10_cycles, line20_cycles = [cycles for line, cycles, count in data]
+        # line 20 runs one NOP and the BRA more:
+        self.assertGreater(line20_cycles, line10_cycles)
+        # Only the cycles before the first STD are not counted:
+        missing_cycles = self.cpu.cycles - start_cycles - line10_cycles - line20_cycles
+        self.assertGreater(missing_cycles, 0)
+        self.assertLess(missing_cycles, 20)
+
+        # Disabled -> no counting
+        self.cpu.burst_run()
+        self.assertEqual(self.profiler.get_data(), data)
+
+    def test_direct_mode_not_in_report(self):
+        self.profiler.enable()
+        self.cpu.memory.write_word(0x68, 0xffff)
+        self.cpu.memory.write_word(0x68, 10)
+        self.profiler.disable()
+        self.assertEqual(sorted(self.profiler.lines), [10, 0xffff])
+        self.assertEqual(self.profiler.get_data(), [(10, 0, 1)])
+
+    def test_report(self):
+        self.profiler.enable()
+        self.cpu.burst_run()
+        self.profiler.disable()
+
+        report = self.profiler.get_report(listing=[
+            '10 A=A+1',
+            '20 GOTO 10',
+        ])
+        lines = report.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn("line", lines[0])
+        self.assertTrue(lines[1].strip().startswith("10 "))
+        self.assertTrue(lines[1].endswith("| A=A+1"))
+        self.assertTrue(lines[2].endswith("| GOTO 10"))
+        self.assertIn("1000", lines[2])
+        self.assertIn("100.0%", lines[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the boot snapshot cache
+    ================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+import dragonpy
+from dragonpy.core.boot_cache import BootCache, get_boot_cache_filename
+from dragonpy.core.machine import Machine
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+class TestBootCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_boot_cache_")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def _get_cfg(self, boot_cache=True):
+        cfg_dict = dict(BaseCPUTestCase.UNITTEST_CFG_DICT)
+        cfg_dict["boot_cache"] = boot_cache
+        cfg_dict["boot_cache_path"] = self.temp_path
+        return SBC09Cfg(cfg_dict)
+
+    def _get_machine(self, cfg):
+        return Machine(
+            cfg,
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=queue.Queue(),
+            user_input_queue=queue.Queue(),
+        )
+
+    def test_filename(self):
+        cfg = self._get_cfg()
+        filename = get_boot_cache_filename(cfg, SBC09PeripheryUnittest)
+        self.assertTrue(filename.startswith("sbc09_boot_"), filename)
+        self.assertEqual(filename, get_boot_cache_filename(cfg, SBC09PeripheryUnittest))
+
+        old_version = dragonpy.__version__
+        dragonpy.__version__ = "0.0.0"
+        try:
+            self.assertNotEqual(filename, get_boot_cache_filename(cfg, SBC09PeripheryUnittest))
+        finally:
+            dragonpy.__version__ = old_version
+
+    def test_create_and_load(self):
+        cfg = self._get_cfg()
+        boot_cache = BootCache(cfg, SBC09PeripheryUnittest, path=self.temp_path)
+        self.assertFalse(boot_cache.exists())
+
+        # first boot: run the ROM initialization and create the cache
+        machine = self._get_machine(cfg)
+        self.assertTrue(boot_cache.exists())
+        self.assertEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+        self.assertEqual(machine.periphery.output, 'Welcome to BUGGY version 1.0\r\n')
+        cycles = machine.cpu.cycles
+        ram = machine.cpu.memory.read_block(0x0000, 0x7fff)
+
+        # second boot: restore from cache
+        machine = self._get_machine(cfg)
+        self.assertEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+        self.assertEqual(machine.periphery.output, 'Welcome to BUGGY version 1.0\r\n')
+        self.assertEqual(machine.cpu.cycles, cycles)
+        self.assertEqual(machine.cpu.memory.read_block(0x0000, 0x7fff), ram)
+
+    def test_cold_boot(self):
+        cfg = self._get_cfg(boot_cache=False)
+        machine = self._get_machine(cfg)
+        self.assertEqual(os.listdir(self.temp_path), [])
+        self.assertNotEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+
+    def test_broken_cache_file(self):
+        cfg = self._get_cfg()
+        boot_cache = BootCache(cfg, SBC09PeripheryUnittest, path=self.temp_path)
+        with open(boot_cache.filepath, "wb") as f:
+            f.write(b"no snapshot")
+
+        machine = self._get_machine(cfg)
+        self.assertEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+        self.assertTrue(boot_cache.load(machine))
+
+    def test_broken_periphery_state(self):
+        class BrokenState(object):
+            def __repr__(self):
+                return "{'broken"
+
+        cfg = self._get_cfg()
+        boot_cache = BootCache(cfg, SBC09PeripheryUnittest, path=self.temp_path)
+        machine = self._get_machine(cfg)
+        machine.periphery.get_state = lambda: BrokenState()
+        self.assertTrue(boot_cache.save(machine))
+
+        machine = self._get_machine(cfg) # cold boot
+        self.assertEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+        self.assertEqual(machine.periphery.output, 'Welcome to BUGGY version 1.0\r\n')
+        self.assertTrue(boot_cache.load(machine)) # new cache file created
+
+    def test_unwritable_path(self):
+        cfg_dict = dict(BaseCPUTestCase.UNITTEST_CFG_DICT)
+        cfg_dict["boot_cache"] = True
+        cfg_dict["boot_cache_path"] = os.path.join(self.temp_path, "does_not_exist")
+        cfg = SBC09Cfg(cfg_dict)
+        machine = self._get_machine(cfg)
+        self.assertEqual(machine.cpu.program_counter.value, cfg.STARTUP_END_ADDR)
+        self.assertEqual(os.listdir(self.temp_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for breakpoints and watchpoints
+    ====================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import pickle
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.components.memory import Memory, PAGE_RAM
+from dragonpy.core.breakpoints import (
+    BREAK, WATCH_CHANGE, WATCH_READ, WATCH_WRITE, BreakpointHit, Breakpoints
+)
+from dragonpy.core.scheduler import get_scheduler
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TestBreakpoints(unittest.TestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        self.memory = Memory(cfg)
+        self.cpu = CPU(self.memory, cfg)
+        self.memory.cpu = self.cpu # FIXME
+        get_scheduler(self.cpu)
+
+        self.memory.load(0x1000, [
+            0x86, 0x00, # LDA #0
+            0x4c, # INCA
+            0xb7, 0x20, 0x00, # STA $2000
+            0xf6, 0x21, 0x00, # LDB $2100
+            0x20, 0xf7, # BRA $1002
+        ])
+        self.cpu.program_counter.set(0x1000)
+        self.cpu.outer_burst_op_count = 10
+        self.cpu.inner_burst_op_count = 100
+
+        self.breakpoints = Breakpoints(self.cpu, self.memory)
+
+    def run_until_hit(self):
+        with self.assertRaises(BreakpointHit) as context_manager:
+            self.cpu.burst_run()
+        return context_manager.exception
+
+    def test_breakpoint(self):
+        self.breakpoints.add_breakpoint(0x1003)
+        hit = self.run_until_hit()
+        self.assertEqual(hit.kind, BREAK)
+        self.assertEqual(hit.address, 0x1003)
+        self.assertEqual(self.cpu.program_counter.value, 0x1003)
+        self.assertEqual(hit.registers["A"], 1)
+        self.assertIn("Breakpoint $1003", str(hit))
+
+        # continue: the op at the breakpoint is executed
+        hit = self.run_until_hit()
+        self.assertEqual(hit.registers["A"], 2)
+        self.assertEqual(self.memory.read_byte(0x2000), 1)
+        self.assertEqual(self.breakpoints.hit_count, 2)
+
+    def test_breakpoint_cycles(self):
+        self.breakpoints.add_breakpoint(0x1002)
+        hit_cycles = [self.run_until_hit().registers["cycles"] for __ in range(3)]
+
+        # The same without breakpoints:
+        self.breakpoints.clear()
+        self.cpu.reset()
+        self.cpu.program_counter.set(0x1000)
+        start_cycles = self.cpu.cycles
+        cycles = []
+        while len(cycles) < 3:
+            self.cpu.get_and_call_next_op()
+            if self.cpu.program_counter.value == 0x1002:
+                cycles.append(self.cpu.cycles - start_cycles)
+        self.assertEqual(
+            [hit - hit_cycles[0] for hit in hit_cycles],
+            [cycle - cycles[0] for cycle in cycles],
+        )
+
+    def test_write_watchpoint(self):
+        self.breakpoints.add_watchpoint(0x2000, mode=WATCH_WRITE)
+        hit = self.run_until_hit()
+        self.assertEqual(hit.kind, WATCH_WRITE)
+        self.assertEqual(hit.value, 1)
+        # stopped after the STA op:
+        self.assertEqual(hit.registers["last_op_address"], 0x1003)
+        self.assertEqual(self.cpu.program_counter.value, 0x1006)
+        self.assertEqual(self.memory.read_byte(0x2000), 1)
+
+        hit = self.run_until_hit()
+        self.assertEqual(hit.value, 2)
+
+    def test_change_watchpoint(self):
+        self.memory.write_byte(0x2000, 1)
+        self.breakpoints.add_watchpoint(0x2000, mode=WATCH_CHANGE)
+        hit = self.run_until_hit()
+        self.assertEqual(hit.kind, WATCH_CHANGE)
+        self.assertEqual(hit.value, 2) # the write of 1 was no change
+
+    def test_read_watchpoint(self):
+        self.breakpoints.add_watchpoint(0x2080, 0x21ff, mode=WATCH_READ)
+        hit = self.run_until_hit()
+        self.assertEqual(hit.kind, WATCH_READ)
+        self.assertEqual(hit.address, 0x2100)
+        self.assertEqual(self.cpu.program_counter.value, 0x1009)
+
+    def test_paged_op(self):
+        self.memory.load(0x1000, [
+            0x10, 0x8e, 0x12, 0x34, # LDY #$1234
+            0x10, 0xbf, 0x20, 0x00, # STY $2000
+            0x20, 0xf6, # BRA $1000
+        ])
+        self.breakpoints.add_watchpoint(0x2000, 0x2001, mode=WATCH_WRITE)
+        hit = self.run_until_hit()
+        self.assertEqual(hit.address, 0x2000)
+        self.assertEqual(self.cpu.program_counter.value, 0x1008)
+        self.assertEqual(self.memory.read_word(0x2000), 0x1234)
+
+    def test_no_overhead(self):
+        self.breakpoints.add_breakpoint(0x1003)
+        self.breakpoints.add_watchpoint(0x2000, mode=WATCH_WRITE)
+        self.assertIn("_read_byte_io", self.memory.__dict__)
+        self.assertIn("_write_byte_slow", self.memory.__dict__)
+
+        self.breakpoints.clear()
+        self.assertEqual(len(self.breakpoints), 0)
+        self.assertNotIn("_read_byte_io", self.memory.__dict__)
+        self.assertNotIn("_write_byte_slow", self.memory.__dict__)
+        self.assertEqual(self.memory.get_page_type(0x1003), (PAGE_RAM, PAGE_RAM))
+        self.cpu.burst_run()
+
+    def test_pickle_hit(self):
+        self.breakpoints.add_breakpoint(0x1003)
+        hit = self.run_until_hit()
+        hit2 = pickle.loads(pickle.dumps(hit))
+        self.assertEqual(str(hit2), str(hit))
+
+
+if __name__ == '__main__':
+    unittest.main()
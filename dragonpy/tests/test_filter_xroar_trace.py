@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for misc/filter_xroar_trace.py
+    ===================================================
+
+    The process pool (for regular files) and the line by line
+    stream processing (e.g.: for stdin) must give the same results.
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import dragonpy
+
+
+MISC_PATH = os.path.join(os.path.dirname(os.path.dirname(dragonpy.__file__)), "misc")
+sys.path.insert(0, MISC_PATH)
+try:
+    import filter_xroar_trace
+except ImportError:
+    filter_xroar_trace = None
+finally:
+    sys.path.remove(MISC_PATH)
+
+
+TRACE_LINES = [
+    "b3ba| 8e0400      LDX     #$0400            cc=50 a=01 b=02 dp=00 x=0400 y=0000 u=0000 s=7f36\n",
+    "b3bd| 8660        LDA     #$60              cc=50 a=60 b=02 dp=00 x=0400 y=0000 u=0000 s=7f36\n",
+    "b3bf| a780        STA     ,X+               cc=50 a=60 b=02 dp=00 x=0401 y=0000 u=0000 s=7f36\n",
+    "b3c1| 8c0600      CMPX    #$0600            cc=59 a=60 b=02 dp=00 x=0401 y=0000 u=0000 s=7f36\n",
+    "b3c4| 26f9        BNE     $b3bf             cc=59 a=60 b=02 dp=00 x=0401 y=0000 u=0000 s=7f36\n",
+]
+
+
+class StreamFile(io.StringIO):
+    """ Like sys.stdin: no regular file """
+    name = "<stdin>"
+
+
+class OutFile(io.StringIO):
+    """ Count the write() calls and keep the content after close() """
+    name = "<stdout>"
+    write_count = 0
+    content = None
+
+    def write(self, txt):
+        self.write_count += 1
+        return super(OutFile, self).write(txt)
+
+    def close(self):
+        self.content = self.getvalue()
+        super(OutFile, self).close()
+
+
+@unittest.skipIf(filter_xroar_trace is None, "misc/filter_xroar_trace.py not found")
+class TestXroarTraceFilter(unittest.TestCase):
+    def setUp(self):
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_xroar_")
+        self.filename = os.path.join(self.temp_path, "trace.txt")
+        # A loop, many times:
+        self.trace = "".join(TRACE_LINES[:2] + TRACE_LINES[2:] * 50 + TRACE_LINES[:1])
+        with open(self.filename, "w") as f:
+            f.write(self.trace)
+
+        # Use more than one chunk:
+        self.origin_chunk_size = filter_xroar_trace.CHUNK_SIZE
+        filter_xroar_trace.CHUNK_SIZE = 1000
+
+    def tearDown(self):
+        filter_xroar_trace.CHUNK_SIZE = self.origin_chunk_size
+        shutil.rmtree(self.temp_path)
+
+    def _unique(self, infile):
+        out_filename = os.path.join(self.temp_path, "out.txt")
+        with open(out_filename, "w") as outfile:
+            xt = filter_xroar_trace.XroarTraceFilter(infile, outfile, processes=2)
+            xt.unique()
+        with open(out_filename, "r") as f:
+            return f.read()
+
+    def test_unique(self):
+        with open(self.filename, "r") as infile:
+            self.assertTrue(filter_xroar_trace.is_regular_file(infile))
+            pooled = self._unique(infile)
+        stream = self._unique(StreamFile(self.trace))
+        self.assertEqual(pooled, stream)
+        self.assertEqual(pooled, "".join(TRACE_LINES))
+
+    def test_load_tracefile(self):
+        xt = filter_xroar_trace.XroarTraceFilter(None, None, processes=2)
+        with open(self.filename, "r") as infile:
+            pooled = xt.load_tracefile(infile)
+        stream = xt.load_tracefile(StreamFile(self.trace))
+        self.assertEqual(pooled, stream)
+        self.assertEqual(pooled["b3ba"], 2)
+        self.assertEqual(pooled["b3bf"], 50)
+
+    def test_filter(self):
+        outfile = OutFile()
+        xt = filter_xroar_trace.XroarTraceFilter(StreamFile(self.trace), outfile)
+        xt.filter(addr_filter={"b3bf": 50, "b3c1": 50})
+        lines = outfile.content.splitlines(True)
+        self.assertEqual(lines[:3], TRACE_LINES[:2] + ["... [Skip 2 lines] ...\n"])
+        self.assertEqual(len(lines), 2 + 50 * 2 + 1)
+        self.assertEqual(outfile.write_count, 1) # via BufferedWriter
+
+    def test_start_stop(self):
+        outfile = OutFile()
+        xt = filter_xroar_trace.XroarTraceFilter(StreamFile(self.trace), outfile)
+        xt.start_stop(0xb3bf, 0xb3ba)
+        self.assertEqual(outfile.content.count("---- [ START $b3bf ] ----"), 1)
+        self.assertEqual(outfile.content.count("---- [ END $b3ba ] ----"), 1)
+        self.assertIn("".join(TRACE_LINES[2:] * 50 + TRACE_LINES[:1]), outfile.content)
+        self.assertLessEqual(outfile.write_count, 5) # via BufferedWriter
+
+if __name__ == '__main__':
+    unittest.main()
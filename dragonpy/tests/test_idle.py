@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the idle loop detection
+    ================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from dragonpy.core.machine import Machine
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+class TestIdleDetection(unittest.TestCase):
+    def get_machine(self, idle_detection):
+        cfg_dict = dict(BaseCPUTestCase.UNITTEST_CFG_DICT)
+        cfg_dict["idle_detection"] = idle_detection
+        machine = Machine(
+            SBC09Cfg(cfg_dict),
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=None,
+            user_input_queue=queue.Queue(),
+        )
+        machine.idle_detector.MAX_SLEEP_TIME = 0.001
+        machine.cpu.outer_burst_op_count = 100
+        machine.cpu.inner_burst_op_count = 100
+        return machine
+
+    def test_idle_without_input(self):
+        machine = self.get_machine(idle_detection=True)
+        self.assertTrue(machine.idle_detector.active)
+        machine.cpu.burst_run()
+        self.assertGreater(machine.idle_detector.idle_count, 0)
+
+    def test_disabled(self):
+        machine = self.get_machine(idle_detection=False)
+        self.assertFalse(machine.idle_detector.active)
+        machine.cpu.burst_run()
+        self.assertEqual(machine.idle_detector.idle_count, 0)
+
+    def test_fast_forward(self):
+        machine = self.get_machine(idle_detection=True)
+        calls = []
+        due_cycles = machine.cpu.cycles + 10 ** 9
+        machine.scheduler.schedule_at(due_cycles, calls.append, wakeup=True)
+        machine.cpu.burst_run()
+        self.assertEqual(calls, [due_cycles])
+        self.assertGreaterEqual(machine.cpu.cycles, due_cycles)
+        self.assertGreater(machine.idle_detector.skipped_cycles, 0)
+
+    def test_no_fast_forward_to_other_events(self):
+        # e.g.: the turbo input fallback timeout
+        machine = self.get_machine(idle_detection=True)
+        calls = []
+        machine.scheduler.schedule(10 ** 9, calls.append)
+        machine.cpu.burst_run()
+        self.assertGreater(machine.idle_detector.idle_count, 0)
+        self.assertEqual(calls, [])
+        self.assertEqual(machine.idle_detector.skipped_cycles, 0)
+
+    def test_sleep_time(self):
+        machine = self.get_machine(idle_detection=True)
+        idle_detector = machine.idle_detector
+        idle_detector.CYCLES_PER_SEC = 100000
+        idle_detector.MAX_SLEEP_TIME = 1
+        machine.scheduler.schedule(1900, lambda cycles: None, wakeup=True)
+        idle_detector.idle(loop_cycles=100)
+        self.assertEqual(idle_detector.skipped_cycles, 1900)
+        self.assertGreaterEqual(idle_detector.sleep_time, 0.02) # 2000 cycles
+        self.assertLess(idle_detector.sleep_time, 0.5)
+
+    def test_input_while_idle(self):
+        machine = self.get_machine(idle_detection=True)
+        machine.cpu.burst_run()
+        idle_count = machine.idle_detector.idle_count
+        self.assertGreater(idle_count, 0)
+
+        machine.periphery.output = ""
+        machine.periphery.add_to_input_queue("r\r") # display registers
+        machine.cpu.outer_burst_op_count = 1
+        for __ in range(100):
+            machine.cpu.burst_run()
+            if machine.periphery.output.count("\n") >= 2:
+                break
+        self.assertIn("X=0000", machine.periphery.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
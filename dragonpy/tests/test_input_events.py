@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for input record/replay
+    ============================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import six
+xrange = six.moves.xrange
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from dragonpy.core.input_events import InputRecorder, InputReplay, load_input_events
+from dragonpy.core.machine import Machine
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+class TestInputRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_input_")
+        self.filename = os.path.join(self.temp_path, "input.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def _get_machine(self, **kwargs):
+        cfg_dict = dict(BaseCPUTestCase.UNITTEST_CFG_DICT)
+        cfg_dict.update(kwargs)
+        return Machine(
+            SBC09Cfg(cfg_dict),
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=queue.Queue(),
+            user_input_queue=queue.Queue(),
+        )
+
+    def _run(self, machine, op_count):
+        get_and_call_next_op = machine.cpu.get_and_call_next_op
+        for __ in xrange(op_count):
+            get_and_call_next_op()
+
+    def test_record_and_replay(self):
+        machine = self._get_machine(input_record=self.filename)
+        self.assertIsInstance(machine.user_input_queue, InputRecorder)
+        self._run(machine, 20000)
+        machine.periphery.add_to_input_queue('H100+1\r\n')
+        self._run(machine, 5000)
+        machine.periphery.add_to_input_queue('H200+2\r\n')
+        self._run(machine, 5000)
+        machine.quit()
+        recorded_output = machine.periphery.output
+        recorded_cycles = machine.cpu.cycles
+        self.assertIn("0101\r\n", recorded_output)
+        self.assertIn("0202\r\n", recorded_output)
+
+        events = load_input_events(self.filename, machine.cfg)
+        self.assertEqual("".join([item for cycles, item in events]), 'H100+1\r\nH200+2\r\n')
+
+        machine = self._get_machine(input_replay=self.filename)
+        self.assertIsInstance(machine.user_input_queue, InputReplay)
+        # Live input is ignored while replaying:
+        machine.periphery.add_to_input_queue('X')
+        self._run(machine, 30000)
+        self.assertTrue(machine.user_input_queue.is_finished())
+        self.assertEqual(machine.user_input_queue.late_count, 0)
+        self.assertEqual(machine.periphery.output, recorded_output)
+        self.assertEqual(machine.cpu.cycles, recorded_cycles)
+
+    def _run_with_idle(self, **kwargs):
+        machine = self._get_machine(idle_detection=True, **kwargs)
+        machine.idle_detector.MAX_SLEEP_TIME = 0.0001
+        self.assertTrue(machine.idle_detector.active)
+
+        def timer(due_cycles): # e.g.: the SAM IRQ
+            machine.scheduler.schedule_at(due_cycles + 20000, timer, wakeup=True)
+        timer(machine.cpu.cycles)
+
+        # Run via burst_run(), so the scheduler events are called:
+        machine.cpu.outer_burst_op_count = 100
+        machine.cpu.inner_burst_op_count = 100
+        machine.cpu.burst_run()
+        machine.periphery.add_to_input_queue('H100+1\r\n')
+        machine.cpu.burst_run()
+        machine.quit()
+        return machine
+
+    def test_record_and_replay_with_idle_detection(self):
+        machine = self._run_with_idle(input_record=self.filename)
+        self.assertGreater(machine.idle_detector.idle_count, 0)
+        self.assertFalse(machine.idle_detector.fast_forward)
+        recorded_output = machine.periphery.output
+        recorded_cycles = machine.cpu.cycles
+        self.assertIn("0101\r\n", recorded_output)
+
+        machine = self._run_with_idle(input_replay=self.filename)
+        self.assertTrue(machine.user_input_queue.is_finished())
+        self.assertEqual(machine.user_input_queue.late_count, 0)
+        self.assertEqual(machine.periphery.output, recorded_output)
+        self.assertEqual(machine.cpu.cycles, recorded_cycles)
+
+    def test_replay_waits_for_cycle(self):
+        replay = InputReplay([(100, "A"), (200, "B")])
+        machine = Machine(
+            SBC09Cfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT)),
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=queue.Queue(),
+            user_input_queue=replay,
+        )
+        self.assertIs(replay.cpu, machine.cpu)
+
+        machine.cpu.cycles = 99
+        self.assertTrue(replay.empty())
+        self.assertRaises(queue.Empty, replay.get_nowait)
+        machine.cpu.cycles = 100
+        self.assertFalse(replay.empty())
+        self.assertEqual(replay.get_nowait(), "A")
+        machine.cpu.cycles = 300
+        self.assertEqual(replay.get_nowait(), "B")
+        self.assertEqual(replay.late_count, 1)
+        self.assertTrue(replay.is_finished())
+
+    def test_wrong_machine(self):
+        machine = self._get_machine(input_record=self.filename)
+        machine.quit()
+        cfg = SBC09Cfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        cfg.CONFIG_NAME = "Dragon32"
+        self.assertRaises(ValueError, load_input_events, self.filename, cfg)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the machine process mode
+    =================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import multiprocessing
+import time
+import unittest
+
+from dragonpy.core import machine_process
+from dragonpy.core.machine_process import MachineProcess
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+VIDEO_RAM_START = 0x0400
+VIDEO_RAM_END = 0x0600
+
+
+class VideoRAMPeripheryUnittest(SBC09PeripheryUnittest):
+    """
+    Send writes into $0400-$05ff to the display callback,
+    like the Dragon text mode display.
+    """
+    def __init__(self, cfg, cpu, memory, display_callback, user_input_queue):
+        super(VideoRAMPeripheryUnittest, self).__init__(
+            cfg, cpu, memory, display_callback, user_input_queue
+        )
+        memory.add_write_byte_middleware(display_callback, VIDEO_RAM_START, VIDEO_RAM_END - 1)
+        for offset, value in enumerate(b"DragonPy"):
+            memory.write_byte(VIDEO_RAM_START + offset, value)
+
+
+@unittest.skipIf(machine_process.shared_memory is None, "Needs multiprocessing.shared_memory")
+class TestMachineProcess(unittest.TestCase):
+    def setUp(self):
+        self.machine_process = MachineProcess(
+            SBC09Cfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT)),
+            periphery_class=VideoRAMPeripheryUnittest,
+            user_input_queue=multiprocessing.Queue(),
+            video_ram_start=VIDEO_RAM_START,
+            video_ram_end=VIDEO_RAM_END,
+        )
+        self.machine_process.start()
+
+    def tearDown(self):
+        self.machine_process.quit()
+        self.assertFalse(self.machine_process.process.is_alive())
+
+    def test_shared_video_ram(self):
+        video_ram = self.machine_process.video_ram
+        self.assertEqual(len(video_ram), VIDEO_RAM_END - VIDEO_RAM_START)
+        self.assertEqual(bytes(video_ram[:8]), b"DragonPy")
+
+    def test_update_settings(self):
+        cpu = self.machine_process.machine.cpu
+        self.machine_process.update_settings(0.01, None, 10000)
+        cycles = cpu.cycles
+        end_time = time.time() + 10
+        while cpu.cycles == cycles and time.time() < end_time:
+            time.sleep(0.01)
+            self.machine_process.update_settings(0.01, None, 10000)
+        self.assertGreater(cpu.cycles, cycles)
+        self.assertGreater(self.machine_process.burst_count, 0)
+        self.assertTrue(cpu.running)
+
+    def test_pause_and_run_burst(self):
+        self.machine_process.pause()
+        self.assertTrue(self.machine_process.is_paused())
+        self.machine_process.update_settings(0.01, None, 10000)
+        burst_count = self.machine_process.burst_count
+        time.sleep(0.05)
+        self.machine_process.update_settings(0.01, None, 10000)
+        self.assertEqual(self.machine_process.burst_count, burst_count)
+
+        self.machine_process.run_burst()
+        self.machine_process.update_settings(0.01, None, 10000)
+        self.assertEqual(self.machine_process.burst_count, burst_count + 1)
+
+        self.machine_process.resume()
+        self.assertFalse(self.machine_process.is_paused())
+
+
+if __name__ == '__main__':
+    unittest.main()
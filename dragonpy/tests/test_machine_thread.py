@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the threaded CPU mode
+    ==============================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+import time
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from dragonpy.core.display_buffer import DisplayRingBuffer
+from dragonpy.core.machine import ThreadedMachine
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+class TestDisplayRingBuffer(unittest.TestCase):
+    def test_wrap_around(self):
+        buffer = DisplayRingBuffer(size=8)
+        result = []
+        for i in range(100):
+            self.assertTrue(buffer.put(i))
+            if i % 5 == 4:
+                result += buffer.drain()
+        result += buffer.drain()
+        self.assertEqual(result, list(range(100)))
+        self.assertFalse(buffer.has_overflowed())
+
+    def test_producer_thread(self):
+        buffer = DisplayRingBuffer(size=0x100)
+        count = 10000
+
+        def producer():
+            for i in range(count):
+                while not buffer.put(i):
+                    time.sleep(0.0001) # wait for the consumer
+
+        thread = threading.Thread(target=producer)
+        thread.start()
+        result = []
+        while thread.is_alive() or len(result) < count:
+            result += buffer.drain()
+            time.sleep(0.0001)
+        thread.join()
+        self.assertEqual(result, list(range(count)))
+
+
+class TestThreadedMachine(unittest.TestCase):
+    def setUp(self):
+        self.user_input_queue = queue.Queue()
+        self.threaded_machine = ThreadedMachine(
+            SBC09Cfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT)),
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=None,
+            user_input_queue=self.user_input_queue,
+        )
+        self.machine = self.threaded_machine.machine
+        self.cpu_thread = self.threaded_machine.cpu_thread
+        self.cpu_thread.max_run_time = 0.01
+
+    def tearDown(self):
+        self.threaded_machine.quit()
+        self.assertFalse(self.cpu_thread.is_alive())
+
+    def _wait_for_output(self, txt, timeout=10):
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            output = self.machine.periphery.output
+            if txt in output:
+                return output
+            time.sleep(0.01)
+        self.fail("%r not in output: %r" % (txt, output))
+
+    def test_run_in_thread(self):
+        self.threaded_machine.start()
+        self._wait_for_output("Welcome to BUGGY")
+        for char in "H100+1\r\n":
+            self.user_input_queue.put(char)
+        self._wait_for_output("0101")
+        # The output may be created in the first, unfinished burst:
+        end_time = time.time() + 10
+        while self.cpu_thread.burst_count == 0 and time.time() < end_time:
+            time.sleep(0.01)
+        self.assertTrue(self.cpu_thread.burst_count > 0)
+
+    def test_pause_and_call(self):
+        self.threaded_machine.start()
+        self._wait_for_output("Welcome to BUGGY")
+        self.cpu_thread.pause()
+        cycles = self.cpu_thread.call(lambda: self.machine.cpu.cycles)
+        time.sleep(0.05)
+        self.assertEqual(self.machine.cpu.cycles, cycles)
+
+        # run_burst via call() works while paused:
+        self.cpu_thread.call(self.cpu_thread.run_burst)
+        self.assertGreater(self.machine.cpu.cycles, cycles)
+
+        self.cpu_thread.resume()
+        self.assertFalse(self.cpu_thread.is_paused())
+
+    def test_breakpoint_pauses(self):
+        self.threaded_machine.start()
+        self._wait_for_output("Welcome to BUGGY")
+        # The monitor waits for input in $e45a:
+        self.cpu_thread.call(self.machine.add_breakpoint, 0xe45a)
+        end_time = time.time() + 10
+        while not self.cpu_thread.is_paused() and time.time() < end_time:
+            time.sleep(0.01)
+        self.assertTrue(self.cpu_thread.is_paused())
+        hit = self.cpu_thread.call(self.machine.get_last_break)
+        self.assertEqual(hit.address, 0xe45a)
+        self.assertEqual(self.machine.cpu.program_counter.value, 0xe45a)
+
+        self.cpu_thread.call(self.machine.remove_breakpoint, 0xe45a)
+        self.cpu_thread.resume()
+
+    def test_call_exception(self):
+        self.threaded_machine.start()
+        self.assertRaises(ZeroDivisionError, self.cpu_thread.call, lambda: 1 // 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
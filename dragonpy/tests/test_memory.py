@@ -0,0 +1,617 @@
+#!/usr/bin/env python
+# encoding:utf-8
+
+"""
+    DragonPy - Memory unittests
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.Dragon32.MC6883_SAM import SAM
+from dragonpy.components.address_registry import AddressOverlapError, \
+    AddressRangeRegistry
+from dragonpy.components.access_report import InvalidMemoryAccess
+from dragonpy.components.memory_heatmap import MemoryHeatmap
+from dragonpy.components.memory import Memory, PAGE_BANKED, PAGE_IO, PAGE_RAM, PAGE_ROM, PAGE_TRAP, \
+    FastMemory, get_memory_class
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class BaseMemoryTestCase(unittest.TestCase):
+    """
+    TestCfg: RAM $0000-$7fff and ROM $8000-$ffff
+    """
+    def setUp(self):
+        cfg = TestCfg(BaseCPUTestCase.UNITTEST_CFG_DICT.copy())
+        self.memory = Memory(cfg)
+        self.cpu = CPU(self.memory, cfg)
+
+
+class TestMemoryPageTable(BaseMemoryTestCase):
+    def setUp(self):
+        super(TestMemoryPageTable, self).setUp()
+        self.calls = []
+
+    def read_callback(self, cpu_cycles, op_address, address):
+        self.calls.append(("read", address))
+        return 0x12
+
+    def write_callback(self, cpu_cycles, op_address, address, value):
+        self.calls.append(("write", address, value))
+
+    def test_initial_page_types(self):
+        self.assertEqual(self.memory.get_page_type(0x0000), (PAGE_RAM, PAGE_RAM))
+        self.assertEqual(self.memory.get_page_type(0x7fff), (PAGE_RAM, PAGE_RAM))
+        self.assertEqual(self.memory.get_page_type(0x8000), (PAGE_RAM, PAGE_ROM))
+        self.assertEqual(self.memory.get_page_type(0xffff), (PAGE_RAM, PAGE_ROM))
+
+    def test_plain_ram(self):
+        cycles = self.cpu.cycles
+        self.memory.write_byte(0x1234, 0xab)
+        self.assertEqual(self.memory.read_byte(0x1234), 0xab)
+        self.assertEqual(self.cpu.cycles, cycles + 2)
+
+    def test_write_into_rom_is_ignored(self):
+        self.memory.load(0x8000, [0x01])
+        self.memory.write_byte(0x8000, 0xff)
+        self.assertEqual(self.memory.read_byte(0x8000), 0x01)
+
+    def test_callbacks_mark_only_their_page(self):
+        self.memory.add_read_byte_callback(self.read_callback, 0x4010)
+        self.memory.add_write_byte_callback(self.write_callback, 0x4011)
+
+        self.assertEqual(self.memory.get_page_type(0x4000), (PAGE_IO, PAGE_IO))
+        self.assertEqual(self.memory.get_page_type(0x3fff), (PAGE_RAM, PAGE_RAM))
+        self.assertEqual(self.memory.get_page_type(0x4100), (PAGE_RAM, PAGE_RAM))
+
+        self.assertEqual(self.memory.read_byte(0x4010), 0x12)
+        self.memory.write_byte(0x4011, 0x34)
+        self.assertEqual(self.calls, [("read", 0x4010), ("write", 0x4011, 0x34)])
+
+        # Other addresses in the same page are still normal RAM:
+        self.memory.write_byte(0x4012, 0x56)
+        self.assertEqual(self.memory.read_byte(0x4012), 0x56)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_middleware(self):
+        def write_middleware(cpu_cycles, op_address, address, value):
+            return value + 1
+        self.memory.add_write_byte_middleware(write_middleware, 0x0400, 0x0600)
+        self.assertEqual(self.memory.get_page_type(0x0500), (PAGE_RAM, PAGE_IO))
+        self.assertEqual(self.memory.get_page_type(0x0600), (PAGE_RAM, PAGE_IO))
+        self.assertEqual(self.memory.get_page_type(0x0700), (PAGE_RAM, PAGE_RAM))
+
+        self.memory.write_byte(0x0600, 0x10)
+        self.assertEqual(self.memory.read_byte(0x0600), 0x11)
+
+    def test_word_callback(self):
+        def read_word_callback(cpu_cycles, op_address, address):
+            return 0x1234
+        self.memory.add_read_word_callback(read_word_callback, 0x2000)
+        self.assertEqual(self.memory.read_word(0x2000), 0x1234)
+
+        self.memory.write_word(0x2002, 0xabcd)
+        self.assertEqual(self.memory.read_word(0x2002), 0xabcd)
+
+
+class TestAddressRangeRegistry(unittest.TestCase):
+    def func1(self):
+        pass
+
+    def func2(self):
+        pass
+
+    def test_ranges_are_not_expanded(self):
+        registry = AddressRangeRegistry("test")
+        registry.add(self.func1, 0xd000, 0xdfff)
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.get(0xd000), self.func1)
+        self.assertEqual(registry.get(0xdfff), self.func1)
+        self.assertEqual(registry.get(0xcfff), None)
+        self.assertEqual(registry.get(0xe000), None)
+
+    def test_partial_pages(self):
+        registry = AddressRangeRegistry("test")
+        registry.add(self.func1, 0x0400, 0x0600)
+        registry.add(self.func2, 0x0601)
+        self.assertEqual(registry.get(0x0600), self.func1)
+        self.assertEqual(registry.get(0x0601), self.func2)
+        self.assertEqual(registry.get(0x0602), None)
+        self.assertEqual(
+            [(start, end) for start, end, func in registry],
+            [(0x0400, 0x0600), (0x0601, 0x0601)]
+        )
+
+    def test_overlap(self):
+        registry = AddressRangeRegistry("test")
+        registry.add(self.func1, 0xff00, 0xff03)
+        registry.add(self.func2, 0xff20)
+        self.assertEqual(registry.get_overlaps(0xff03, 0xff20), [
+            (0xff00, 0xff03, self.func1),
+            (0xff20, 0xff20, self.func2),
+        ])
+        self.assertEqual(registry.get_overlaps(0xff04, 0xff1f), [])
+        self.assertRaises(AddressOverlapError, registry.add, self.func2, 0xff02)
+        self.assertRaises(AddressOverlapError, registry.add, self.func2, 0xfe00, 0xffff)
+
+    def test_remove(self):
+        registry = AddressRangeRegistry("test")
+        registry.add(self.func1, 0xd000, 0xdfff)
+        self.assertRaises(KeyError, registry.remove, 0xd000)
+        self.assertEqual(registry.remove(0xd000, 0xdfff), self.func1)
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.get(0xd000), None)
+        self.assertEqual(registry.pages, [None] * len(registry.pages))
+
+    def test_invalid_range(self):
+        registry = AddressRangeRegistry("test")
+        self.assertRaises(ValueError, registry.add, self.func1, 0xffff, 0x10000)
+        self.assertRaises(ValueError, registry.add, self.func1, 0x2000, 0x1000)
+
+
+class TestMemoryUnregister(BaseMemoryTestCase):
+    def test_remove_callback_restores_ram_page(self):
+        def read_callback(cpu_cycles, op_address, address):
+            return 0x12
+        self.memory.add_read_byte_callback(read_callback, 0x4000, 0x40ff)
+        self.assertEqual(self.memory.get_page_type(0x4000), (PAGE_IO, PAGE_RAM))
+        self.assertEqual(self.memory.read_byte(0x4080), 0x12)
+
+        self.memory.remove_read_byte_callback(0x4000, 0x40ff)
+        self.assertEqual(self.memory.get_page_type(0x4000), (PAGE_RAM, PAGE_RAM))
+        self.assertEqual(self.memory.read_byte(0x4080), 0x00)
+
+    def test_overlapping_callbacks(self):
+        def write_callback(cpu_cycles, op_address, address, value):
+            pass
+        self.memory.add_write_byte_callback(write_callback, 0xff00)
+        self.assertRaises(AddressOverlapError,
+            self.memory.add_write_byte_callback, write_callback, 0xff00
+        )
+
+
+class TestMemoryBlockAccess(BaseMemoryTestCase):
+    def setUp(self):
+        super(TestMemoryBlockAccess, self).setUp()
+        self.calls = []
+
+    def read_callback(self, cpu_cycles, op_address, address):
+        self.calls.append(("read", address))
+        return 0xee
+
+    def write_callback(self, cpu_cycles, op_address, address, value):
+        self.calls.append(("write", address, value))
+
+    def test_write_and_read_block(self):
+        cycles = self.cpu.cycles
+        self.memory.write_block(0x10fe, b"\x01\x02\x03\x04")
+        self.assertEqual(self.memory.read_block(0x10fe, 0x1102), b"\x01\x02\x03\x04")
+        self.assertEqual(self.memory.get(0x10fd, 0x1103), [0, 1, 2, 3, 4, 0])
+        self.assertEqual(
+            list(self.memory.iter_bytes(0x10fe, 0x1100)),
+            [(0x10fe, 1), (0x10ff, 2)]
+        )
+        self.assertEqual(self.cpu.cycles, cycles)
+
+    def test_write_block_list(self):
+        self.memory.write_block(0x2000, [0x12, 0x34])
+        self.assertEqual(self.memory.read_word(0x2000), 0x1234)
+
+    def test_view(self):
+        view = self.memory.view(0x3000, 0x3010)
+        self.assertEqual(len(view), 0x10)
+        self.memory.write_byte(0x3001, 0xab)
+        self.assertEqual(view[1:2].tobytes(), b"\xab")
+
+    def test_out_of_range(self):
+        self.assertRaises(IndexError, self.memory.read_block, 0xfff0, 0x10001)
+        self.assertRaises(IndexError, self.memory.write_block, 0xffff, b"\x00\x00")
+        self.assertRaises(IndexError, self.memory.view, 0x2000, 0x1000)
+
+    def test_block_without_io(self):
+        self.memory.add_read_byte_callback(self.read_callback, 0x4001)
+        self.memory.add_write_byte_callback(self.write_callback, 0x4001)
+        self.memory.write_block(0x4000, b"\x01\x02\x03")
+        self.assertEqual(self.memory.read_block(0x4000, 0x4003), b"\x01\x02\x03")
+        self.assertEqual(self.calls, [])
+
+    def test_block_with_io(self):
+        self.memory.add_read_byte_callback(self.read_callback, 0x4001)
+        self.memory.add_write_byte_callback(self.write_callback, 0x4002)
+        cycles = self.cpu.cycles
+        self.memory.write_block(0x3ffe, b"\x01\x02\x03\x04\x05", io=True)
+        self.assertEqual(
+            self.memory.read_block(0x3ffe, 0x4003, io=True),
+            b"\x01\x02\x03\xee\x00"
+        )
+        self.assertEqual(self.calls, [("write", 0x4002, 0x05), ("read", 0x4001)])
+        self.assertEqual(self.cpu.cycles, cycles)
+
+    def test_write_block_with_io_into_rom(self):
+        self.memory.write_block(0x8000, b"\x01")
+        self.memory.write_block(0x7fff, b"\x02\x03", io=True)
+        self.assertEqual(self.memory.read_block(0x7fff, 0x8001), b"\x02\x01")
+
+
+class TestStrictMemory(BaseMemoryTestCase):
+    def test_write_out_of_range(self):
+        self.assertRaises(ValueError, self.memory.write_byte, 0x1000, 0x100)
+        self.assertRaises(ValueError, self.memory.write_byte, 0x1000, -1)
+        self.assertRaises(ValueError, self.memory.write_word, 0x1000, 0x10000)
+
+    def test_invalid_access_report(self):
+        self.cpu.last_op_address = 0x1234
+        for __ in range(3):
+            self.memory.write_byte(0x8000, 0xff)
+        self.memory.read_word(0xffff) # read $10000
+        self.assertEqual(self.memory.access_report.get_lines(), [
+            "1234| reading outside memory area at $10000 (1 times)",
+            "1234| writing into ROM ignored at $8000 (3 times)",
+        ])
+        self.memory.access_report.flush()
+        self.assertEqual(self.memory.access_report.get_lines(), [])
+
+    def test_invalid_access_report_check_interval(self):
+        report = self.memory.access_report
+        report.next_flush = 0 # flush is due
+        report.CHECK_INTERVAL = report._next_check = 3
+        self.memory.write_byte(0x8000, 0xff)
+        self.memory.write_byte(0x8000, 0xff)
+        self.assertEqual(len(report.get_lines()), 1) # time not checked yet
+        self.memory.write_byte(0x8000, 0xff)
+        self.assertEqual(report.get_lines(), [])
+        self.assertGreater(report.next_flush, 0)
+
+    def test_strict_memory_access(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT, strict_memory_access=True))
+        memory = Memory(cfg)
+        CPU(memory, cfg)
+        self.assertRaises(InvalidMemoryAccess, memory.write_byte, 0x8000, 0xff)
+
+    def test_callback_return_none(self):
+        def read_callback(cpu_cycles, op_address, address):
+            return None
+        self.memory.add_read_byte_callback(read_callback, 0x4000)
+        self.assertRaises(ValueError, self.memory.read_byte, 0x4000)
+
+    def test_register_not_callable(self):
+        self.assertRaises(TypeError,
+            self.memory.add_read_byte_callback, None, 0x4000
+        )
+
+
+class TestFastMemory(BaseMemoryTestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT, fast_memory=True))
+        memory_class = get_memory_class(cfg)
+        self.assertIs(memory_class, FastMemory)
+        self.memory = memory_class(cfg)
+        self.cpu = CPU(self.memory, cfg)
+
+    def test_default_is_strict(self):
+        cfg = TestCfg(BaseCPUTestCase.UNITTEST_CFG_DICT.copy())
+        self.assertIs(get_memory_class(cfg), Memory)
+
+    def test_values_are_masked(self):
+        self.memory.write_byte(0x1000, 0x1ff)
+        self.assertEqual(self.memory.read_byte(0x1000), 0xff)
+        self.memory.write_word(0x1000, 0x12345)
+        self.assertEqual(self.memory.read_word(0x1000), 0x2345)
+
+    def test_callbacks(self):
+        calls = []
+        def read_callback(cpu_cycles, op_address, address):
+            return 0x1ab
+        def write_middleware(cpu_cycles, op_address, address, value):
+            return value + 1
+        def write_callback(cpu_cycles, op_address, address, value):
+            calls.append((address, value))
+        self.memory.add_read_byte_callback(read_callback, 0x4000)
+        self.memory.add_write_byte_middleware(write_middleware, 0x4001)
+        self.memory.add_write_byte_callback(write_callback, 0x4001)
+        self.assertEqual(self.memory.read_byte(0x4000), 0xab)
+        self.memory.write_byte(0x4001, 0xff)
+        self.assertEqual(calls, [(0x4001, 0x00)])
+
+    def test_write_into_rom_is_ignored(self):
+        self.memory.load(0x8000, [0x01])
+        self.memory.write_byte(0x8000, 0xff)
+        self.assertEqual(self.memory.read_byte(0x8000), 0x01)
+
+
+class Banked64KCfg(TestCfg):
+    EXTRA_RAM_SIZE = 0x8000
+
+
+class TestMemoryBanking(BaseMemoryTestCase):
+    def setUp(self):
+        cfg = Banked64KCfg(BaseCPUTestCase.UNITTEST_CFG_DICT.copy())
+        self.memory = Memory(cfg)
+        self.cpu = CPU(self.memory, cfg)
+        self.sam = SAM(cfg, self.cpu, self.memory)
+
+    def test_map_pages(self):
+        self.memory.write_byte(0x1000, 0x01)
+        self.memory.map_pages(0x10, 0x10, 0x10000)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x00)
+        self.memory.write_byte(0x1000, 0x02)
+        self.memory.write_word(0x1001, 0x0304)
+        self.assertEqual(self.memory.read_block(0x1000, 0x1003), b"\x02\x03\x04")
+
+        self.memory.map_pages(0x10, 0x10, 0)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x01)
+        self.assertEqual(self.memory.view(0x1000, 0x1001).tobytes(), b"\x01")
+        self.assertEqual(self.memory._mem[0x11000:0x11003], bytearray(b"\x02\x03\x04"))
+
+    def test_dirty_tracking(self):
+        self.memory.enable_dirty_tracking()
+        self.memory.write_byte(0x1000, 0x01)
+        self.memory.map_pages(0x10, 0x10, 0x10000)
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_BANKED, PAGE_TRAP))
+        self.memory.write_byte(0x1000, 0x02)
+        self.assertEqual(self.memory.get_dirty_pages(), [0x10, 0x110])
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_BANKED, PAGE_BANKED))
+
+    def test_map_pages_out_of_range(self):
+        self.assertRaises(IndexError, self.memory.map_pages, 0x80, 0xff, 0x10000)
+
+    def test_view_not_continuous(self):
+        self.memory.map_pages(0x10, 0x10, 0x10000)
+        self.assertRaises(ValueError, self.memory.view, 0x0f00, 0x1100)
+        self.assertEqual(len(self.memory.view(0x1000, 0x1100)), 0x100)
+
+    def test_map_type(self):
+        self.memory.load(0x8000, [0x12])
+        self.assertEqual(self.memory.read_byte(0x8000), 0x12)
+
+        self.memory.write_byte(0xffdf, 0) # map type 1 -> all RAM
+        self.assertEqual(self.memory.get_page_type(0x8000), (PAGE_BANKED, PAGE_BANKED))
+        self.assertEqual(self.memory.read_byte(0x8000), 0x00)
+        self.memory.write_byte(0x8000, 0x34)
+        self.assertEqual(self.memory.read_byte(0x8000), 0x34)
+
+        self.memory.write_byte(0xffde, 0) # map type 0 -> ROM
+        self.assertEqual(self.memory.get_page_type(0x8000), (PAGE_RAM, PAGE_ROM))
+        self.assertEqual(self.memory.read_byte(0x8000), 0x12)
+        self.memory.write_byte(0x8000, 0x56)
+        self.assertEqual(self.memory.read_byte(0x8000), 0x12)
+
+        self.memory.write_byte(0xffd5, 0) # page bit 1 -> upper RAM at $0000
+        self.assertEqual(self.memory.read_byte(0x0000), 0x34)
+
+        self.memory.write_byte(0xffd4, 0) # page bit 0 -> lower RAM at $0000
+        self.assertEqual(self.memory.read_byte(0x0000), 0x00)
+
+    def test_cpu_stores(self):
+        # The CPU ops use memory.write_byte()/write_word() bound at CPU
+        # creation, so the offset must be added in these methods.
+        self.memory.map_pages(0x00, 0x7f, 0x10000)
+        self.memory.load(0x12000, [ # $2000 in the upper RAM
+            0x86, 0x42, # LDA #$42
+            0xb7, 0x10, 0x00, # STA $1000
+            0xf6, 0x10, 0x00, # LDB $1000
+            0xcc, 0x12, 0x34, # LDD #$1234
+            0xfd, 0x10, 0x02, # STD $1002
+        ])
+        self.cpu.test_run(start=0x2000, end=0x200e)
+        self.assertEqual(self.cpu.accu_d.value, 0x1234)
+        self.cpu.test_run(start=0x2000, end=0x2008)
+        self.assertEqual(self.cpu.accu_b.value, 0x42)
+        self.assertEqual(self.memory._mem[0x11000:0x11004], bytearray(b"\x42\x00\x12\x34"))
+        self.assertEqual(self.memory._mem[0x1000:0x1004], bytearray(4))
+
+    def test_cpu_stores_map_type_1(self):
+        self.memory.load(0x8000, [0x12])
+        self.memory.write_byte(0xffdf, 0) # map type 1 -> all RAM
+        self.memory.load(0x0100, [
+            0x86, 0x55, # LDA #$55
+            0xb7, 0x80, 0x00, # STA $8000
+            0xf6, 0x80, 0x00, # LDB $8000
+        ])
+        self.cpu.test_run(start=0x0100, end=0x0108)
+        self.assertEqual(self.cpu.accu_b.value, 0x55)
+        self.assertEqual(self.memory._mem[0x10000], 0x55)
+        self.assertEqual(self.memory._mem[0x8000], 0x12) # ROM is unchanged
+
+        self.memory.write_byte(0xffde, 0) # map type 0 -> ROM
+        self.cpu.test_run(start=0x0100, end=0x0108)
+        self.assertEqual(self.cpu.accu_b.value, 0x12)
+        self.assertEqual(self.memory._mem[0x10000], 0x55)
+
+    def test_sam_reset(self):
+        self.memory.write_byte(0xffdf, 0)
+        self.sam.reset()
+        self.assertEqual(self.memory.get_page_type(0x8000), (PAGE_RAM, PAGE_ROM))
+        self.assertNotIn("read_byte", self.memory.__dict__)
+
+
+class TestDirtyTracking(BaseMemoryTestCase):
+    def setUp(self):
+        super(TestDirtyTracking, self).setUp()
+        self.memory.enable_dirty_tracking()
+
+    def test_not_enabled(self):
+        self.memory.disable_dirty_tracking()
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_RAM))
+        self.assertRaises(RuntimeError, self.memory.get_dirty_pages)
+
+    def test_write_byte(self):
+        self.assertEqual(self.memory.get_dirty_pages(), [])
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_TRAP))
+
+        self.memory.write_byte(0x1000, 0x01)
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_RAM))
+        self.memory.write_word(0x20ff, 0x0203)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x01)
+        self.assertEqual(self.memory.read_word(0x20ff), 0x0203)
+        self.assertEqual(self.memory.get_dirty_pages(clear=True), [0x10, 0x20, 0x21])
+
+        self.assertEqual(self.memory.get_dirty_pages(), [])
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_TRAP))
+
+    def test_reads_are_not_tracked(self):
+        self.memory.read_byte(0x1000)
+        self.memory.read_word(0x2000)
+        self.assertEqual(self.memory.get_dirty_pages(), [])
+
+    def test_write_into_rom_is_not_tracked(self):
+        self.memory.write_byte(0x8000, 0x01)
+        self.assertEqual(self.memory.get_dirty_pages(), [])
+
+    def test_block_write(self):
+        self.memory.write_block(0x30f0, b"\x00" * 0x20)
+        self.memory.load(0x5000, [0x01])
+        self.assertEqual(self.memory.get_dirty_pages(), [0x30, 0x31, 0x50])
+        self.assertEqual(self.memory.get_page_type(0x5000), (PAGE_RAM, PAGE_RAM))
+
+    def test_io_page(self):
+        def write_middleware(cpu_cycles, op_address, address, value):
+            return value
+        self.memory.add_write_byte_middleware(write_middleware, 0x4000)
+        self.memory.write_byte(0x4000, 0x01)
+        self.assertEqual(self.memory.get_dirty_pages(), [0x40])
+
+
+class TestMemorySnapshot(BaseMemoryTestCase):
+    def test_restore(self):
+        self.memory.write_byte(0x1000, 0x01)
+        snapshot = self.memory.take_snapshot()
+        self.memory.write_byte(0x1000, 0x02)
+        self.memory.write_byte(0x2000, 0x03)
+        self.memory.restore_snapshot(snapshot)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x01)
+        self.assertEqual(self.memory.read_byte(0x2000), 0x00)
+
+    def test_copy_on_write(self):
+        snapshot1 = self.memory.take_snapshot()
+        self.memory.write_byte(0x1000, 0x01)
+        snapshot2 = self.memory.take_snapshot()
+
+        # Only the changed page is not shared:
+        shared = [page1 is page2 for page1, page2 in zip(snapshot1, snapshot2)]
+        self.assertEqual(shared.count(False), 1)
+        self.assertFalse(shared[0x10])
+
+        self.memory.restore_snapshot(snapshot1)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x00)
+        self.memory.restore_snapshot(snapshot2)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x01)
+        self.memory.restore_snapshot(snapshot1)
+        self.assertEqual(self.memory.read_byte(0x1000), 0x00)
+
+    def test_copy_on_write_with_dirty_tracking(self):
+        self.memory.enable_dirty_tracking()
+        self.test_copy_on_write()
+
+    def test_no_dirty_tracking(self):
+        # Plain RAM writes keep the fast path:
+        self.memory.take_snapshot()
+        self.memory.write_byte(0x1000, 0x01)
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_RAM))
+        self.assertRaises(RuntimeError, self.memory.get_dirty_pages)
+
+    def test_wrong_size(self):
+        self.assertRaises(ValueError, self.memory.restore_snapshot, ())
+
+
+class TestMemoryHeatmap(BaseMemoryTestCase):
+    def setUp(self):
+        super(TestMemoryHeatmap, self).setUp()
+        self.heatmap = MemoryHeatmap(self.cpu, self.memory)
+        self.written = []
+
+    def read_callback(self, cpu_cycles, op_address, address):
+        return 0x00
+
+    def write_callback(self, cpu_cycles, op_address, address, value):
+        self.written.append((address, value))
+
+    def test_disabled(self):
+        self.memory.read_byte(0x1000)
+        self.assertEqual(self.heatmap.get_data(), {"pages": [], "io_registers": []})
+        self.assertNotIn("_read_byte_io", self.memory.__dict__)
+
+    def test_count(self):
+        self.memory.add_read_byte_callback(self.read_callback, 0x4001)
+        self.heatmap.enable()
+        self.memory.write_byte(0x1000, 0x01)
+        self.memory.read_byte(0x1000)
+        self.memory.read_word(0x10ff)
+        self.memory.read_byte(0x4000)
+        self.memory.read_byte(0x4001)
+        self.memory.read_byte(0x4001)
+        self.cpu.call_instruction_func(0x1000, 0x12) # NOP
+        self.heatmap.disable()
+        self.memory.read_byte(0x1000)
+
+        data = self.heatmap.get_data()
+        self.assertEqual(
+            [(p["start"], p["reads"], p["writes"], p["executes"]) for p in data["pages"]],
+            [(0x1000, 2, 1, 1), (0x1100, 1, 0, 0), (0x4000, 3, 0, 0)]
+        )
+        self.assertEqual(
+            [(r["address"], r["reads"], r["writes"]) for r in data["io_registers"]],
+            [(0x4001, 2, 0)]
+        )
+        self.assertNotIn("_read_byte_io", self.memory.__dict__)
+        self.assertNotIn("_write_byte_slow", self.memory.__dict__)
+        self.assertEqual(self.memory.get_page_type(0x1000), (PAGE_RAM, PAGE_RAM))
+        self.assertNotIn("call_instruction_func", self.cpu.__dict__)
+
+        text = self.heatmap.get_text_table()
+        self.assertIn("$1000-$10ff            2            1            1 |", text)
+
+        self.heatmap.reset()
+        self.assertEqual(self.heatmap.get_data(), {"pages": [], "io_registers": []})
+
+    def test_cpu_writes(self):
+        # The CPU ops use memory.write_byte()/write_word() bound at CPU creation
+        self.memory.add_write_byte_callback(self.write_callback, 0x4001)
+        self.memory.load(0x2000, [
+            0x86, 0x42, # LDA #$42
+            0xb7, 0x10, 0x00, # STA $1000
+            0xfd, 0x11, 0x00, # STD $1100
+            0xb7, 0x40, 0x01, # STA $4001
+            0xb7, 0x90, 0x00, # STA $9000 (ROM)
+        ])
+        self.heatmap.enable()
+        self.cpu.test_run(start=0x2000, end=0x200e)
+        self.heatmap.disable()
+
+        self.assertEqual(self.heatmap.writes[0x10], 1)
+        self.assertEqual(self.heatmap.writes[0x11], 2)
+        self.assertEqual(self.heatmap.writes[0x40], 1)
+        self.assertEqual(self.heatmap.writes[0x90], 1)
+        self.assertEqual(self.heatmap.executes[0x20], 5)
+        self.assertEqual(self.heatmap.reads[0x20], 14) # op fetches
+        self.assertEqual(dict(self.heatmap.io_writes), {0x4001: 1})
+        self.assertEqual(self.written, [(0x4001, 0x42)])
+        self.assertEqual(self.memory.read_byte(0x1000), 0x42)
+
+    def test_with_mapped_pages(self):
+        cfg = Banked64KCfg(BaseCPUTestCase.UNITTEST_CFG_DICT.copy())
+        self.memory = Memory(cfg)
+        self.cpu = CPU(self.memory, cfg)
+        self.heatmap = MemoryHeatmap(self.cpu, self.memory)
+        self.heatmap.enable()
+        self.memory.map_pages(0x10, 0x10, 0x10000)
+        self.memory.write_byte(0x1000, 0x01)
+        self.memory.map_pages(0x10, 0x10, 0)
+        self.memory.write_byte(0x1000, 0x02)
+        self.assertEqual(self.heatmap.writes[0x10], 2)
+        self.assertEqual(self.memory._mem[0x11000], 0x01)
+        self.heatmap.disable()
+        self.assertNotIn("_write_byte_slow", self.memory.__dict__)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the op hooks
+    =====================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.components.memory import Memory
+from dragonpy.components.memory_heatmap import MemoryHeatmap
+from dragonpy.core.op_hooks import get_op_hooks
+from dragonpy.core.profiler import ExecutionProfiler
+from dragonpy.core.trace_file import TraceRecorder, iter_records
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TestOpHooks(unittest.TestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        self.memory = Memory(cfg)
+        self.cpu = CPU(self.memory, cfg)
+        self.memory.cpu = self.cpu # FIXME
+
+        self.memory.load(0x1000, [
+            0x4c, # INCA
+            0x10, 0x8e, 0x12, 0x34, # LDY #$1234
+            0x20, 0xf9, # BRA $1000
+        ])
+        self.cpu.program_counter.set(0x1000)
+
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def run_ops(self, count):
+        for __ in range(count):
+            self.cpu.get_and_call_next_op()
+
+    def test_get_op_hooks(self):
+        op_hooks = get_op_hooks(self.cpu)
+        self.assertIs(get_op_hooks(self.cpu), op_hooks)
+        self.assertNotIn("call_instruction_func", self.cpu.__dict__)
+
+    def test_paged_op(self):
+        calls = []
+
+        def post_hook(op_address, opcode, start_cycles):
+            calls.append((op_address, opcode))
+            self.assertGreater(self.cpu.cycles, start_cycles)
+
+        op_hooks = get_op_hooks(self.cpu)
+        op_hooks.add_post_hook(post_hook)
+        self.run_ops(3)
+        op_hooks.remove_post_hook(post_hook)
+        self.run_ops(1)
+        self.assertEqual(calls, [(0x1000, 0x4c), (0x1001, 0x108e), (0x1005, 0x20)])
+        self.assertNotIn("call_instruction_func", self.cpu.__dict__)
+
+    def test_disable_out_of_order(self):
+        profiler = ExecutionProfiler(self.cpu)
+        trace_recorder = TraceRecorder(self.cpu)
+        heatmap = MemoryHeatmap(self.cpu, self.memory)
+        filename = os.path.join(self.temp_path, "trace.bin")
+
+        profiler.enable()
+        trace_recorder.start(filename)
+        heatmap.enable()
+        self.run_ops(3)
+
+        profiler.disable()
+        self.run_ops(3)
+
+        trace_recorder.stop()
+        self.run_ops(3)
+        heatmap.disable()
+        self.run_ops(3)
+        self.assertNotIn("call_instruction_func", self.cpu.__dict__)
+
+        self.assertEqual(sum(profiler.executes), 3)
+        with open(filename, "rb") as f:
+            self.assertEqual(len(list(iter_records(f))), 6)
+        self.assertEqual(sum(heatmap.executes), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
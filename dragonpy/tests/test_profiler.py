@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the execution profiler
+    ===============================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import tempfile
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from dragonpy.core.machine import Machine
+from dragonpy.sbc09.config import SBC09Cfg
+from dragonpy.sbc09.periphery import SBC09PeripheryUnittest
+from dragonpy.tests.test_base import BaseCPUTestCase
+
+
+class TestExecutionProfiler(unittest.TestCase):
+    def setUp(self):
+        self.machine = Machine(
+            SBC09Cfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT)),
+            periphery_class=SBC09PeripheryUnittest,
+            display_callback=None,
+            user_input_queue=queue.Queue(),
+        )
+        self.cpu = self.machine.cpu
+        self.profiler = self.machine.profiler
+        self.cpu.outer_burst_op_count = 100
+        self.cpu.inner_burst_op_count = 100
+
+    def test_count_ops_and_cycles(self):
+        self.machine.enable_profiler()
+        start_cycles = self.cpu.cycles
+        self.cpu.burst_run()
+        self.machine.disable_profiler()
+
+        self.assertEqual(sum(self.profiler.executes), 10000)
+        # The op code fetch is done before call_instruction_func()
+        self.assertEqual(
+            sum(self.profiler.cycles) + 10000,
+            self.cpu.cycles - start_cycles
+        )
+        self.assertEqual(sum(self.profiler.stack_cycles), sum(self.profiler.cycles))
+
+        # Disabled -> no counting
+        self.cpu.burst_run()
+        self.assertEqual(sum(self.profiler.executes), 10000)
+
+    def test_report(self):
+        self.machine.enable_profiler()
+        self.cpu.burst_run()
+        self.machine.disable_profiler()
+
+        report = self.profiler.get_report()
+        # The monitor waits for input in $e45a:
+        self.assertIn("$e45a-$e45a O.S. routine to read a character into B register.", report)
+
+        stacks = self.profiler.get_collapsed_stacks()
+        for line in stacks.splitlines():
+            names, cycles = line.rsplit(" ", 1)
+            self.assertTrue(names.startswith("main"))
+            self.assertGreater(int(cycles), 0)
+        # The monitor calls the O.S. routines via jump table in RAM:
+        self.assertIn("main;$e44a Block move routine", stacks)
+        self.assertIn("main;$0006;$0000 Zero page variables", stacks)
+
+    def test_dump(self):
+        self.machine.enable_profiler()
+        self.cpu.burst_run()
+        filename = os.path.join(tempfile.gettempdir(), "DragonPy_unittest_profile.txt")
+        self.machine.disable_profiler(filename)
+        try:
+            with open(filename, "r") as f:
+                self.assertIn("Cycles per ROM routine:", f.read())
+            with open(filename + ".folded", "r") as f:
+                self.assertIn("main", f.read())
+        finally:
+            os.remove(filename)
+            os.remove(filename + ".folded")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -114,6 +114,45 @@ class Test_sbc09(Test6809_sbc09_Base):
                 '%04X\r\n' % (0x100 - i)
             ])
 
+    def test_snapshot(self):
+        snapshot = self.machine.take_snapshot()
+        self.periphery.add_to_input_queue('H100+1\r\n')
+        op_call_count1, cycles1, output1 = self._run_until_newlines(
+            newline_count=2, max_ops=700
+        )
+
+        self.machine.restore_snapshot(snapshot)
+        self.periphery.setUp()
+        self.periphery.add_to_input_queue('H100+1\r\n')
+        op_call_count2, cycles2, output2 = self._run_until_newlines(
+            newline_count=2, max_ops=700
+        )
+        self.assertEqual(output1, output2)
+        self.assertEqual(op_call_count1, op_call_count2)
+        self.assertEqual(cycles1, cycles2)
+
+    def test_snapshot_without_dirty_tracking(self):
+        # The hard reset snapshot doesn't slow down the RAM writes:
+        self.assertIsNotNone(self.machine.init_snapshot)
+        self.assertRaises(RuntimeError, self.cpu.memory.get_dirty_pages)
+
+    def test_heatmap(self):
+        heatmap = self.machine.enable_heatmap()
+        try:
+            self.periphery.add_to_input_queue('H100+1\r\n')
+            self._run_until_newlines(newline_count=2, max_ops=700)
+        finally:
+            self.machine.disable_heatmap()
+        data = heatmap.get_data()
+        heatmap.reset()
+
+        rom_page = [page for page in data["pages"] if page["start"] == 0xe400][0]
+        self.assertGreater(rom_page["executes"], 0)
+
+        acia = dict((entry["address"], entry) for entry in data["io_registers"])
+        self.assertGreater(acia[0xe001]["reads"], 0)
+        self.assertEqual(acia[0xe001]["info"], "$e001: Data port of ACIA")
+
     def test_dump_registers(self):
         self.periphery.add_to_input_queue('r\r\n')
         op_call_count, cycles, output = self._run_until_newlines(
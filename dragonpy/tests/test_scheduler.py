@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the cycle event scheduler
+    ==================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.components.memory import Memory
+from dragonpy.core.scheduler import get_scheduler
+from dragonpy.core.snapshot import get_cpu_registers, set_cpu_registers
+from dragonpy.Dragon32.MC6883_SAM import SAM
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TestEventScheduler(unittest.TestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        memory = Memory(cfg)
+        self.cpu = CPU(memory, cfg)
+        memory.cpu = self.cpu # FIXME
+        self.scheduler = get_scheduler(self.cpu)
+        self.cpu.memory.load(0x1000, [
+            0x4c, # INCA
+            0x12, # NOP
+            0x20, 0xfc, # BRA $1000
+        ])
+        self.cpu.program_counter.set(0x1000)
+        self.cpu.outer_burst_op_count = 100
+        self.cpu.inner_burst_op_count = 100
+
+    def test_get_scheduler(self):
+        self.assertIs(get_scheduler(self.cpu), self.scheduler)
+        self.assertEqual(self.cpu.burst_run, self.scheduler.burst_run)
+
+    def test_events_in_cycle_order(self):
+        calls = []
+        start_cycles = self.cpu.cycles
+
+        def callback(due_cycles):
+            calls.append((due_cycles, self.cpu.cycles))
+
+        self.scheduler.schedule(5000, callback)
+        self.scheduler.schedule(1000, callback)
+        canceled = self.scheduler.schedule(3000, callback)
+        self.scheduler.cancel(canceled)
+        self.cpu.burst_run()
+
+        self.assertEqual([due for due, __ in calls], [start_cycles + 1000, start_cycles + 5000])
+        for due_cycles, cycles in calls:
+            # called at most one op late
+            self.assertGreaterEqual(cycles, due_cycles)
+            self.assertLess(cycles - due_cycles, 8)
+        self.assertEqual(self.scheduler.next_event_cycles(), None)
+
+    def test_run_same_op_count(self):
+        self.cpu.burst_run()
+
+        # The origin CPU.burst_run() without scheduler:
+        cfg = self.cpu.cfg
+        memory = Memory(cfg)
+        cpu = CPU(memory, cfg)
+        memory.cpu = cpu # FIXME
+        memory.load(0x1000, self.cpu.memory.read_block(0x1000, 0x1004))
+        cpu.program_counter.set(0x1000)
+        cpu.outer_burst_op_count = 100
+        cpu.inner_burst_op_count = 100
+        cpu.burst_run()
+
+        self.assertEqual(self.cpu.cycles, cpu.cycles)
+        self.assertEqual(self.cpu.program_counter.value, cpu.program_counter.value)
+        self.assertEqual(self.cpu.accu_a.value, cpu.accu_a.value)
+
+    def test_shift_on_restore(self):
+        registers = get_cpu_registers(self.cpu)
+        self.scheduler.schedule(1000, lambda due_cycles: None)
+        self.cpu.cycles += 500
+        set_cpu_registers(self.cpu, registers)
+        # the remaining 500 cycles are unchanged:
+        self.assertEqual(self.scheduler.next_event_cycles(), self.cpu.cycles + 500)
+
+    def test_sam_irq(self):
+        start_cycles = self.cpu.cycles
+        sam = SAM(self.cpu.cfg, self.cpu, self.cpu.memory)
+        irq_cycles = []
+        self.cpu.irq = lambda: irq_cycles.append(self.cpu.cycles)
+        self.cpu.burst_run() # 10000 ops -> ~37000 cycles
+        self.assertEqual(len(irq_cycles), 2)
+        for count, cycles in enumerate(irq_cycles, 1):
+            self.assertLess(cycles - (start_cycles + count * sam.IRQ_CYCLES), 8)
+        # no drift: the next IRQ is relative to the due cycles
+        self.assertEqual(self.scheduler.next_event_cycles(), start_cycles + 3 * sam.IRQ_CYCLES)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the machine state file
+    ===============================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from dragonpy.core import state_file
+from dragonpy.core.state_file import StateFileError
+from dragonpy.sbc09.sbc09_rom import SBC09Rom
+from dragonpy.tests.test_base import Test6809_sbc09_Base
+
+
+class OtherSBC09Rom(SBC09Rom):
+    SHA1 = "0" * 40
+
+
+class BrokenState(object):
+    def __repr__(self):
+        return "{'broken"
+
+
+class TestStateFile(Test6809_sbc09_Base):
+    def setUp(self):
+        super(TestStateFile, self).setUp()
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_state_")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def _write_state(self, compression=state_file.COMPRESSION_NONE):
+        f = io.BytesIO()
+        state_file.write_state(f, self.machine.cfg, self.cpu, self.cpu.memory,
+            self.periphery, compression
+        )
+        f.seek(0)
+        return f
+
+    def _read_state(self, f):
+        state_file.read_state(f, self.machine.cfg, self.cpu, self.cpu.memory,
+            self.periphery
+        )
+
+    def _assert_roundtrip(self, compression):
+        self.periphery.add_to_input_queue('H100+1\r\n')
+        self._run_until_newlines(newline_count=2, max_ops=700)
+        registers = state_file.get_cpu_registers(self.cpu)
+        ram = self.cpu.memory.read_block(0x0000, 0xffff)
+        output = self.periphery.output
+
+        f = self._write_state(compression)
+
+        self.machine.restore_snapshot(self.machine.init_snapshot)
+        self.cpu.reset()
+        self.assertNotEqual(self.cpu.memory.read_block(0x0000, 0xffff), ram)
+
+        self._read_state(f)
+        self.assertEqual(state_file.get_cpu_registers(self.cpu), registers)
+        self.assertEqual(self.cpu.memory.read_block(0x0000, 0xffff), ram)
+        self.assertEqual(self.periphery.output, output)
+
+        # The loaded machine is runnable:
+        self.periphery.add_to_input_queue('H200+2\r\n')
+        op_call_count, cycles, output = self._run_until_newlines(
+            newline_count=3, max_ops=700
+        )
+        self.assertEqual(output[-2:], ['H200+2\r\n', '0202\r\n'])
+
+    def test_roundtrip(self):
+        self._assert_roundtrip(state_file.COMPRESSION_NONE)
+
+    def test_roundtrip_zlib(self):
+        self._assert_roundtrip(state_file.COMPRESSION_ZLIB)
+
+    @unittest.skipIf(state_file.lzma is None, "lzma not available")
+    def test_roundtrip_lzma(self):
+        self._assert_roundtrip(state_file.COMPRESSION_LZMA)
+
+    def test_compression(self):
+        size = len(self._write_state().getvalue())
+        compressed_size = len(self._write_state(state_file.COMPRESSION_ZLIB).getvalue())
+        self.assertLess(compressed_size, size // 10)
+
+    def test_machine_save_load(self):
+        filename = os.path.join(self.temp_path, "sbc09.state")
+        self.machine.save_state(filename)
+        pc = self.cpu.program_counter.value
+        self.cpu.program_counter.set(0x0000)
+        self.machine.load_state(filename)
+        self.assertEqual(self.cpu.program_counter.value, pc)
+
+    def test_reject_other_rom(self):
+        f = self._write_state()
+        rom_cfg = self.machine.cfg.rom_cfg
+        self.machine.cfg.rom_cfg = (OtherSBC09Rom(address=0x8000),)
+        try:
+            with self.assertRaises(StateFileError) as cm:
+                self._read_state(f)
+        finally:
+            self.machine.cfg.rom_cfg = rom_cfg
+        self.assertIn("ROM files doesn't match", str(cm.exception))
+
+    def test_reject_other_machine(self):
+        f = self._write_state()
+        config_name = self.machine.cfg.CONFIG_NAME
+        self.machine.cfg.CONFIG_NAME = "Dragon32"
+        try:
+            with self.assertRaises(StateFileError) as cm:
+                self._read_state(f)
+        finally:
+            self.machine.cfg.CONFIG_NAME = config_name
+        self.assertIn("not for 'Dragon32'", str(cm.exception))
+
+    def test_reject_other_format_version(self):
+        data = bytearray(self._write_state().getvalue())
+        data[9] += 1 # lower byte of the format version
+        with self.assertRaises(StateFileError) as cm:
+            self._read_state(io.BytesIO(bytes(data)))
+        self.assertIn("format version", str(cm.exception))
+
+    def _assert_unchanged_on_error(self, data, msg):
+        registers = state_file.get_cpu_registers(self.cpu)
+        ram = self.cpu.memory.read_block(0x0000, 0xffff)
+        with self.assertRaises(StateFileError) as cm:
+            self._read_state(io.BytesIO(data))
+        self.assertIn(msg, str(cm.exception))
+        self.assertEqual(state_file.get_cpu_registers(self.cpu), registers)
+        self.assertEqual(self.cpu.memory.read_block(0x0000, 0xffff), ram)
+
+    def test_reject_truncated_file(self):
+        data = self._write_state().getvalue()
+        self.cpu.memory.write_byte(0x0000, 0x12)
+        self.cpu.program_counter.set(0x0000)
+        self._assert_unchanged_on_error(data[:-10], "Unexpected end")
+
+    def test_reject_broken_periphery_state(self):
+        self.periphery.get_state = lambda: BrokenState()
+        try:
+            data = self._write_state().getvalue()
+        finally:
+            del self.periphery.get_state
+        self.cpu.memory.write_byte(0x0000, 0x12)
+        self.cpu.program_counter.set(0x0000)
+        self._assert_unchanged_on_error(data, "Broken periphery state")
+
+    def test_reject_other_periphery_state(self):
+        self.periphery.get_state = lambda: {"foo": 1}
+        try:
+            data = self._write_state().getvalue()
+        finally:
+            del self.periphery.get_state
+        self.cpu.memory.write_byte(0x0000, 0x12)
+        self.cpu.program_counter.set(0x0000)
+        output = self.periphery.output
+        self._assert_unchanged_on_error(data, "Periphery state doesn't match")
+        self.assertEqual(self.periphery.output, output)
+
+    def test_periphery_after_memory(self):
+        self.cpu.memory.write_byte(0x0000, 0x12)
+        self.cpu.cycles += 100
+        f = self._write_state()
+        registers = state_file.get_cpu_registers(self.cpu)
+        self.cpu.memory.write_byte(0x0000, 0x34)
+        self.cpu.cycles += 100
+
+        calls = []
+
+        def set_state(state):
+            calls.append((self.cpu.cycles, self.cpu.memory.read_byte(0x0000)))
+        self.periphery.set_state = set_state
+        try:
+            self._read_state(f)
+        finally:
+            del self.periphery.set_state
+        self.assertEqual(calls, [(registers["cycles"], 0x12)])
+
+    def test_reject_no_state_file(self):
+        with self.assertRaises(StateFileError):
+            self._read_state(io.BytesIO(b"\x80\x02pickle..."))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the trace divergence finder
+    ====================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from dragonpy.core import trace_file
+from dragonpy.core.trace_diff import (
+    DIVERGENCE_PC, DIVERGENCE_REGISTERS, TraceDiff, TraceOp,
+    diff_trace_files, iter_trace
+)
+
+
+def make_ops(pcs, a_values=None):
+    ops = []
+    for index, pc in enumerate(pcs):
+        a = 0 if a_values is None else a_values[index]
+        ops.append(TraceOp(index, pc, (0x50, a, 0, 0, 0, 0, 0, 0x7f00)))
+    return ops
+
+
+class MemInfo(object):
+    def get_shortest(self, addr):
+        return "$%x: test info" % addr
+
+
+class TestTraceDiff(unittest.TestCase):
+    LOOP = [0x1000, 0x1002, 0x1004] * 5
+
+    def test_same(self):
+        diff = TraceDiff(make_ops(self.LOOP), make_ops(self.LOOP))
+        self.assertEqual(diff.get_divergences(), [])
+        self.assertEqual(diff.op_count, len(self.LOOP))
+        self.assertEqual(diff.resync_count, 0)
+
+    def test_resync_after_interrupt(self):
+        irq = [0xa000, 0xa002, 0xa004]
+        left = self.LOOP[:4] + irq + self.LOOP[4:]
+        right = self.LOOP[:13] + irq + self.LOOP[13:]
+        diff = TraceDiff(make_ops(left), make_ops(right))
+        self.assertEqual(diff.get_divergences(), [])
+        self.assertEqual(diff.resync_count, 2)
+        self.assertEqual(diff.skipped_left, 3)
+        self.assertEqual(diff.skipped_right, 3)
+
+    def test_registers(self):
+        a_values = [0] * len(self.LOOP)
+        a_values[5] = 1
+        a_values[6] = 2 # same run of different A
+        a_values[10] = 3
+        diff = TraceDiff(
+            make_ops(self.LOOP, a_values), make_ops(self.LOOP),
+            mem_info=MemInfo()
+        )
+        divergences = diff.get_divergences()
+        self.assertEqual(len(divergences), 2)
+        divergence = divergences[0]
+        self.assertEqual(divergence.kind, DIVERGENCE_REGISTERS)
+        self.assertEqual(divergence.left.index, 5)
+        self.assertEqual(divergence.get_register_diffs(), [("a", 1, 0)])
+        self.assertEqual(len(divergence.context), 3)
+        txt = str(divergence)
+        self.assertIn("a: $1 != $0", txt)
+        self.assertIn("$1004: test info", txt)
+
+        diff = TraceDiff(
+            make_ops(self.LOOP, a_values), make_ops(self.LOOP),
+            ignore_registers=("a",)
+        )
+        self.assertEqual(diff.get_divergences(), [])
+
+    def test_max_count(self):
+        a_values = [0, 1] * (len(self.LOOP) // 2) + [0]
+        diff = TraceDiff(make_ops(self.LOOP, a_values), make_ops(self.LOOP))
+        self.assertEqual(len(diff.get_divergences(max_count=3)), 3)
+
+    def test_program_flow(self):
+        right = self.LOOP[:5] + [0x2000 + i * 2 for i in range(20)]
+        diff = TraceDiff(make_ops(self.LOOP), make_ops(right))
+        diff.RESYNC_WINDOW = 10
+        divergences = diff.get_divergences()
+        self.assertEqual(len(divergences), 1)
+        self.assertEqual(divergences[0].kind, DIVERGENCE_PC)
+        self.assertEqual(divergences[0].left.index, 5)
+
+
+class TestTraceDiffFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def test_files(self):
+        records = [
+            (0xb3ba, 0x8e, 0x50, 1, 2, 0, 0x400, 0, 0, 0x7f36, 3),
+            (0xb3bd, 0x86, 0x50, 0x12, 2, 0, 0x400, 0, 0, 0x7f36, 5),
+        ]
+        dragonpy_filename = os.path.join(self.temp_path, "trace.zlib")
+        with open(dragonpy_filename, "wb") as f:
+            writer = trace_file.TraceWriter(f, trace_file.COMPRESSION_ZLIB)
+            for record in records:
+                writer.add(*record)
+            writer.close()
+
+        xroar_filename = os.path.join(self.temp_path, "xroar.txt")
+        with open(xroar_filename, "w") as f:
+            f.write("XRoar trace\n")
+            f.write("b3ba| 8e0400      LDX     #$0400            cc=50 a=01 b=02 dp=00 x=0400 y=0000 u=0000 s=7f36\n")
+            f.write("b3bd| 8613        LDA     #$13              cc=50 a=13 b=02 dp=00 x=0400 y=0000 u=0000 s=7f36\n")
+
+        self.assertEqual(
+            [op.pc for op in iter_trace(xroar_filename)], [0xb3ba, 0xb3bd]
+        )
+        self.assertEqual(
+            list(iter_trace(dragonpy_filename))[1].registers,
+            (0x50, 0x12, 2, 0, 0x400, 0, 0, 0x7f36)
+        )
+        diff, divergences = diff_trace_files(dragonpy_filename, xroar_filename)
+        self.assertEqual(len(divergences), 1)
+        self.assertEqual(divergences[0].get_register_diffs(), [("a", 0x12, 0x13)])
+        self.assertIn("2 ops compared", diff.get_summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
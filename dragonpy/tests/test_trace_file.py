@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the binary execution trace
+    ===================================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.components.memory import Memory
+from dragonpy.core.trace_file import (
+    COMPRESSION_NONE, COMPRESSION_ZLIB, RECORD_SIZE, TraceFileError,
+    TraceRecorder, TraceWriter, convert_to_xroar, iter_records
+)
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TestTraceFile(unittest.TestCase):
+    def setUp(self):
+        cfg = TestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        memory = Memory(cfg)
+        self.cpu = CPU(memory, cfg)
+        memory.cpu = self.cpu # FIXME
+
+        memory.load(0x1000, [
+            0x86, 0x00, # LDA #0
+            0x4c, # INCA
+            0x10, 0x8e, 0x12, 0x34, # LDY #$1234
+            0x20, 0xf9, # BRA $1002
+        ])
+        self.cpu.program_counter.set(0x1000)
+
+        self.temp_path = tempfile.mkdtemp(prefix="DragonPy_")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_path)
+
+    def record(self, filename, op_count=7):
+        filename = os.path.join(self.temp_path, filename)
+        recorder = TraceRecorder(self.cpu)
+        recorder.start(filename)
+        for __ in range(op_count):
+            self.cpu.get_and_call_next_op()
+        recorder.stop()
+        self.assertNotIn("call_instruction_func", self.cpu.__dict__)
+        return filename
+
+    def test_records(self):
+        filename = self.record("trace.bin")
+        self.assertEqual(os.path.getsize(filename), 11 + 7 * RECORD_SIZE)
+        with open(filename, "rb") as f:
+            records = list(iter_records(f))
+
+        self.assertEqual(
+            [(record[0], record[1]) for record in records],
+            [
+                (0x1000, 0x86), (0x1002, 0x4c), (0x1003, 0x108e), (0x1007, 0x20),
+                (0x1002, 0x4c), (0x1003, 0x108e), (0x1007, 0x20),
+            ]
+        )
+        # registers after the op:
+        self.assertEqual(records[1][3], 1) # A
+        self.assertEqual(records[4][3], 2) # A
+        self.assertEqual(records[2][7], 0x1234) # Y
+        self.assertEqual(records[-1][-1], self.cpu.cycles)
+
+    def test_zlib(self):
+        filename = self.record("trace.zlib", op_count=1000)
+        self.assertLess(os.path.getsize(filename), 1000 * RECORD_SIZE // 4)
+        with open(filename, "rb") as f:
+            records = list(iter_records(f))
+        self.assertEqual(len(records), 1000)
+        self.assertEqual(records[-1][-1], self.cpu.cycles)
+
+    def test_writer_flush(self):
+        f = io.BytesIO()
+        writer = TraceWriter(f, COMPRESSION_ZLIB)
+        writer.BUFFER_RECORDS = 3
+        writer.buffer = bytearray(RECORD_SIZE * 3)
+        for pc in range(10):
+            writer.add(pc, 0x12, 0, 0, 0, 0, 0, 0, 0, 0, pc * 2)
+        writer.close()
+        self.assertEqual(writer.record_count, 10)
+        f.seek(0)
+        self.assertEqual([record[0] for record in iter_records(f)], list(range(10)))
+
+    def test_errors(self):
+        with self.assertRaises(TraceFileError):
+            list(iter_records(io.BytesIO(b"no trace file")))
+
+        f = io.BytesIO()
+        writer = TraceWriter(f, COMPRESSION_NONE)
+        writer.add(0x1000, 0x12, 0, 0, 0, 0, 0, 0, 0, 0, 2)
+        writer.close()
+        with self.assertRaises(TraceFileError):
+            list(iter_records(io.BytesIO(f.getvalue()[:-1])))
+
+    def test_convert_to_xroar(self):
+        filename = self.record("trace.bin")
+        outfile = io.StringIO()
+        with open(filename, "rb") as f:
+            count = convert_to_xroar(f, outfile, max_lines=3)
+        self.assertEqual(count, 3)
+        lines = outfile.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0][:4], "1000")
+        self.assertIn("LDA", lines[0])
+        self.assertIn("LDY", lines[2])
+        self.assertIn("y=1234", lines[2])
+        # misc/add_info_in_trace.py reads the CC value from here:
+        self.assertEqual(lines[0][46:49], "cc=")
+        int(lines[0][49:51], 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# encoding:utf8
+
+"""
+    DragonPy - unittests for the turbo text input
+    =============================================
+
+    :copyleft: 2015 by the DragonPy team, see AUTHORS for more details.
+    :license: GNU GPL v3 or above, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import unittest
+
+try:
+    import queue # Python 3
+except ImportError:
+    import Queue as queue # Python 2
+
+from MC6809.components.cpu6809 import CPU
+
+from dragonpy.Dragon32.keyboard_map import add_to_input_queue
+from dragonpy.components.memory import Memory
+from dragonpy.core.input_events import InputRecorder, InputReplay
+from dragonpy.core.scheduler import get_scheduler
+from dragonpy.core.turbo_input import TurboInput
+from dragonpy.tests.test_base import BaseCPUTestCase
+from dragonpy.tests.test_config import TestCfg
+
+
+class TurboInputTestCfg(TestCfg):
+    LINE_INPUT_ADDR = 0x2000
+    INCH_ADDR = 0x3000
+    LINE_INPUT_BUFFER_ADDR = 0x2dd
+    DEVICE_NUMBER_ADDR = 0x6f
+
+    def add_to_input_queue(self, user_input_queue, txt):
+        add_to_input_queue(user_input_queue, txt) # like Dragon32Cfg
+
+
+class TestTurboInput(unittest.TestCase):
+    def setUp(self):
+        self.cfg = TurboInputTestCfg(dict(BaseCPUTestCase.UNITTEST_CFG_DICT))
+        memory = Memory(self.cfg)
+        self.cpu = CPU(memory, self.cfg)
+        memory.cpu = self.cpu # FIXME
+        self.scheduler = get_scheduler(self.cpu)
+
+        # Simulate the command mode, that reads lines in a loop:
+        self.cpu.memory.load(0x1000, [
+            0xbd, 0x20, 0x00, # JSR $2000
+            0x9f, 0x82, # STX <$82
+            0x1f, 0xa8, # TFR CC,A
+            0x97, 0x84, # STA <$84
+            0x0c, 0x80, # INC <$80 - count the lines
+            0x20, 0xf3, # BRA $1000
+        ])
+        # The line input routine, like the ROM: Wait for a key and
+        # store it in the buffer until ENTER is pressed:
+        self.cpu.memory.load(0x2000, [
+            0x8e, 0x02, 0xdd, # LDX #$02dd
+            0xbd, 0x30, 0x00, # JSR $3000 - INCH
+            0x27, 0xfb, # BEQ $2003 - no key pressed
+            0x81, 0x0d, # CMPA #$0d
+            0x27, 0x04, # BEQ $2010
+            0xa7, 0x80, # STA ,X+
+            0x20, 0xf3, # BRA $2003
+            0x6f, 0x84, # CLR ,X
+            0x8e, 0x02, 0xdc, # LDX #$02dc
+            0x1c, 0xfe, # ANDCC #$fe - clear carry: no BREAK
+            0x39, # RTS
+        ])
+        # Scan the keyboard: No key pressed
+        self.cpu.memory.load(0x3000, [
+            0x4f, # CLRA
+            0x39, # RTS
+        ])
+        self.cpu.program_counter.set(0x1000)
+        self.cpu.system_stack_pointer.set(0x7000)
+        self.cpu.outer_burst_op_count = 10
+        self.cpu.inner_burst_op_count = 100
+
+        self.user_input_queue = queue.Queue()
+        self.turbo_input = TurboInput(
+            self.cpu, memory, self.scheduler, self.user_input_queue, self.cfg
+        )
+
+    def get_line_buffer(self):
+        data = self.cpu.memory.read_block(0x2dd, 0x2dd + 0x100)
+        return data[:data.index(b"\x00")]
+
+    def assert_line_entered(self, count, line):
+        self.assertEqual(self.cpu.memory.read_byte(0x80), count)
+        self.assertEqual(self.get_line_buffer(), line)
+        self.assertEqual(self.cpu.memory.read_word(0x82), 0x2dc) # X
+        self.assertEqual(self.cpu.memory.read_byte(0x84) & 0x01, 0) # carry
+
+    def test_lines(self):
+        self.turbo_input.add_text("10 print 'foo'\n20 GOTO 10\r\n")
+        self.assertTrue(self.turbo_input.active)
+        self.assertTrue(self.turbo_input.pending())
+        self.cpu.burst_run()
+
+        self.assert_line_entered(2, b"20 GOTO 10")
+        self.assertFalse(self.turbo_input.pending())
+        self.assertFalse(self.turbo_input.active)
+        self.assertTrue(self.user_input_queue.empty())
+
+    def test_ok_prompt(self):
+        # The ROM waits for a key inside of the line input routine:
+        self.cpu.burst_run()
+        self.assertEqual(self.cpu.memory.read_byte(0x80), 0)
+
+        self.turbo_input.add_text("10 print 'foo'\n")
+        self.cpu.burst_run()
+        self.assert_line_entered(1, b"10 PRINT 'FOO'")
+        self.assertFalse(self.turbo_input.active)
+
+        self.turbo_input.add_text("20 GOTO 10\nLIST\n")
+        self.cpu.burst_run()
+        self.assert_line_entered(3, b"LIST")
+        self.assertEqual(self.turbo_input.line_count, 3)
+        self.assertTrue(self.user_input_queue.empty())
+
+    def test_inch_middleware(self):
+        # e.g.: the idle detection
+        calls = []
+
+        def idle_pc_read(cpu_cycles, op_address, address, byte):
+            calls.append(address)
+            return byte
+
+        memory = self.cpu.memory
+        memory.add_read_byte_middleware(idle_pc_read, 0x3000)
+        self.cpu.burst_run()
+        self.assertTrue(calls)
+
+        self.turbo_input.add_text("'SAVE")
+        del calls[:]
+        self.cpu.burst_run()
+        self.assertTrue(calls) # only a partial line is pending
+
+        self.turbo_input.add_text("\n")
+        self.assertEqual(memory.remove_read_byte_middleware(0x3000), self.turbo_input.inch_read)
+        memory.add_read_byte_middleware(self.turbo_input.inch_read, 0x3000)
+        self.cpu.burst_run()
+        self.assert_line_entered(1, b"'SAVE")
+        self.assertEqual(memory.remove_read_byte_middleware(0x3000), idle_pc_read)
+
+    def test_partial_line(self):
+        self.turbo_input.add_text("'SAVE")
+        self.cpu.burst_run()
+        self.assertFalse(self.turbo_input.pending())
+        self.assertEqual(self.cpu.memory.read_byte(0x80), 0)
+
+        self.turbo_input.add_text(" TO EDITOR\n")
+        self.cpu.burst_run()
+        self.assert_line_entered(1, b"'SAVE TO EDITOR")
+
+    def test_keys_first(self):
+        self.user_input_queue.put("A")
+        self.turbo_input.add_text("RUN\n")
+        self.cpu.burst_run()
+        self.assertEqual(self.cpu.memory.read_byte(0x80), 0)
+        self.assertTrue(self.turbo_input.pending())
+
+    def test_fallback(self):
+        # The line input routine is not called:
+        self.cpu.memory.load(0x1000, [0x20, 0xfe]) # BRA $1000
+        self.turbo_input.FALLBACK_CYCLES = 1000
+        self.turbo_input.add_text("RUN\n")
+        self.cpu.burst_run()
+        self.assertFalse(self.turbo_input.active)
+        self.assertFalse(self.turbo_input.pending())
+        keys = []
+        while not self.user_input_queue.empty():
+            keys.append(self.user_input_queue.get_nowait())
+        self.assertEqual(keys, ["R", "U", "N", "Return"])
+
+    def test_fallback_inside_line(self):
+        self.cpu.burst_run()
+        self.turbo_input.FALLBACK_CYCLES = 1000
+        self.turbo_input.add_text("AB\n")
+        while self.cpu.program_counter.value != 0x3000:
+            self.cpu.get_and_call_next_op()
+        self.cpu.get_and_call_next_op() # INCH returns "A"
+        self.assertEqual(self.cpu.accu_a.value, ord("A"))
+
+        # The ROM stops calling INCH in the middle of the line:
+        self.cpu.memory.load(0x4000, [0x20, 0xfe]) # BRA $4000
+        self.cpu.program_counter.set(0x4000)
+        self.cpu.burst_run()
+        self.assertFalse(self.turbo_input.active)
+        keys = []
+        while not self.user_input_queue.empty():
+            keys.append(self.user_input_queue.get_nowait())
+        self.assertEqual(keys, ["B", "Return"])
+
+    def test_record_input(self):
+        user_input_queue = InputRecorder()
+        user_input_queue.cpu = self.cpu
+        self.turbo_input = TurboInput(
+            self.cpu, self.cpu.memory, self.scheduler, user_input_queue, self.cfg
+        )
+        self.turbo_input.add_text("AB\n")
+        self.assertFalse(self.turbo_input.active)
+        self.cpu.burst_run()
+        self.assertEqual(self.cpu.memory.read_byte(0x80), 0)
+
+        self.cpu.cycles = 123
+        self.assertEqual(user_input_queue.get_nowait(), "A")
+        self.assertEqual(user_input_queue.events, [(123, "A")])
+
+    def test_replay_input(self):
+        user_input_queue = InputReplay([])
+        user_input_queue.cpu = self.cpu
+        self.turbo_input = TurboInput(
+            self.cpu, self.cpu.memory, self.scheduler, user_input_queue, self.cfg
+        )
+        self.turbo_input.add_text("AB\n")
+        self.assertFalse(self.turbo_input.pending())
+        self.cpu.burst_run()
+        self.assertEqual(self.cpu.memory.read_byte(0x80), 0)
+        self.assertTrue(user_input_queue.empty())
+
+    def test_no_line_input_routine(self):
+        self.turbo_input.line_input_addr = None
+        self.turbo_input.add_text("AB\n")
+        self.assertFalse(self.turbo_input.active)
+        self.assertEqual(self.user_input_queue.qsize(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,7 +16,7 @@ from __future__ import absolute_import, division, print_function
 import logging
 
 from dragonpy.vectrex.vectrex_rom import VectrexRom
-from dragonpy.core.configs import BaseConfig, VECTREX
+from dragonpy.core.configs import BaseConfig, VECTREX, DummyMemInfo
 from dragonpy.vectrex.mem_info import VectrexMemInfo
 
 
@@ -70,6 +70,11 @@ class VectrexCfg(BaseConfig):
         if self.verbosity <= logging.ERROR:
             self.mem_info = VectrexMemInfo(log.debug)
 
+    def get_mem_info(self):
+        if isinstance(self.mem_info, DummyMemInfo):
+            self.mem_info = VectrexMemInfo(log.debug)
+        return self.mem_info
+
 
 config = VectrexCfg
 
@@ -11,34 +11,211 @@
 """
 
 import os
+import re
 import time
 import sys
 import argparse
+import collections
+import itertools
+import mmap
+import operator
+import multiprocessing
+
+
+# Regular files are scanned in chunks of this size in a process pool:
+CHUNK_SIZE = 32 * 1024 * 1024
+
+# Collect the output and write it in blocks of this size:
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+
+# The first 4 chars (the address) of every line. Consume the complete
+# line, so the regex engine doesn't try to match at every char:
+LINE_START_RE = re.compile(br"([^\n]{0,4})[^\n]*\n")
+
+
+def is_regular_file(f):
+    """ mmap is only possible for files, not for e.g. stdin/pipes """
+    try:
+        return os.path.isfile(f.name) and os.fstat(f.fileno()).st_size > 0
+    except (AttributeError, ValueError, OSError):
+        return False
+
+
+def get_chunks(filename, chunk_size=None):
+    """
+    Split the file into (filename, start, end) chunks at line ends.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    chunks = []
+    with open(filename, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = mm.find(b"\n", min(start + chunk_size, size) - 1)
+                if end == -1:
+                    end = size
+                else:
+                    end += 1
+                chunks.append((filename, start, end))
+                start = end
+        finally:
+            mm.close()
+    return chunks
+
+
+def _find_line_starts(mm, start, end):
+    """
+    Returns the first 4 bytes of every line in the chunk.
+    """
+    addrs = LINE_START_RE.findall(mm, start, end)
+    if mm[end - 1:end] != b"\n":
+        # The last line of the file without a newline
+        last_line_start = max(mm.rfind(b"\n", start, end) + 1, start)
+        addrs.append(mm[last_line_start:last_line_start + 4])
+    return addrs
+
+
+def _open_mmap(filename):
+    with open(filename, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def count_chunk(chunk):
+    """
+    pool worker: Returns the Counter of addresses and the line count.
+    """
+    filename, start, end = chunk
+    mm = _open_mmap(filename)
+    try:
+        addrs = _find_line_starts(mm, start, end)
+    finally:
+        mm.close()
+    return collections.Counter(addrs), len(addrs)
+
+
+def unique_chunk(chunk):
+    """
+    pool worker: Returns the first (line index, offset) of every address
+    in the chunk and the line count.
+    """
+    filename, start, end = chunk
+    mm = _open_mmap(filename)
+    try:
+        lines = mm[start:end].split(b"\n")
+    finally:
+        mm.close()
+    if not lines[-1]:
+        del lines[-1] # no empty line after the last newline
+    line_count = len(lines)
+
+    # All without a python loop per line:
+    addrs = list(map(operator.itemgetter(slice(0, 4)), lines))
+    # Build the dict backwards, so the first line index wins:
+    first_index = dict(zip(reversed(addrs), range(line_count - 1, -1, -1)))
+    del addrs
+    line_starts = [0]
+    line_starts.extend(itertools.accumulate(
+        map(operator.add, map(len, lines), itertools.repeat(1))
+    ))
+    del lines
+
+    first = {}
+    for addr, index in first_index.items():
+        first[addr] = (index, start + line_starts[index])
+    return first, line_count
+
+
+class BufferedWriter(object):
+    """
+    Collect the output and write it in big blocks.
+    """
+    def __init__(self, outfile, buffer_size=WRITE_BUFFER_SIZE):
+        self.outfile = outfile
+        self.buffer_size = buffer_size
+        self.parts = []
+        self.size = 0
+
+    def write(self, txt):
+        self.parts.append(txt)
+        self.size += len(txt)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.outfile.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.outfile.flush()
 
 
 class XroarTraceFilter(object):
-    def __init__(self, infile, outfile):
+    def __init__(self, infile, outfile, processes=None):
         self.infile = infile
         self.outfile = outfile
+        self.processes = processes # None -> number of CPUs
+
+    def _imap_chunks(self, func, filename):
+        """
+        Call func for all chunks of the file in a process pool.
+        Yields the results in chunk order.
+        """
+        chunks = get_chunks(filename)
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            for no, result in enumerate(pool.imap(func, chunks), 1):
+                sys.stderr.write(
+                    "\rScanned %i/%i chunks..." % (no, len(chunks))
+                )
+                sys.stderr.flush()
+                yield result
+        finally:
+            pool.close()
+            pool.join()
 
     def load_tracefile(self, f):
         sys.stderr.write(
             "\nRead %s...\n\n" % f.name
         )
-        addr_stat = {} # TODO: Use collections.Counter
+        if not is_regular_file(f):
+            return self._load_tracefile_stream(f)
+
+        addr_stat = collections.Counter()
+        line_no = 0
+        for counter, line_count in self._imap_chunks(count_chunk, f.name):
+            addr_stat.update(counter)
+            line_no += line_count
+
+        # Same keys as in self._load_tracefile_stream()
+        addr_stat = collections.Counter(dict(
+            (addr.decode("latin-1"), count) for addr, count in addr_stat.items()
+        ))
+
+        sys.stderr.write(
+            "\rAnalyzed %i op calls, complete.\n" % line_no
+        )
+        sys.stderr.write(
+            "\nThe tracefile contains %i unique addresses.\n" % len(addr_stat)
+        )
+        return addr_stat
+
+    def _load_tracefile_stream(self, f):
+        """ line by line, e.g. from stdin """
+        addr_stat = collections.Counter()
         next_update = time.time() + 0.5
         line_no = 0 # e.g. empty file
         for line_no, line in enumerate(f):
-            if time.time() > next_update:
+            if line_no % 10000 == 0 and time.time() > next_update:
                 sys.stderr.write(
                     "\rAnalyzed %i op calls..." % line_no
                 )
                 sys.stderr.flush()
                 next_update = time.time() + 0.5
 
-            addr = line[:4]
-            addr_stat.setdefault(addr, 0)
-            addr_stat[addr] += 1
+            addr_stat[line[:4].rstrip("\n")] += 1
 
         f.seek(0) # if also used in self.filter()
 
@@ -54,6 +231,53 @@ class XroarTraceFilter(object):
         sys.stderr.write(
             "\nunique %s in %s...\n\n" % (self.infile.name, self.outfile.name)
         )
+        if not is_regular_file(self.infile):
+            return self._unique_stream()
+
+        filename = self.infile.name
+
+        # The first line index and offset of every address:
+        first = {}
+        line_base = 0
+        for chunk_first, line_count in self._imap_chunks(unique_chunk, filename):
+            for addr, (line_index, offset) in chunk_first.items():
+                if addr not in first:
+                    first[addr] = (line_base + line_index, offset)
+            line_base += line_count
+        sys.stderr.write(
+            "\nIn %i lines are %i unique address calls.\n" % (line_base, len(first))
+        )
+
+        writer = BufferedWriter(self.outfile)
+        last_line_index = -1
+        with open(filename, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line_index, offset in sorted(first.values()):
+                    skip_count = line_index - last_line_index - 1
+                    if skip_count != 0:
+                        writer.write(
+                            "... [Skip %i lines] ...\n" % skip_count
+                        )
+                    end = mm.find(b"\n", offset)
+                    if end == -1:
+                        end = len(mm)
+                    else:
+                        end += 1
+                    writer.write(mm[offset:end].decode("latin-1"))
+                    last_line_index = line_index
+            finally:
+                mm.close()
+        writer.flush()
+
+        self.outfile.close()
+        sys.stderr.write(
+            "%i lines was filtered.\n" % (line_base - len(first))
+        )
+
+    def _unique_stream(self):
+        """ line by line, e.g. for a live filter from stdin """
+        writer = BufferedWriter(self.outfile)
         unique_addr = set()
         total_skiped_lines = 0
         skip_count = 0
@@ -62,7 +286,7 @@ class XroarTraceFilter(object):
         stat_out = False
         for line_no, line in enumerate(self.infile):
             if time.time() > next_update:
-                self.outfile.flush()
+                writer.flush()
                 if stat_out:
                     sys.stderr.write("\r")
                 else:
@@ -89,13 +313,14 @@ class XroarTraceFilter(object):
                 if stat_out:
                     # Skip info should not in the same line after stat info
                     sys.stderr.write("\n")
-                self.outfile.write(
+                writer.write(
                     "... [Skip %i lines] ...\n" % skip_count
                 )
                 skip_count = 0
-            self.outfile.write(line)
+            writer.write(line)
             stat_out = False
 
+        writer.flush()
         self.outfile.close()
         sys.stderr.write(
             "%i lines was filtered.\n" % total_skiped_lines
@@ -111,7 +336,7 @@ class XroarTraceFilter(object):
                 "List of the %i most called addresses:\n" % display_max
             )
 
-        for no, data in enumerate(sorted(self.addr_stat.items(), key=lambda x: x[1], reverse=True)):
+        for no, data in enumerate(sorted(addr_stat.items(), key=lambda x: x[1], reverse=True)):
             if display_max is not None and no >= display_max:
                 break
             sys.stdout.write(
@@ -123,7 +348,7 @@ class XroarTraceFilter(object):
             "Filter addresses with more than %i calls:\n" % max_count
         )
         addr_filter = {}
-        for addr, count in self.addr_stat.items():
+        for addr, count in addr_stat.items():
             if count >= max_count:
                 addr_filter[addr] = count
         return addr_filter
@@ -132,12 +357,14 @@ class XroarTraceFilter(object):
         sys.stderr.write(
             "Filter %i addresses.\n" % len(addr_filter)
         )
+        writer = BufferedWriter(self.outfile)
         total_skiped_lines = 0
         skip_count = 0
         last_line_no = 0
         next_update = time.time() + 1
         for line_no, line in enumerate(self.infile):
             if time.time() > next_update:
+                writer.flush() # e.g.: live filter
                 sys.stderr.write(
                     "\rFilter %i lines (%i/sec.)..." % (
                         line_no, (line_no - last_line_no)
@@ -154,12 +381,13 @@ class XroarTraceFilter(object):
                 continue
 
             if skip_count != 0:
-                self.outfile.write(
+                writer.write(
                     "... [Skip %i lines] ...\n" % skip_count
                 )
                 skip_count = 0
-            self.outfile.write(line)
+            writer.write(line)
 
+        writer.flush()
         self.outfile.close()
         sys.stderr.write(
             "%i lines was filtered.\n" % total_skiped_lines
@@ -173,6 +401,7 @@ class XroarTraceFilter(object):
             )
         )
 
+        writer = BufferedWriter(self.outfile)
         all_addresses = set()
         passed_addresses = set()
 
@@ -192,38 +421,41 @@ class XroarTraceFilter(object):
             passed_addresses.add(addr)
 
             if in_area:
-                self.outfile.write(line)
+                writer.write(line)
                 stat_out = False
 
                 if addr == stop_addr:
                     sys.stderr.flush()
-                    self.outfile.flush()
+                    writer.flush()
 
                     sys.stderr.write(end_seperator)
-                    self.outfile.write(end_seperator)
+                    writer.write(end_seperator)
 
                     sys.stderr.flush()
-                    self.outfile.flush()
+                    writer.flush()
                     in_area = False
+                elif time.time() > next_update:
+                    writer.flush()
+                    next_update = time.time() + 1
                 continue
             else:
                 if addr == start_addr:
                     sys.stderr.flush()
-                    self.outfile.flush()
+                    writer.flush()
 
                     sys.stderr.write(start_seperator)
-                    self.outfile.write(start_seperator)
+                    writer.write(start_seperator)
                     in_area = True
 
-                    self.outfile.write(line)
+                    writer.write(line)
 
                     sys.stderr.flush()
-                    self.outfile.flush()
+                    writer.flush()
                     stat_out = False
                     continue
 
                 if time.time() > next_update:
-                    self.outfile.flush()
+                    writer.flush()
                     if stat_out:
                         sys.stderr.write("\r")
                     else:
@@ -248,11 +480,12 @@ class XroarTraceFilter(object):
                     last_line_no = line_no
                     next_update = time.time() + 1
 
+        writer.flush()
         self.outfile.close()
 
 
 def main(args):
-    xt = XroarTraceFilter(args.infile, args.outfile)
+    xt = XroarTraceFilter(args.infile, args.outfile, args.processes)
 
     if args.unique:
         xt.unique()
@@ -320,6 +553,11 @@ def get_cli_args():
         help="Live Filter with given address file.",
     )
 
+    parser.add_argument("--processes", metavar="COUNT",
+        type=int, default=None,
+        help="Number of processes to scan trace files (default: number of CPUs)",
+    )
+
     parser.add_argument("--start-stop", metavar="START-STOP",
         type=start_stop_value,
         nargs="?",